@@ -0,0 +1,246 @@
+# forex_bot/benchmark.py
+# Benchmarks for the code paths the bot runs every hour, on synthetic market data.
+# No MT5 terminal is needed: the data service is pointed at an in-process fake terminal.
+#
+#   python benchmark.py --output bench.json
+#   python benchmark.py --sizes 1000 100000 --symbols 4 --compare bench.json
+import argparse, json, os, platform, shutil, subprocess, tempfile, time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytz
+
+from tests.stubs import fake_terminal, synthetic_ohlcv
+
+
+def measure(name: str, func, repeat: int, **info) -> dict:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    result = {"name": name, **info, "repeat": repeat, "min_s": min(timings), "median_s": float(np.median(timings))}
+    print(f"Benchmark: {name} {info} -> median {result['median_s'] * 1000:.2f} ms over {repeat} run(s)")
+    return result
+
+
+# --- Benchmarks ---
+
+def bench_indicators(sizes: list) -> list:
+    from services.indicator_service import IndicatorService
+    indicator_svc = IndicatorService()
+    return [measure("indicators.add_all_indicators", lambda df=synthetic_ohlcv(n): indicator_svc.add_all_indicators(df),
+                    repeat=5 if n <= 10_000 else 1, bars=n) for n in sizes]
+
+
+def bench_ml(sizes: list, model_path: str) -> list:
+    from services.indicator_service import IndicatorService
+    from services.ml_service import MLService
+    features = IndicatorService().add_all_indicators(synthetic_ohlcv(max(sizes) + 300))
+
+    results = []
+    for prefix, fast_inference in (("ml", False), ("ml.fast", True)):
+        ml_svc = MLService(model_path, fast_inference=fast_inference)
+        latest = features.iloc[-1000:]
+        results.append(measure(f"{prefix}.get_prediction", lambda: ml_svc.get_prediction(latest), repeat=50, bars=1))
+        for n in sizes:
+            batch = features.iloc[-n:]
+            results.append(measure(f"{prefix}.get_predictions", lambda batch=batch: ml_svc.get_predictions(batch),
+                                   repeat=5 if n <= 10_000 else 1, bars=len(batch)))
+    vector = latest[ml_svc.feature_names].iloc[-1].to_numpy(dtype=np.float32)
+    results.append(measure("ml.fast.predict_proba_vector", lambda: ml_svc.predict_proba_vector(vector), repeat=500, bars=1))
+    return results
+
+
+def bench_labeling(sizes: list) -> list:
+    from services.indicator_service import IndicatorService
+    from services.target_labeling_service import TargetLabelingService
+    labeling_svc = TargetLabelingService()
+    features = IndicatorService().add_all_indicators(synthetic_ohlcv(max(sizes) + 300))
+    results = []
+    for n in sizes:
+        frame = features.iloc[-n:][['open', 'high', 'low', 'close', 'ATRr_14']].copy()
+        results.append(measure("labeling.define_target", lambda frame=frame: labeling_svc.define_target(frame, 2.25, 1.5, 40),
+                               repeat=5 if n <= 10_000 else 1, bars=len(frame)))
+    return results
+
+
+class _NullTelegram:
+    """Stands in for TelegramService: the alerts are counted, not sent."""
+    def __init__(self):
+        self.alerts = 0
+
+    def send_bias_alert(self, bias_details, symbol):
+        self.alerts += 1
+
+    def send_execution_alert(self, trade_details, symbol):
+        self.alerts += 1
+
+
+def bench_cycle(n_symbols: int, model_path: str, cycles: int = 5) -> list:
+    """
+    One hourly cycle of main_scheduler across `n_symbols`, driving its own stage functions:
+    run_h1_bias_checks (H1 fetch and incremental features per symbol in parallel, one batched
+    model call, the bias heuristics) and run_m15_entry_hunt (M15 fetch and the entry
+    confirmation). Every cycle starts with half the symbols HUNTING and half WATCHING_FOR_ENTRY,
+    so both stages do the same work each hour. The first (cold) cycle fills the caches; the
+    following ones are steady state. It runs in a scratch directory holding a copy of the model
+    per symbol, the status files and the journal.
+    """
+    history_hours = 1300
+    symbols = [f"SYM{i}" for i in range(n_symbols)]
+    m1 = {symbol: synthetic_ohlcv(history_hours * 60 + (cycles + 1) * 60, 'M1', seed=i) for i, symbol in enumerate(symbols)}
+    # Start with `history_hours` of candles visible; each later cycle reveals one more hour.
+    now = int(m1[symbols[0]].index[-(cycles + 1) * 60].timestamp())
+
+    terminal = fake_terminal(m1, now)
+    from main_scheduler import run_h1_bias_checks, run_m15_entry_hunt
+    from services.mt5_connection import MT5Connection
+    from services.mt5_data_service import MT5DataService
+    from services.heuristic_service import HeuristicService
+    from services.incremental_indicator_service import IncrementalIndicatorService
+    from services.model_registry import ModelRegistry
+    from services.scheduler_service import SchedulerService
+    from services.state_store import StrategyStateStore
+    from services.trade_journal import TradeJournal
+
+    model_path = os.path.abspath(model_path)
+    watching = {"bias": "BUY", "pullback_level": 1.1, "sl": 1.09, "tp1": 1.11, "tp2": 1.12, "tp3": 1.13}
+    results = []
+    previous_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.chdir(work_dir)
+        try:
+            os.makedirs('models')
+            for symbol in symbols:
+                shutil.copyfile(model_path, os.path.join('models', f"{symbol.lower()}_h1.pkl"))
+            connection = MT5Connection(terminal)
+            connection.connect()
+            data_svc = MT5DataService(cache_dir='bars', aggregate_from_m1=True, connection=connection, clock=terminal.clock)
+            telegram_svc = _NullTelegram()
+            incremental_svc = IncrementalIndicatorService()
+            model_registry = ModelRegistry()
+            heuristic_svc = HeuristicService()
+            state_store = StrategyStateStore(symbols)
+            trade_journal = TradeJournal('trade_journal.db')
+            scheduler = SchedulerService(max_workers=4)
+
+            def cycle():
+                connection.begin_cycle()
+                for i, symbol in enumerate(symbols):
+                    state_store.set(symbol, {"state": "WATCHING_FOR_ENTRY", "bias_details": dict(watching)} if i % 2 else {"state": "HUNTING"})
+                run_h1_bias_checks(None, state_store.symbols_in("HUNTING"), data_svc, telegram_svc, heuristic_svc, incremental_svc,
+                                   model_registry, scheduler, state_store)
+                scheduler.run_for_symbols("M15 entry", lambda symbol: run_m15_entry_hunt(None, symbol, data_svc, telegram_svc, heuristic_svc,
+                                                                                         trade_journal, state_store),
+                                          state_store.symbols_in("WATCHING_FOR_ENTRY"))
+                state_store.flush()
+                connection.end_cycle()
+
+            results.append(measure("scheduler.cycle_cold", cycle, repeat=1, symbols=n_symbols))
+
+            def next_hour_cycle():
+                terminal.NOW += 3600
+                cycle()
+            results.append(measure("scheduler.cycle", next_hour_cycle, repeat=cycles, symbols=n_symbols))
+            print(f"Benchmark: The cycles raised {telegram_svc.alerts} alert(s).")
+            scheduler.shutdown()
+            trade_journal.close()
+        finally:
+            os.chdir(previous_dir)
+    return results
+
+
+def bench_fleet(n_symbols: int, model_path: str, worker_counts: list, cycles: int = 3) -> list:
+    """
+    The H1 bias stage in fleet mode: the coordinator fetches candles from the fake terminal and
+    `n_workers` processes compute features, predictions and heuristics, for each worker count.
+    """
+    history_hours = 1300
+    symbols = [f"SYM{i}" for i in range(n_symbols)]
+    m1 = {symbol: synthetic_ohlcv(history_hours * 60 + (cycles + 1) * 60, 'M1', seed=i) for i, symbol in enumerate(symbols)}
+    start = int(m1[symbols[0]].index[-(cycles + 1) * 60].timestamp())
+
+    terminal = fake_terminal(m1, start)
+    from services.fleet_service import FleetService
+    from services.mt5_connection import MT5Connection
+    from services.mt5_data_service import MT5DataService
+
+    results = []
+    for n_workers in worker_counts:
+        terminal.NOW = start
+        with tempfile.TemporaryDirectory() as cache_dir:
+            connection = MT5Connection(terminal)
+            connection.connect()
+            data_svc = MT5DataService(cache_dir=cache_dir, aggregate_from_m1=True, connection=connection, clock=terminal.clock)
+            fleet = FleetService(data_svc, n_workers, model_pattern=model_path, task_timeout=600)
+            fleet.start()
+            try:
+                results.append(measure("fleet.h1_bias_cold", lambda: fleet.run_h1_bias(symbols), repeat=1,
+                                       symbols=n_symbols, workers=n_workers))
+
+                def next_hour():
+                    terminal.NOW += 3600
+                    connection.begin_cycle()
+                    fleet.run_h1_bias(symbols)
+                    connection.end_cycle()
+                results.append(measure("fleet.h1_bias", next_hour, repeat=cycles, symbols=n_symbols, workers=n_workers))
+            finally:
+                fleet.shutdown()
+    return results
+
+
+def environment() -> dict:
+    import xgboost
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit, "time": datetime.now(pytz.utc).isoformat(), "python": platform.python_version(),
+        "platform": platform.platform(), "cpus": os.cpu_count(), "numpy": np.__version__,
+        "pandas": pd.__version__, "xgboost": xgboost.__version__,
+    }
+
+
+def compare(results: list, baseline_file: str):
+    with open(baseline_file, 'r') as f:
+        baseline = json.load(f)
+    previous = {(r['name'], r.get('bars'), r.get('symbols'), r.get('workers')): r for r in baseline['results']}
+    print(f"\n--- Compared with {baseline_file} (commit {baseline['environment'].get('commit')}) ---")
+    for result in results:
+        old = previous.get((result['name'], result.get('bars'), result.get('symbols'), result.get('workers')))
+        if old:
+            ratio = result['median_s'] / old['median_s'] if old['median_s'] else float('inf')
+            size = '/'.join(str(result[key]) for key in ('bars', 'symbols', 'workers') if key in result)
+            print(f"{result['name']:<32} {size!s:>9}  {old['median_s'] * 1000:10.2f} ms -> {result['median_s'] * 1000:10.2f} ms  (x{ratio:.2f})")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the signal pipeline on synthetic data.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 100_000, 1_000_000], help="Bar counts to benchmark.")
+    parser.add_argument('--symbols', type=int, default=8, help="Symbols in the scheduler cycle benchmark.")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help="Worker process counts in the fleet benchmark.")
+    parser.add_argument('--model', default='models/eurusdm_h1.pkl')
+    parser.add_argument('--only', nargs='+', choices=['indicators', 'ml', 'labeling', 'cycle', 'fleet'], default=None)
+    parser.add_argument('--output', default=None, help="Write the results to this JSON file.")
+    parser.add_argument('--compare', default=None, help="A previous JSON result to compare against.")
+    args = parser.parse_args()
+
+    selected = args.only or ['indicators', 'ml', 'labeling', 'cycle', 'fleet']
+    results = []
+    if 'indicators' in selected: results += bench_indicators(args.sizes)
+    if 'ml' in selected: results += bench_ml(args.sizes, args.model)
+    if 'labeling' in selected: results += bench_labeling(args.sizes)
+    if 'cycle' in selected: results += bench_cycle(args.symbols, args.model)
+    if 'fleet' in selected: results += bench_fleet(args.symbols, args.model, args.workers)
+
+    report = {"environment": environment(), "results": results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBenchmark: Results written to '{args.output}'.")
+    if args.compare:
+        compare(results, args.compare)
@@ -1,130 +1,231 @@
 # forex_bot/main_scheduler.py (The FINAL, Single-Strategy H1/M15 Version)
-import configparser, json, time, pytz
+import configparser, pytz
 from datetime import datetime
-import MetaTrader5 as mt5
 
+from services.mt5_connection import MT5Connection
 from services.mt5_data_service import MT5DataService as DataService
 from services.indicator_service import IndicatorService
-from services.ml_service import MLService
+from services.incremental_indicator_service import IncrementalIndicatorService
+from services.model_registry import ModelRegistry
 from services.heuristic_service import HeuristicService
 from services.telegram_service import TelegramService
 from services.trade_logger import TradeLogger
-from services.trade_manager import TradeManagerService
-
-def run_h1_bias_check(config, symbol: str, data_svc, telegram_svc, heuristic_svc):
-    strategy_name = f"H1 Bias Hunter ({symbol})"
-    print(f"\n[{datetime.now()}] --- Running {strategy_name} ---")
-    
-    # --- FIX: Use correct timeframe-specific filenames ---
-    status_file = f"{symbol.lower()}_h1_status.json"
-    model_file = f"models/{symbol.lower()}_h1.pkl"
-
-    indicator_svc = IndicatorService()
-    ml_svc = MLService(model_path=model_file)
-    
-    market_df_h1 = data_svc.get_market_data(symbol=symbol, timeframe_str='H1', limit=1000)
-    if market_df_h1 is None or market_df_h1.empty: return
-
-    analysis_df_h1 = indicator_svc.add_all_indicators(market_df_h1)
-    if analysis_df_h1 is None or analysis_df_h1.empty: return
-
-    prediction = ml_svc.get_prediction(analysis_df_h1)
-    result = heuristic_svc.generate_h1_bias(prediction, analysis_df_h1)
-
-    if result['status'] == 'success':
-        bias_details = result['bias_details']
-        print(f"{strategy_name}: Found a new {bias_details['bias']} bias. Updating state to WATCHING.")
-        new_status = {"state": "WATCHING_FOR_ENTRY", "bias_details": bias_details}
-        with open(status_file, 'w') as f: json.dump(new_status, f, indent=2)
-        telegram_svc.send_bias_alert(bias_details, symbol)
-
-def run_m15_entry_hunt(config, symbol: str, data_svc, telegram_svc, heuristic_svc):
+from services.trade_journal import TradeJournal
+from services.scheduler_service import SchedulerService
+from services.state_store import StrategyStateStore
+from services.trade_monitor_service import TradeMonitorService
+from services.metrics_service import MetricsService
+from services.fleet_service import FleetService
+from services.warm_start_service import WarmStartService
+
+def run_h1_bias_checks(config, symbols: list, data_svc, telegram_svc, heuristic_svc, incremental_svc=None, model_registry=None, scheduler=None,
+                       state_store=None, fleet=None, is_startup_run=False):
+    """
+    Runs the H1 bias check for several symbols; symbols sharing a model are scored in one batch.
+    is_startup_run is the catch-up check at startup, which also uses the final candle if it has closed.
+    """
+    state_store = state_store or StrategyStateStore(symbols)
+
+    # In fleet mode the features, predictions and heuristics are computed by the worker processes.
+    if fleet is not None:
+        results = fleet.run_h1_bias(symbols, is_startup_run=is_startup_run)
+    else:
+        results = {}
+        model_registry = model_registry or ModelRegistry()
+
+        def prepare_features(symbol):
+            print(f"\n[{datetime.now()}] --- Running H1 Bias Hunter ({symbol}) ---")
+            market_df_h1 = data_svc.get_market_data(symbol=symbol, timeframe_str='H1', limit=1000, is_startup_run=is_startup_run)
+            if market_df_h1 is None or market_df_h1.empty: return None
+
+            # Incremental mode only appends the newly closed candles to the kept indicator state.
+            if incremental_svc is not None:
+                return incremental_svc.update(symbol, 'H1', market_df_h1)
+            return IndicatorService().add_all_indicators(market_df_h1)
+
+        # Fetching and indicators run per symbol in parallel when a scheduler is given.
+        if scheduler is not None:
+            analysis_frames = scheduler.run_for_symbols("H1 features", prepare_features, symbols)
+        else:
+            analysis_frames = {symbol: prepare_features(symbol) for symbol in symbols}
+
+        frames_by_model = {}
+        for symbol, analysis_df_h1 in analysis_frames.items():
+            if analysis_df_h1 is None or analysis_df_h1.empty: continue
+            # --- FIX: Use correct timeframe-specific filenames ---
+            model_file = f"models/{symbol.lower()}_h1.pkl"
+            frames_by_model.setdefault(model_file, {})[symbol] = analysis_df_h1
+
+        predictions = model_registry.get_latest_predictions(frames_by_model)
+
+        for frames in frames_by_model.values():
+            for symbol, analysis_df_h1 in frames.items():
+                results[symbol] = (predictions[symbol], heuristic_svc.generate_bias(predictions[symbol], analysis_df_h1, 'H1'))
+
+    for symbol, (prediction, result) in results.items():
+        strategy_name = f"H1 Bias Hunter ({symbol})"
+        print(f"{strategy_name}: Model prediction is {prediction}.")
+
+        if result['status'] == 'success':
+            bias_details = result['bias_details']
+            print(f"{strategy_name}: Found a new {bias_details['bias']} bias. Updating state to WATCHING.")
+            state_store.set(symbol, {"state": "WATCHING_FOR_ENTRY", "bias_details": bias_details})
+            telegram_svc.send_bias_alert(bias_details, symbol)
+
+    # Every symbol that found a bias this hour is persisted in one pass.
+    state_store.flush()
+
+def run_h1_bias_check(config, symbol: str, data_svc, telegram_svc, heuristic_svc, incremental_svc=None, model_registry=None,
+                      state_store=None):
+    run_h1_bias_checks(config, [symbol], data_svc, telegram_svc, heuristic_svc, incremental_svc, model_registry, state_store=state_store)
+
+def run_m15_entry_hunt(config, symbol: str, data_svc, telegram_svc, heuristic_svc, trade_journal=None, state_store=None):
     strategy_name = f"M15 Entry Scout ({symbol})"
     print(f"\n[{datetime.now()}] --- Running {strategy_name} ---")
 
     # --- FIX: Use correct timeframe-specific filenames ---
-    status_file = f"{symbol.lower()}_h1_status.json"
     log_file = f"{symbol.lower()}_h1_log.csv"
     
     market_df_m15 = data_svc.get_market_data(symbol=symbol, timeframe_str='M15', limit=5)
     if market_df_m15 is None or market_df_m15.empty: return
     
-    try:
-        with open(status_file, 'r') as f: status = json.load(f)
-    except FileNotFoundError: return
-    
+    flush_now = state_store is None
+    state_store = state_store or StrategyStateStore([symbol])
+    status = state_store.get(symbol)
     if status.get('state') != "WATCHING_FOR_ENTRY": return
 
     bias_details = status['bias_details']
     
-    if heuristic_svc.confirm_m15_entry(market_df_m15, bias_details['bias']):
+    if heuristic_svc.confirm_entry(market_df_m15, bias_details['bias']):
         print(f"{strategy_name}: M15 entry CONFIRMED. Executing trade.")
         final_trade_details = bias_details.copy()
         final_trade_details['entry'] = market_df_m15.iloc[-1]['close']
 
         telegram_svc.send_execution_alert(final_trade_details, symbol)
-        trade_logger = TradeLogger(log_file)
+        trade_logger = trade_journal or TradeLogger(log_file)
         trade_logger.log_new_signal(symbol, final_trade_details)
             
-        new_status = {"state": "IN_TRADE", "trade_details": final_trade_details}
-        with open(status_file, 'w') as f: json.dump(new_status, f, indent=2)
+        state_store.set(symbol, {"state": "IN_TRADE", "trade_details": final_trade_details}, flush=flush_now)
 
 if __name__ == '__main__':
-    if not mt5.initialize(): quit()
-    print("SUCCESS: Connection to MT5 terminal established.")
-
     config = configparser.ConfigParser()
     config.read('config.ini')
     symbols_to_trade = [symbol.strip() for symbol in config['parameters']['symbols'].split(',')]
+
+    # Fast start: heavy libraries load in the background while the terminal connects, the indicator
+    # state and models come back from the last snapshot, and the first H1 check runs immediately.
+    fast_start = config.getboolean('parameters', 'fast_start', fallback=False)
+    warm_start = WarmStartService('data/warm_start.pkl')
+    if fast_start:
+        warm_start.preload_modules()
+
+    # The supervisor re-initializes a lost terminal with backoff; only the first connection is mandatory.
+    connection = MT5Connection(health_interval=config.getfloat('parameters', 'mt5_health_interval', fallback=30.0),
+                               max_backoff=config.getfloat('parameters', 'mt5_max_backoff', fallback=60.0))
+    if not connection.connect(): quit()
+    print("SUCCESS: Connection to MT5 terminal established.")
     
-    data_svc = DataService()
-    telegram_svc = TelegramService(bot_token=config['telegram']['bot_token'], channel_id=config['telegram']['channel_id'])
-    heuristic_svc = HeuristicService()
+    # Per-stage timings go to metrics/cycles.jsonl; off unless enabled in config.ini.
+    metrics = MetricsService(enabled=config.getboolean('parameters', 'metrics_enabled', fallback=False))
+    data_svc = metrics.instrument(DataService(cache_dir='data/bars', aggregate_from_m1=True, connection=connection), 'mt5')
+    telegram_svc = metrics.instrument(TelegramService(bot_token=config['telegram']['bot_token'], channel_id=config['telegram']['channel_id'], outbox_file='telegram_outbox.json'), 'telegram')
+    metrics.instrument(telegram_svc.outbox, 'telegram', methods=['_deliver'])
+    heuristic_svc = metrics.instrument(HeuristicService(), 'heuristics')
+    incremental_svc = metrics.instrument(IncrementalIndicatorService(), 'indicators')
+    model_registry = metrics.instrument(ModelRegistry(fast_inference=config.getboolean('parameters', 'fast_inference', fallback=False)), 'ml')
+    if fast_start:
+        warm_start.restore(incremental_svc, model_registry)
+    trade_journal = metrics.instrument(TradeJournal('trade_journal.db'), 'journal')
+    trade_journal.migrate_csv_logs('*_log.csv')
+    state_store = metrics.instrument(StrategyStateStore(symbols_to_trade), 'state')
+    # SL/TP hits of open trades are caught from the tick stream between cycles.
+    trade_monitor = TradeMonitorService(data_svc, state_store, trade_journal, telegram_svc,
+                                        poll_interval=config.getfloat('parameters', 'tick_poll_interval', fallback=0.25))
+    trade_monitor.start()
+    scheduler = SchedulerService(
+        max_workers=config.getint('parameters', 'max_workers', fallback=4),
+        task_timeout=config.getfloat('parameters', 'task_timeout', fallback=45.0),
+        metrics=metrics
+    )
+    # Fleet mode: shard the H1 feature/model work across worker processes (0 keeps it in this process).
+    fleet_workers = config.getint('parameters', 'fleet_workers', fallback=0)
+    fleet = None
+    if fleet_workers > 0:
+        fleet = FleetService(data_svc, fleet_workers, fast_inference=config.getboolean('parameters', 'fast_inference', fallback=False),
+                             task_timeout=config.getfloat('parameters', 'task_timeout', fallback=45.0), metrics=metrics)
+        fleet.start()
     
+    # Imported here so the stage functions above can be imported (benchmark, tests) without the terminal package.
+    from services.trade_manager import TradeManagerService
     # --- FIX: Use correct timeframe-specific filenames ---
-    trade_managers = [TradeManagerService(data_svc, telegram_svc, f"{s.lower()}_h1_log.csv", f"{s.lower()}_h1_status.json", s) for s in symbols_to_trade]
+    trade_managers = {s: TradeManagerService(data_svc, telegram_svc, f"{s.lower()}_h1_log.csv", f"{s.lower()}_h1_status.json", s) for s in symbols_to_trade}
     
     print("\n--- MTF H1/M15 Forex Bot Started ---")
-    last_h1_run_hour = -1
-    last_m15_run_minute = -1
+    # Candle slots already handled; a slot that started while a cycle overran is still run late.
+    startup_utc = datetime.now(pytz.utc)
+    last_h1_slot = None
+    last_m15_slot = startup_utc.replace(minute=startup_utc.minute - startup_utc.minute % 15, second=0, microsecond=0)
 
     try:
         while True:
+            # Identical candle requests from the stages below share one fetch per cycle.
+            connection.begin_cycle()
+            # Without the terminal no stage sees current candles; the slots stay open and run once it is back.
+            if not connection.ensure_connected():
+                print(f"[{datetime.now(pytz.utc).strftime('%H:%M:%S')}] MT5 terminal unavailable. Skipping this cycle.")
+                connection.end_cycle()
+                scheduler.sleep_until_next_bar()
+                continue
+            metrics.begin_cycle()
             now_utc = datetime.now(pytz.utc)
+            h1_slot = now_utc.replace(minute=0, second=0, microsecond=0)
+            m15_slot = now_utc.replace(minute=now_utc.minute - now_utc.minute % 15, second=0, microsecond=0)
             
             print(f"[{now_utc.strftime('%H:%M:%S')}] Running management cycle...")
-            for manager in trade_managers:
-                manager.check_open_trade()
+            scheduler.run_for_symbols("management", lambda symbol: trade_managers[symbol].check_open_trade(), symbols_to_trade)
+            # The trade managers write their status files directly; pick up any trade they closed.
+            state_store.refresh()
             
             # H1 Bias Check (every hour)
-            if now_utc.minute >= 1 and last_h1_run_hour != now_utc.hour:
-                for symbol in symbols_to_trade:
-                    status_file = f"{symbol.lower()}_h1_status.json"
-                    try:
-                        with open(status_file, 'r') as f: status = json.load(f)
-                    except FileNotFoundError:
-                        status = {"state": "HUNTING"}
-                    
-                    if status.get('state') == "HUNTING":
-                        run_h1_bias_check(config, symbol, data_svc, telegram_svc, heuristic_svc)
-                last_h1_run_hour = now_utc.hour
+            if last_h1_slot != h1_slot:
+                hunting_symbols = state_store.symbols_in("HUNTING")
+                # The first check after startup is a catch-up for the hour the bot was not running.
+                run_h1_bias_checks(config, hunting_symbols, data_svc, telegram_svc, heuristic_svc, incremental_svc, model_registry, scheduler,
+                                   state_store, fleet, is_startup_run=fast_start and last_h1_slot is None)
+                # A stage that ran on failed fetches is not done: it runs again once the terminal is back.
+                if connection.cycle_healthy():
+                    last_h1_slot = h1_slot
+                if fast_start:
+                    warm_start.save(incremental_svc, model_registry)
 
             # M15 Entry Hunt (every 15 mins)
-            if now_utc.minute % 15 == 0 and last_m15_run_minute != now_utc.minute:
-                for symbol in symbols_to_trade:
-                    status_file = f"{symbol.lower()}_h1_status.json"
-                    try:
-                        with open(status_file, 'r') as f: status = json.load(f)
-                        if status.get('state') == "WATCHING_FOR_ENTRY":
-                            run_m15_entry_hunt(config, symbol, data_svc, telegram_svc, heuristic_svc)
-                    except FileNotFoundError:
-                        continue
-                last_m15_run_minute = now_utc.minute
-
-            time.sleep(60)
+            if last_m15_slot != m15_slot:
+                watching_symbols = state_store.symbols_in("WATCHING_FOR_ENTRY")
+                scheduler.run_for_symbols("M15 entry", lambda symbol: run_m15_entry_hunt(config, symbol, data_svc, telegram_svc, heuristic_svc, trade_journal,
+                                                                                         state_store), watching_symbols)
+                state_store.flush()
+                if connection.cycle_healthy():
+                    last_m15_slot = m15_slot
+
+            connection.end_cycle()
+            # Alerts raised during this cycle go out together, off the trading loop.
+            telegram_svc.flush()
+            metrics.end_cycle()
+
+            # Wake right after the next M1 candle close rather than sleeping a fixed 60s.
+            scheduler.sleep_until_next_bar()
 
     except (KeyboardInterrupt, SystemExit):
         print("\nBot stopped.")
     finally:
-        mt5.shutdown()
+        trade_monitor.stop()
+        if fleet is not None:
+            fleet.shutdown()
+        if fast_start:
+            warm_start.save(incremental_svc, model_registry)
+        state_store.flush()
+        scheduler.shutdown()
+        telegram_svc.close()
+        trade_journal.close()
+        connection.shutdown()
         print("Connection to MT5 terminal shut down.")
\ No newline at end of file
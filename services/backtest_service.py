@@ -0,0 +1,192 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+
+from services.bar_store import BAR_SECONDS, BarStore, bars_to_frame
+from services.feature_cache import FeatureCache
+from services.heuristic_service import HEURISTIC_COLUMNS, HeuristicService
+from services.indicator_service import IndicatorService
+from services.ml_service import MLService
+from services.trade_logger import LOG_COLUMNS
+
+# The chikou span looks this many candles ahead, so a feature row is only complete that much later.
+CHIKOU_LAG = 26
+
+# The bias_details keys of HeuristicService.generate_bias, in its order.
+BIAS_DETAIL_COLUMNS = ['bias', 'pullback_level', 'sl', 'tp1', 'tp2', 'tp3']
+
+
+class BacktestService:
+    """
+    Event-driven replay of the live H1 bias / M15 entry strategy over cached candles.
+
+    Features and model predictions are computed once for the whole history; the
+    HUNTING -> WATCHING_FOR_ENTRY -> IN_TRADE state machine then walks forward in time,
+    applying the HeuristicService rules (evaluated once over the whole history with
+    generate_biases / confirm_entries) at the same candle closes the scheduler would, and
+    fills each trade against its SL and TP1-3 levels.
+
+    Backtests of several models on the same candles can share a FeatureCache: the indicators
+    are computed once, and each model reads the rows where its features and the heuristics'
+    columns are set.
+    """
+    def __init__(self, ml_svc: MLService, heuristic_svc: HeuristicService, indicator_svc: IndicatorService | None = None,
+                 bias_tf: str = 'H1', entry_tf: str = 'M15', feature_cache: FeatureCache | None = None):
+        self.ml_svc = ml_svc
+        self.heuristic_svc = heuristic_svc
+        self.indicator_svc = indicator_svc or IndicatorService()
+        self.bias_tf = bias_tf
+        self.entry_tf = entry_tf
+        self.feature_cache = feature_cache
+
+    def precompute(self, bias_df: pd.DataFrame, symbol: str = '') -> tuple[pd.DataFrame, np.ndarray, pd.DatetimeIndex]:
+        """
+        Returns the feature frame, the model's class probabilities for every row and, per
+        feature row, the time the live bot would first see that row as its latest one (the
+        close of the candle CHIKOU_LAG candles later).
+        """
+        if self.feature_cache is not None:
+            columns = HEURISTIC_COLUMNS + [col for col in self.ml_svc.feature_names if col not in HEURISTIC_COLUMNS]
+            features = self.feature_cache.view(symbol, self.bias_tf, bias_df, columns=columns)
+        else:
+            features = self.indicator_svc.add_all_indicators(bias_df.copy())
+        probabilities = self.ml_svc.get_probabilities(features)
+
+        positions = bias_df.index.get_indexer(features.index) + CHIKOU_LAG
+        bar_duration = pd.Timedelta(seconds=BAR_SECONDS[self.bias_tf])
+        available = positions < len(bias_df)
+        decision_times = bias_df.index[positions[available]] + bar_duration
+        return features[available], probabilities[available], decision_times
+
+    def run(self, symbol: str, bias_df: pd.DataFrame, entry_df: pd.DataFrame, log_file: str | None = None,
+            pip_size: float | None = None) -> pd.DataFrame:
+        """Replays the strategy and returns (and optionally writes) a TradeLogger-style trade log."""
+        features, probabilities, decision_times = self.precompute(bias_df, symbol)
+        predictions = self.ml_svc.signals_from_probabilities(probabilities)
+        trade_log = self.replay(symbol, features, predictions, decision_times, entry_df, pip_size)
+        if log_file:
+            trade_log.to_csv(log_file, index=False)
+            print(f"BacktestService: Trade log written to '{log_file}'.")
+        return trade_log
+
+    def replay(self, symbol: str, features: pd.DataFrame, predictions: np.ndarray, decision_times: pd.DatetimeIndex,
+               entry_df: pd.DataFrame, pip_size: float | None = None) -> pd.DataFrame:
+        """The state machine over precomputed features and predictions (see precompute)."""
+        pip_size = pip_size or (0.01 if 'JPY' in symbol.upper() else 0.0001)
+        entry_duration = pd.Timedelta(seconds=BAR_SECONDS[self.entry_tf])
+        entry_close_times = entry_df.index + entry_duration
+        entry_high = entry_df['high'].to_numpy()
+        entry_low = entry_df['low'].to_numpy()
+
+        # The heuristics are evaluated for every candle up front; the replay only looks results up.
+        candidates = np.flatnonzero(predictions != 0)
+        biases = self.heuristic_svc.generate_biases(predictions, features, self.bias_tf)
+        accepted = np.flatnonzero(biases['status'].to_numpy() == "success")
+        confirmed_rows = {bias: np.flatnonzero(self.heuristic_svc.confirm_entries(entry_df, bias).to_numpy()) for bias in ("BUY", "SELL")}
+        print(f"BacktestService: Replaying {len(features)} '{self.bias_tf}' decisions for {symbol} ({len(candidates)} with a signal)...")
+
+        trades = []
+        now = decision_times[0] if len(decision_times) else None
+        state, bias_details = "HUNTING", None
+        while now is not None:
+            if state == "HUNTING":
+                # --- 1. H1 bias: next decision time with a model signal that the heuristics accept ---
+                next_accepted = accepted[decision_times[accepted] >= now]
+                now = None
+                if len(next_accepted):
+                    j = next_accepted[0]
+                    bias_details = {col: biases[col].iat[j] for col in BIAS_DETAIL_COLUMNS}
+                    state, now = "WATCHING_FOR_ENTRY", decision_times[j]
+
+            elif state == "WATCHING_FOR_ENTRY":
+                # --- 2. Entry: first lower-timeframe candle closing at or after the bias that confirms it ---
+                # The live loop hunts for the entry in the same cycle as the H1 check, so the candle
+                # that closes at the decision time is the first one it evaluates.
+                start = max(int(np.searchsorted(entry_close_times, now, side='left')), 1)
+                now = None
+                rows = confirmed_rows[bias_details['bias']]
+                position = int(np.searchsorted(rows, start))
+                if position < len(rows):
+                    k = rows[position]
+                    trade_details = bias_details.copy()
+                    trade_details['entry'] = entry_df['close'].iloc[k]
+                    state, now = "IN_TRADE", entry_close_times[k]
+                    entry_index = k
+
+            elif state == "IN_TRADE":
+                # --- 3. Management: fill against SL / TP1-3 on the candles after the entry ---
+                trade, now = self._fill_trade(symbol, trade_details, entry_close_times[entry_index], entry_high[entry_index + 1:],
+                                              entry_low[entry_index + 1:], entry_close_times[entry_index + 1:], pip_size)
+                trades.append(trade)
+                state, bias_details = "HUNTING", None
+
+        trade_log = pd.DataFrame(trades, columns=LOG_COLUMNS)
+        print(f"BacktestService: {len(trade_log)} trades replayed for {symbol}.")
+        return trade_log
+
+    @staticmethod
+    def _fill_trade(symbol: str, trade: dict, signal_time, highs: np.ndarray, lows: np.ndarray,
+                    close_times: pd.DatetimeIndex, pip_size: float) -> tuple[dict, pd.Timestamp | None]:
+        """
+        The position stays open until a candle touches the stop loss or TP3; a candle touching
+        both the stop and a target counts as a stop, the conservative assumption. There are no
+        partial closes: the trade is exited in full at the level that closed it, and a stop after
+        a take profit is logged as e.g. "SL after TP1" at the stop price. Returns the log row and
+        the time the position closed (None if it is still open at the end of the data).
+        """
+        is_buy = trade['bias'] == "BUY"
+        direction = 1 if is_buy else -1
+
+        def first(mask: np.ndarray) -> int:
+            return int(mask.argmax()) if mask.any() else len(mask)
+
+        sl_at = first(lows <= trade['sl']) if is_buy else first(highs >= trade['sl'])
+        tp_at = [first(highs >= trade[f'tp{n}']) if is_buy else first(lows <= trade[f'tp{n}']) for n in (1, 2, 3)]
+        close_at = min(sl_at, tp_at[2])
+        targets_hit = [n for n in (1, 2, 3) if tp_at[n - 1] < sl_at]
+
+        if close_at == len(highs):
+            outcome, exit_time, exit_price, profit_pips = "OPEN", "", "", ""
+        else:
+            if 3 in targets_hit:
+                outcome, exit_price = "TP3", trade['tp3']
+            else:
+                outcome = f"SL after TP{targets_hit[-1]}" if targets_hit else "SL"
+                exit_price = trade['sl']
+            exit_time = close_times[close_at]
+            profit_pips = round(direction * (exit_price - trade['entry']) / pip_size, 1)
+
+        row = {
+            "Signal_Time": signal_time, "Symbol": symbol, "Decision": trade['bias'], "Entry_Price": trade['entry'],
+            "Take_Profit_1": trade['tp1'], "Take_Profit_2": trade['tp2'], "Take_Profit_3": trade['tp3'],
+            "Stop_Loss": trade['sl'], "Outcome": outcome, "Exit_Time": exit_time,
+            "Exit_Price": exit_price, "Profit_Pips": profit_pips,
+        }
+        return row, (close_times[close_at] if close_at < len(highs) else None)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Backtest the H1 bias / M15 entry strategy on cached candles.")
+    parser.add_argument('symbol')
+    parser.add_argument('--cache-dir', default='data/bars', help="BarStore directory filled by MT5DataService.")
+    parser.add_argument('--model', nargs='+', default=None,
+                        help="Defaults to models/<symbol>_h1.pkl. Several models are compared on one shared indicator frame.")
+    parser.add_argument('--start', default=None, help="Only replay candles from this date (YYYY-MM-DD).")
+    parser.add_argument('--log', default=None, help="Defaults to <symbol>_h1_backtest_log.csv (<model>_backtest_log.csv for several models).")
+    args = parser.parse_args()
+
+    store = BarStore(args.cache_dir)
+    start = int(pd.Timestamp(args.start, tz='UTC').timestamp()) if args.start else 0
+    bias_df = bars_to_frame(store.range(args.symbol, 'H1', start))
+    entry_df = bars_to_frame(store.range(args.symbol, 'M15', start))
+
+    model_paths = args.model or [f"models/{args.symbol.lower()}_h1.pkl"]
+    feature_cache = FeatureCache() if len(model_paths) > 1 else None
+    for model_path in model_paths:
+        if len(model_paths) > 1:
+            log_file = f"{os.path.splitext(os.path.basename(model_path))[0]}_backtest_log.csv"
+        else:
+            log_file = args.log or f"{args.symbol.lower()}_h1_backtest_log.csv"
+        backtest_svc = BacktestService(MLService(model_path), HeuristicService(), feature_cache=feature_cache)
+        backtest_svc.run(args.symbol, bias_df, entry_df, log_file=log_file)
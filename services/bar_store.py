@@ -0,0 +1,223 @@
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+# One fixed-size record per candle, so a store file can be memory-mapped and appended to directly.
+BAR_DTYPE = np.dtype([
+    ('time', '<i8'), ('open', '<f8'), ('high', '<f8'),
+    ('low', '<f8'), ('close', '<f8'), ('volume', '<u8'),
+])
+
+BAR_SECONDS = {
+    'M1': 60, 'M2': 120, 'M3': 180, 'M4': 240, 'M5': 300, 'M6': 360, 'M10': 600, 'M12': 720,
+    'M15': 900, 'M20': 1200, 'M30': 1800,
+    'H1': 3600, 'H2': 7200, 'H3': 10800, 'H4': 14400, 'H6': 21600, 'H8': 28800, 'H12': 43200,
+    'D1': 86400, 'W1': 7 * 86400,
+    # Months vary; the longest one is used, which only matters for sizing and staleness checks.
+    'MN1': 31 * 86400,
+}
+
+# Forex closes over the weekend; a gap that covers a Saturday and is shorter than this is expected.
+WEEKEND_SECONDS = 3 * 86400
+
+
+def rates_to_bars(rates) -> np.ndarray:
+    """Converts the structured array returned by copy_rates_* into BAR_DTYPE records."""
+    bars = np.empty(len(rates), dtype=BAR_DTYPE)
+    for field in ('time', 'open', 'high', 'low', 'close'):
+        bars[field] = rates[field]
+    bars['volume'] = rates['tick_volume']
+    return bars
+
+
+def resample_bars(bars: np.ndarray, timeframe_str: str) -> np.ndarray:
+    """
+    Aggregates time-sorted candles (normally M1) into `timeframe_str` candles. Buckets are
+    aligned to multiples of the bar length since the epoch, like the terminal's own candles;
+    the last bucket is still forming if its lower-timeframe candles are.
+    """
+    if len(bars) == 0:
+        return np.empty(0, dtype=BAR_DTYPE)
+    buckets = bars['time'] - bars['time'] % BAR_SECONDS[timeframe_str]
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(bars)] - 1
+
+    resampled = np.empty(len(starts), dtype=BAR_DTYPE)
+    resampled['time'] = buckets[starts]
+    resampled['open'] = bars['open'][starts]
+    resampled['high'] = np.maximum.reduceat(bars['high'], starts)
+    resampled['low'] = np.minimum.reduceat(bars['low'], starts)
+    resampled['close'] = bars['close'][ends]
+    resampled['volume'] = np.add.reduceat(bars['volume'], starts)
+    return resampled
+
+
+def bars_to_frame(bars: np.ndarray) -> pd.DataFrame:
+    """Builds the same UTC-indexed OHLCV DataFrame MT5DataService returns."""
+    df = pd.DataFrame({col: bars[col] for col in ('open', 'high', 'low', 'close', 'volume')},
+                      index=pd.to_datetime(bars['time'], unit='s', utc=True))
+    df.index.name = 'time'
+    return df
+
+
+def frame_to_bars(df: pd.DataFrame) -> np.ndarray:
+    """Inverse of bars_to_frame: packs a UTC-indexed OHLCV DataFrame into BAR_DTYPE records."""
+    bars = np.empty(len(df), dtype=BAR_DTYPE)
+    bars['time'] = pd.DatetimeIndex(df.index).asi8 // 10**9
+    for col in ('open', 'high', 'low', 'close', 'volume'):
+        bars[col] = df[col].to_numpy()
+    return bars
+
+
+class BarStore:
+    """
+    On-disk OHLCV cache with one memory-mapped binary file per symbol/timeframe.
+    Records are kept sorted by time; the last stored candle may still be forming
+    and is overwritten by the next sync.
+    """
+    def __init__(self, root: str = 'data/bars'):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, symbol: str, timeframe_str: str) -> str:
+        return os.path.join(self.root, f"{symbol.lower()}_{timeframe_str.lower()}.bars")
+
+    def read(self, symbol: str, timeframe_str: str) -> np.ndarray:
+        """Returns a read-only memory map of all stored candles (an empty array if none)."""
+        path = self.path(symbol, timeframe_str)
+        if not os.path.isfile(path) or os.path.getsize(path) < BAR_DTYPE.itemsize:
+            return np.empty(0, dtype=BAR_DTYPE)
+        return np.memmap(path, dtype=BAR_DTYPE, mode='r')
+
+    def count(self, symbol: str, timeframe_str: str) -> int:
+        path = self.path(symbol, timeframe_str)
+        return os.path.getsize(path) // BAR_DTYPE.itemsize if os.path.isfile(path) else 0
+
+    def _record(self, symbol: str, timeframe_str: str, position: int) -> np.ndarray | None:
+        # Plain file reads rather than a memory map, so no mapping is held open while the file
+        # is truncated or replaced (Windows, where the terminal runs, refuses that).
+        count = self.count(symbol, timeframe_str)
+        if count == 0:
+            return None
+        offset = (position % count) * BAR_DTYPE.itemsize
+        return np.fromfile(self.path(symbol, timeframe_str), dtype=BAR_DTYPE, count=1, offset=offset)[0]
+
+    def first_time(self, symbol: str, timeframe_str: str) -> int | None:
+        record = self._record(symbol, timeframe_str, 0)
+        return int(record['time']) if record is not None else None
+
+    def last_time(self, symbol: str, timeframe_str: str) -> int | None:
+        record = self._record(symbol, timeframe_str, -1)
+        return int(record['time']) if record is not None else None
+
+    def append(self, symbol: str, timeframe_str: str, bars: np.ndarray) -> int:
+        """
+        Appends candles at or after the last stored one. The last stored candle is
+        rewritten when it comes back from the terminal, since it may have been partial.
+        Returns the number of records written.
+        """
+        if len(bars) == 0:
+            return 0
+        path = self.path(symbol, timeframe_str)
+        count = self.count(symbol, timeframe_str)
+        last = self.last_time(symbol, timeframe_str)
+
+        if last is not None:
+            bars = bars[bars['time'] >= last]
+            if len(bars) and bars['time'][0] == last:
+                count -= 1
+        if len(bars) == 0:
+            return 0
+
+        with open(path, 'ab') as f:
+            f.truncate(count * BAR_DTYPE.itemsize)
+            f.write(np.ascontiguousarray(bars, dtype=BAR_DTYPE).tobytes())
+        return len(bars)
+
+    def write(self, symbol: str, timeframe_str: str, bars: np.ndarray):
+        """Rewrites the whole file atomically (write a temp file, then rename over the old one)."""
+        path = self.path(symbol, timeframe_str)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(np.ascontiguousarray(bars, dtype=BAR_DTYPE).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def merge(self, symbol: str, timeframe_str: str, bars: np.ndarray):
+        """
+        Re-sync path: merges `bars` into the stored candles anywhere in the history,
+        with the new records winning on equal timestamps.
+        """
+        if len(bars) == 0:
+            return
+        path = self.path(symbol, timeframe_str)
+        stored = np.fromfile(path, dtype=BAR_DTYPE) if os.path.isfile(path) else np.empty(0, dtype=BAR_DTYPE)
+        combined = np.concatenate([stored, np.asarray(bars, dtype=BAR_DTYPE)])[::-1]
+        _, first = np.unique(combined['time'], return_index=True)
+        self.write(symbol, timeframe_str, combined[first])
+
+    def prepend(self, symbol: str, timeframe_str: str, source_timeframe_str: str, block_records: int = 1 << 16):
+        """
+        Moves the candles of another series (a staging download) that are older than the
+        first stored one in front of the stored candles. Both files are streamed into the new
+        one block by block, so the history never has to fit in memory. The source is removed.
+        """
+        source = self.path(symbol, source_timeframe_str)
+        if not os.path.isfile(source):
+            return
+        first = self.first_time(symbol, timeframe_str)
+        source_times = self.read(symbol, source_timeframe_str)['time']
+        keep = len(source_times) if first is None else int(np.searchsorted(source_times, first, side='left'))
+        del source_times  # release the memory map before the file is removed
+
+        path = self.path(symbol, timeframe_str)
+        tmp_path = f"{path}.tmp"
+        block_size = block_records * BAR_DTYPE.itemsize
+        with open(tmp_path, 'wb') as out:
+            with open(source, 'rb') as f:
+                remaining = keep * BAR_DTYPE.itemsize
+                while remaining > 0:
+                    block = f.read(min(remaining, block_size))
+                    if not block:
+                        break
+                    out.write(block)
+                    remaining -= len(block)
+            if os.path.isfile(path):
+                with open(path, 'rb') as f:
+                    shutil.copyfileobj(f, out, block_size)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, path)
+        os.remove(source)
+
+    def window(self, symbol: str, timeframe_str: str, limit: int) -> np.ndarray:
+        """The most recent `limit` stored candles."""
+        return self.read(symbol, timeframe_str)[-limit:]
+
+    def range(self, symbol: str, timeframe_str: str, start: int, end: int | None = None) -> np.ndarray:
+        """Stored candles with start <= time (< end), located by binary search."""
+        bars = self.read(symbol, timeframe_str)
+        lo = np.searchsorted(bars['time'], start, side='left')
+        hi = len(bars) if end is None else np.searchsorted(bars['time'], end, side='left')
+        return bars[lo:hi]
+
+    def find_gaps(self, symbol: str, timeframe_str: str) -> list[tuple[int, int]]:
+        """
+        Returns (last_time_before, first_time_after) pairs where candles are missing.
+        Weekend closures (a gap covering a Saturday, shorter than three days) are not gaps.
+        """
+        times = self.read(symbol, timeframe_str)['time']
+        if len(times) < 2:
+            return []
+        deltas = np.diff(times)
+        suspects = np.nonzero(deltas > BAR_SECONDS[timeframe_str])[0]
+
+        # Count Saturdays in (start_day, end_day]; 1970-01-01 was a Thursday.
+        start_day = times[suspects] // 86400
+        end_day = times[suspects + 1] // 86400
+        saturdays = (end_day - 2) // 7 - (start_day - 2) // 7
+        weekend = (saturdays > 0) & (deltas[suspects] < WEEKEND_SECONDS)
+
+        return [(int(times[i]), int(times[i + 1])) for i in suspects[~weekend]]
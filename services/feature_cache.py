@@ -0,0 +1,136 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from services.indicator_service import IndicatorService
+
+
+class _Entry:
+    def __init__(self):
+        self.done = threading.Event()
+        self.frame = None
+        self.spans = {}  # column -> (first valid row, end of the valid rows, no NaN in between)
+        self.nbytes = 0
+
+
+class FeatureCache:
+    """
+    Computes the indicator frame of a symbol/timeframe once and shares it between every
+    strategy (model or heuristic) that reads it. Entries are keyed by (symbol, timeframe,
+    last candle time, window length): a new candle means a new key, so no explicit
+    invalidation is needed, and the window length is part of the key because the EMA seeds
+    depend on it. Concurrent requests for a key that is still being computed wait for it.
+
+    The stored frame keeps its warm-up rows and is read-only (writes raise ValueError).
+    view() hands each consumer a zero-copy slice starting at the first row where the columns
+    *it* reads are all set, instead of a blanket dropna copy per consumer. The least recently
+    used entries are evicted once the frames take more than `max_bytes`.
+
+    BacktestService uses it to compare several models on the same candles (`python -m
+    services.backtest_service SYMBOL --model a.pkl b.pkl`): the indicators are computed once and
+    each model reads its own view. The live scheduler does not use it: IncrementalIndicatorService
+    already keeps the frame of each symbol, and each H1 frame has a single consumer there.
+    """
+    def __init__(self, max_bytes: int = 256 * 2**20, indicator_svc: IndicatorService | None = None):
+        self.max_bytes = max_bytes
+        self.indicator_svc = indicator_svc or IndicatorService()
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, symbol: str, timeframe: str, market_df: pd.DataFrame, compute=None) -> pd.DataFrame | None:
+        """
+        The full read-only indicator frame for `market_df`, computed on the first request with
+        `compute(market_df)` (add_all_indicators without its dropna by default).
+        """
+        entry = self._entry(symbol, timeframe, market_df, compute)
+        return entry.frame if entry is not None else None
+
+    def view(self, symbol: str, timeframe: str, market_df: pd.DataFrame, columns=None, compute=None) -> pd.DataFrame | None:
+        """
+        The rows of the shared frame where every one of `columns` (all columns by default) is
+        set, like dropna() restricted to what the consumer reads. A contiguous run of such rows,
+        the normal case of leading warm-up and trailing chikou rows, is returned as a view.
+        """
+        entry = self._entry(symbol, timeframe, market_df, compute)
+        if entry is None:
+            return None
+        frame = entry.frame
+        columns = list(frame.columns) if columns is None else list(columns)
+        spans = [entry.spans[col] for col in columns]
+        start = max((first for first, _, _ in spans), default=0)
+        end = min((stop for _, stop, _ in spans), default=len(frame))
+        if all(contiguous for _, _, contiguous in spans):
+            return frame.iloc[start:max(start, end)]
+        return frame[frame[columns].notna().all(axis=1)]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.nbytes = 0
+
+    def _entry(self, symbol: str, timeframe: str, market_df: pd.DataFrame, compute) -> _Entry | None:
+        if market_df is None or market_df.empty:
+            return None
+        key = (symbol, timeframe, market_df.index[-1], len(market_df))
+        with self.lock:
+            entry = self.entries.get(key)
+            is_owner = entry is None
+            if is_owner:
+                entry = self.entries[key] = _Entry()
+                self.misses += 1
+            else:
+                self.entries.move_to_end(key)
+                self.hits += 1
+        if not is_owner:
+            entry.done.wait()
+            return entry if entry.frame is not None else None
+
+        try:
+            frame = compute(market_df) if compute is not None else self.indicator_svc.add_all_indicators(market_df, dropna=False)
+            if frame is not None and not frame.empty:
+                self._freeze(entry, frame)
+        except Exception as e:
+            print(f"FeatureCache: Computing features for {symbol} {timeframe} failed: {e}")
+        finally:
+            with self.lock:
+                if entry.frame is None:
+                    if self.entries.get(key) is entry:
+                        del self.entries[key]
+                else:
+                    self.nbytes += entry.nbytes
+                    self._evict()
+            entry.done.set()
+        return entry if entry.frame is not None else None
+
+    @staticmethod
+    def _freeze(entry: _Entry, frame: pd.DataFrame):
+        """Stores a read-only copy of `frame` (one array per column) and where each column is valid."""
+        data = {}
+        for col in frame.columns:
+            values = np.array(frame[col].to_numpy(), copy=True)
+            values.flags.writeable = False
+            data[col] = values
+            valid = ~pd.isna(values)
+            if not valid.any():
+                entry.spans[col] = (len(values), 0, True)
+                continue
+            first = int(valid.argmax())
+            stop = len(values) - int(valid[::-1].argmax())
+            entry.spans[col] = (first, stop, bool(valid[first:stop].all()))
+        entry.frame = pd.DataFrame(data, index=frame.index, copy=False)
+        entry.nbytes = int(entry.frame.memory_usage(index=True).sum())
+
+    def _evict(self):
+        # Entries still being computed have no size yet and are skipped; the newest entry always stays.
+        for key in list(self.entries)[:-1]:
+            if self.nbytes <= self.max_bytes:
+                break
+            entry = self.entries[key]
+            if entry.done.is_set():
+                del self.entries[key]
+                self.nbytes -= entry.nbytes
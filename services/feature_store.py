@@ -0,0 +1,130 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+# Prices and the ATR stay float64 so the TP/SL levels computed from them (price +/- k * ATR in
+# target labeling and the heuristics) are the same as on the original frame.
+PRICE_COLUMNS = ('open', 'high', 'low', 'close')
+ATR_PREFIX = 'ATRr_'
+
+
+class FeatureStore:
+    """
+    Columnar on-disk store for feature frames. Each dataset is a directory with one raw
+    binary file per column (float32 for features, float64 for prices and ATR, int32 for integer
+    columns such as the squeeze flags and the target) plus `schema.json`, which lists the
+    columns, their dtypes and the number of committed rows.
+
+    Columns are memory-mapped, so loading is zero-copy and only the projected columns are
+    read. Appends write the new rows to the column files first and then commit the new row
+    count to the schema, so an interrupted append is simply ignored by readers.
+    XGBoost converts its input to float32 anyway, so float32 features give the same predictions.
+    """
+    def __init__(self, root: str = 'data/features'):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def exists(self, name: str) -> bool:
+        return os.path.isfile(os.path.join(self.path(name), 'schema.json'))
+
+    def schema(self, name: str) -> dict:
+        with open(os.path.join(self.path(name), 'schema.json'), 'r') as f:
+            return json.load(f)
+
+    def write(self, name: str, df: pd.DataFrame):
+        """Replaces the dataset with `df` (DatetimeIndex, numeric columns)."""
+        directory = self.path(name)
+        os.makedirs(directory, exist_ok=True)
+        columns = {col: self._storage_dtype(col, df[col]) for col in df.columns}
+        schema = {"index": df.index.name or 'time', "columns": columns, "rows": 0}
+        for file_name in os.listdir(directory):
+            if file_name.endswith('.bin'):
+                os.remove(os.path.join(directory, file_name))
+        self._write_schema(name, schema)
+        self.append(name, df)
+        print(f"FeatureStore: Wrote {len(df)} rows x {len(columns)} columns to '{directory}'.")
+
+    def append(self, name: str, df: pd.DataFrame) -> int:
+        """Appends the rows of `df` newer than the last stored row; returns how many were written."""
+        schema = self.schema(name)
+        rows = schema['rows']
+        if rows:
+            last_time = self._column(name, '__time__', '<i8', rows)[-1]
+            df = df[self._index_ns(df.index) > last_time]
+        if df.empty:
+            return 0
+
+        missing = set(schema['columns']) - set(df.columns)
+        if missing:
+            raise ValueError(f"Cannot append to '{name}': missing columns {sorted(missing)}.")
+
+        arrays = {'__time__': (self._index_ns(df.index), '<i8')}
+        arrays.update({col: (df[col].to_numpy(), dtype) for col, dtype in schema['columns'].items()})
+        for col, (values, dtype) in arrays.items():
+            with open(self._file(name, col), 'ab') as f:
+                # Drop whatever an interrupted append left after the committed rows.
+                f.truncate(rows * np.dtype(dtype).itemsize)
+                f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+
+        schema['rows'] = rows + len(df)
+        self._write_schema(name, schema)
+        return len(df)
+
+    def load(self, name: str, columns: list | None = None, start: int = 0, stop: int | None = None) -> pd.DataFrame:
+        """
+        Returns rows [start, stop) of the dataset as a DataFrame backed by read-only memory
+        maps, restricted to `columns` (all columns by default). Negative bounds count from the end.
+        """
+        schema = self.schema(name)
+        rows = schema['rows']
+        columns = list(schema['columns']) if columns is None else list(columns)
+        missing = [col for col in columns if col not in schema['columns']]
+        if missing:
+            raise KeyError(f"Columns {missing} are not in feature store '{name}'.")
+
+        window = slice(*slice(start, stop).indices(rows)[:2])
+        data = {col: self._column(name, col, schema['columns'][col], rows)[window] for col in columns}
+        index = pd.to_datetime(self._column(name, '__time__', '<i8', rows)[window], utc=True)
+        index.name = schema['index']
+        return pd.DataFrame(data, index=index, copy=False)
+
+    def tail(self, name: str, n: int, columns: list | None = None) -> pd.DataFrame:
+        return self.load(name, columns, start=-n)
+
+    # --- Internals ---
+
+    def _file(self, name: str, column: str) -> str:
+        return os.path.join(self.path(name), f"{column}.bin")
+
+    def _column(self, name: str, column: str, dtype: str, rows: int) -> np.ndarray:
+        if rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._file(name, column), dtype=dtype, mode='r', shape=(rows,))
+
+    def _write_schema(self, name: str, schema: dict):
+        schema_file = os.path.join(self.path(name), 'schema.json')
+        tmp_file = f"{schema_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(schema, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, schema_file)
+
+    @staticmethod
+    def _storage_dtype(column: str, series: pd.Series) -> str:
+        if column in PRICE_COLUMNS or column.startswith(ATR_PREFIX):
+            return '<f8'
+        if pd.api.types.is_integer_dtype(series) or pd.api.types.is_bool_dtype(series):
+            return '<i4'
+        return '<f4'
+
+    @staticmethod
+    def _index_ns(index: pd.DatetimeIndex) -> np.ndarray:
+        index = pd.DatetimeIndex(index)
+        if index.tz is not None:
+            index = index.tz_convert('UTC').tz_localize(None)
+        return index.asi8
@@ -0,0 +1,184 @@
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from services.bar_store import BAR_DTYPE, bars_to_frame, frame_to_bars
+
+
+def _fleet_worker(worker_id: int, task_queue, result_queue, fast_inference: bool, model_pattern: str):
+    """
+    Worker process: keeps the incremental indicator state and warm models of its own shard of
+    symbols, and turns the candles it is handed into an H1 bias result. It never talks to the
+    terminal, the state files, the journal or Telegram; the coordinator does all of that.
+    """
+    from services.heuristic_service import HeuristicService
+    from services.incremental_indicator_service import IncrementalIndicatorService
+    from services.model_registry import ModelRegistry
+
+    incremental_svc = IncrementalIndicatorService()
+    model_registry = ModelRegistry(fast_inference=fast_inference)
+    heuristic_svc = HeuristicService()
+    segments = {}  # shared memory name -> SharedMemory, attached once
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        started = time.perf_counter()
+        symbol = task['symbol']
+        reply = {"cycle": task['cycle'], "symbol": symbol, "worker": worker_id, "prediction": 0,
+                 "result": {"status": "hold"}, "error": None}
+        try:
+            segment = segments.get(task['segment'])
+            if segment is None:
+                segment = segments[task['segment']] = shared_memory.SharedMemory(name=task['segment'])
+            # Copy out of the segment: the coordinator reuses it for the next cycle.
+            bars = np.ndarray(task['rows'], dtype=BAR_DTYPE, buffer=segment.buf).copy()
+            analysis_df_h1 = incremental_svc.update(symbol, 'H1', bars_to_frame(bars))
+            if analysis_df_h1 is not None and not analysis_df_h1.empty:
+                model_file = model_pattern.format(symbol=symbol.lower())
+                reply['prediction'] = model_registry.get_latest_predictions({model_file: {symbol: analysis_df_h1}})[symbol]
+                reply['result'] = heuristic_svc.generate_bias(reply['prediction'], analysis_df_h1, 'H1')
+        except Exception as e:
+            reply['error'] = str(e)
+        reply['seconds'] = time.perf_counter() - started
+        result_queue.put(reply)
+
+    for segment in segments.values():
+        segment.close()
+
+
+class FleetService:
+    """
+    Fleet mode: the H1 feature, model and heuristic work is sharded across worker processes so
+    it is not capped at one core. The coordinator (the main process) keeps the only MT5
+    connection: it fetches each symbol's candles, writes them into that symbol's shared memory
+    block and queues a small task to the worker that owns the symbol. Workers send back the
+    prediction and bias result on one result queue, and the coordinator applies the state
+    transitions and alerts as in single-process mode.
+
+    Symbols stay on the same worker so its incremental indicator state is reused every hour.
+    Fetching is pipelined with the workers: a symbol is dispatched as soon as its candles are in.
+    """
+    def __init__(self, data_svc, n_workers: int, fast_inference: bool = False, limit: int = 1000,
+                 task_timeout: float = 45.0, metrics=None, model_pattern: str = "models/{symbol}_h1.pkl"):
+        self.data_svc = data_svc
+        self.n_workers = n_workers
+        self.fast_inference = fast_inference
+        self.model_pattern = model_pattern
+        self.limit = limit
+        self.task_timeout = task_timeout
+        self.metrics = metrics
+        # Spawned, not forked: the coordinator runs threads (tick monitor, Telegram outbox) and MT5 is Windows-only.
+        self.context = mp.get_context('spawn')
+        self.result_queue = self.context.Queue()
+        self.task_queues = []
+        self.workers = []
+        self.assignments = {}  # symbol -> worker index
+        self.segments = {}     # symbol -> SharedMemory holding up to `limit` candles
+        self.outstanding = {}  # symbol -> cycle of a task that has not answered yet
+        self.cycle = 0
+
+    def start(self):
+        for worker_id in range(self.n_workers):
+            self.task_queues.append(self.context.Queue())
+            self.workers.append(None)
+            self._start_worker(worker_id)
+        print(f"FleetService: Started {self.n_workers} worker processes.")
+
+    def _start_worker(self, worker_id: int):
+        worker = self.context.Process(target=_fleet_worker, name=f"fleet-{worker_id}", daemon=True,
+                                      args=(worker_id, self.task_queues[worker_id], self.result_queue, self.fast_inference,
+                                            self.model_pattern))
+        worker.start()
+        self.workers[worker_id] = worker
+
+    def worker_for(self, symbol: str) -> int:
+        """The worker that owns `symbol`; new symbols go to the worker with the fewest."""
+        if symbol not in self.assignments:
+            loads = [0] * self.n_workers
+            for worker_id in self.assignments.values():
+                loads[worker_id] += 1
+            self.assignments[symbol] = loads.index(min(loads))
+        return self.assignments[symbol]
+
+    def run_h1_bias(self, symbols: list, is_startup_run: bool = False) -> dict:
+        """
+        Fetches the H1 candles of every symbol and has the workers compute its bias. Returns
+        {symbol: (prediction, heuristic result)} for the symbols that answered in time.
+        """
+        self.cycle += 1
+        self._restart_dead_workers()
+        dispatched = set()
+        for symbol in symbols:
+            if symbol in self.outstanding:
+                print(f"FleetService: {symbol} is still running from an earlier cycle. Skipping.")
+                continue
+            market_df_h1 = self.data_svc.get_market_data(symbol=symbol, timeframe_str='H1', limit=self.limit,
+                                                          is_startup_run=is_startup_run)
+            if market_df_h1 is None or market_df_h1.empty:
+                continue
+            bars = frame_to_bars(market_df_h1)[-self.limit:]
+            segment = self._segment(symbol)
+            np.ndarray(len(bars), dtype=BAR_DTYPE, buffer=segment.buf)[:] = bars
+            self.task_queues[self.worker_for(symbol)].put({"cycle": self.cycle, "symbol": symbol, "segment": segment.name, "rows": len(bars)})
+            self.outstanding[symbol] = self.cycle
+            dispatched.add(symbol)
+
+        results = {}
+        deadline = time.monotonic() + self.task_timeout
+        while dispatched - set(results) and time.monotonic() < deadline:
+            try:
+                reply = self.result_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            symbol = reply['symbol']
+            if self.outstanding.get(symbol) == reply['cycle']:
+                del self.outstanding[symbol]
+            if self.metrics is not None:
+                self.metrics.record("fleet.H1 bias", symbol, reply['seconds'], error=reply['error'] is not None)
+            if reply['cycle'] != self.cycle:
+                continue  # a late answer from a cycle that already moved on
+            if reply['error'] is not None:
+                print(f"FleetService: H1 bias for {symbol} failed on worker {reply['worker']}: {reply['error']}")
+                results[symbol] = None
+            else:
+                results[symbol] = (reply['prediction'], reply['result'])
+
+        for symbol in dispatched - set(results):
+            print(f"FleetService: H1 bias for {symbol} timed out after {self.task_timeout:g}s. Moving on.")
+        return {symbol: result for symbol, result in results.items() if result is not None}
+
+    def _segment(self, symbol: str) -> shared_memory.SharedMemory:
+        segment = self.segments.get(symbol)
+        if segment is None:
+            segment = self.segments[symbol] = shared_memory.SharedMemory(create=True, size=self.limit * BAR_DTYPE.itemsize)
+        return segment
+
+    def _restart_dead_workers(self):
+        for worker_id, worker in enumerate(self.workers):
+            if not worker.is_alive():
+                print(f"FleetService: Worker {worker_id} exited with code {worker.exitcode}. Restarting it.")
+                # Its tasks will never be answered; the new worker re-seeds the indicator state.
+                for symbol in [s for s, w in self.assignments.items() if w == worker_id]:
+                    self.outstanding.pop(symbol, None)
+                # A process killed while reading its queue can leave the queue locked; start on a fresh one.
+                self.task_queues[worker_id] = self.context.Queue()
+                self._start_worker(worker_id)
+
+    def shutdown(self, timeout: float = 10.0):
+        for task_queue in self.task_queues:
+            task_queue.put(None)
+        deadline = time.monotonic() + timeout
+        for worker in self.workers:
+            worker.join(max(deadline - time.monotonic(), 0))
+            if worker.is_alive():
+                worker.terminate()
+        for segment in self.segments.values():
+            segment.close()
+            segment.unlink()
+        self.segments = {}
+        print("FleetService: Workers stopped.")
@@ -1,9 +1,24 @@
+import numpy as np
 import pandas as pd
 
+# The feature columns the heuristics read.
+HEURISTIC_COLUMNS = ['close', 'EMA_21', 'EMA_50', 'ATRr_14']
+
 class HeuristicService:
-    def __init__(self):
+    def __init__(self, sl_multiplier: float | None = None, tp1_multiplier: float | None = None):
+        # None keeps the per-timeframe defaults; the parameter sweep overrides them.
+        self.sl_multiplier = sl_multiplier
+        self.tp1_multiplier = tp1_multiplier
         print("HeuristicService: Initialized with Generic MTF Logic.")
 
+    def multipliers(self, timeframe: str) -> tuple[float, float]:
+        """The (sl_multiplier, tp1_multiplier) pair used for `timeframe`."""
+        sl_multiplier = 1.5 if timeframe.upper() == 'H1' else 2.0
+        tp1_multiplier = 2.0 if timeframe.upper() == 'H1' else 2.0
+        if self.sl_multiplier is not None: sl_multiplier = self.sl_multiplier
+        if self.tp1_multiplier is not None: tp1_multiplier = self.tp1_multiplier
+        return sl_multiplier, tp1_multiplier
+
     def generate_bias(self, prediction: int, df: pd.DataFrame, timeframe: str) -> dict:
         if df is None or df.empty or prediction == 0:
             return {"status": "hold"}
@@ -18,8 +33,7 @@ class HeuristicService:
         atr_value = latest_candle['ATRr_14']
         pullback_level = latest_candle['EMA_21']
         
-        sl_multiplier = 1.5 if timeframe.upper() == 'H1' else 2.0
-        tp1_multiplier = 2.0 if timeframe.upper() == 'H1' else 2.0
+        sl_multiplier, tp1_multiplier = self.multipliers(timeframe)
 
         if prediction == 1:
             decision = "BUY"
@@ -51,4 +65,57 @@ class HeuristicService:
         elif bias == "SELL":
             is_bearish_engulfing = (last_candle['close'] < last_candle['open'] and last_candle['open'] > df.iloc[-2]['close'] and last_candle['close'] < df.iloc[-2]['open'])
             if is_bearish_engulfing: return True
-        return False
\ No newline at end of file
+        return False
+
+    # --- Vectorized counterparts: every row at once, matching the scalar rules row for row ---
+
+    def generate_biases(self, predictions, df: pd.DataFrame, timeframe: str) -> pd.DataFrame:
+        """
+        generate_bias for every row of `df`, row i scored with predictions[i] as if it were the
+        latest candle. Returns a frame on df's index with 'status' ('hold', 'veto' or 'success')
+        and, for successful rows, 'bias' and the pullback_level, sl and tp1-3 levels (NaN otherwise).
+        """
+        predictions = np.asarray(predictions)
+        close = df['close'].to_numpy(dtype=float)
+        ema_50 = df['EMA_50'].to_numpy(dtype=float)
+        atr_value = df['ATRr_14'].to_numpy(dtype=float)
+        pullback_level = df['EMA_21'].to_numpy(dtype=float)
+
+        sl_multiplier, tp1_multiplier = self.multipliers(timeframe)
+
+        is_buy = predictions == 1
+        veto = (is_buy & (close < ema_50)) | ((predictions == -1) & (close > ema_50))
+        status = np.where(predictions == 0, "hold", np.where(veto, "veto", "success"))
+        success = status == "success"
+        # Anything but 1 is treated as SELL, as in generate_bias.
+        direction = np.where(is_buy, 1.0, -1.0)
+
+        def level(offset: np.ndarray) -> np.ndarray:
+            return np.where(success, np.round(pullback_level + direction * offset, 5), np.nan)
+
+        return pd.DataFrame({
+            "status": status,
+            "bias": np.where(success, np.where(is_buy, "BUY", "SELL"), None),
+            "pullback_level": np.where(success, np.round(pullback_level, 5), np.nan),
+            "sl": level(-(sl_multiplier * atr_value)),
+            "tp1": level(tp1_multiplier * atr_value),
+            "tp2": level(2 * tp1_multiplier * atr_value),
+            "tp3": level(3 * tp1_multiplier * atr_value),
+        }, index=df.index)
+
+    def confirm_entries(self, df: pd.DataFrame, bias) -> pd.Series:
+        """
+        confirm_entry for every row of `df` against the row before it: True where the candle is
+        a bullish (for BUY) or bearish (for SELL) engulfing one. `bias` is one value for all rows
+        or one per row. The first row has no previous candle and is never confirmed.
+        """
+        if df is None or len(df) < 2:
+            return pd.Series(False, index=None if df is None else df.index, name='confirmed')
+        open_, close = df['open'].to_numpy(), df['close'].to_numpy()
+        prev_open, prev_close = np.r_[np.nan, open_[:-1]], np.r_[np.nan, close[:-1]]
+        bias = np.asarray(bias)
+
+        bullish_engulfing = (close > open_) & (open_ < prev_close) & (close > prev_open)
+        bearish_engulfing = (close < open_) & (open_ > prev_close) & (close < prev_open)
+        confirmed = ((bias == "BUY") & bullish_engulfing) | ((bias == "SELL") & bearish_engulfing)
+        return pd.Series(confirmed, index=df.index, name='confirmed')
@@ -0,0 +1,252 @@
+import argparse
+import hashlib
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.metrics import f1_score
+from sklearn.model_selection import ParameterGrid
+
+from services.feature_store import FeatureStore
+
+NON_FEATURE_COLUMNS = ['open', 'high', 'low', 'close', 'volume', 'target']
+
+DEFAULT_PARAM_GRID = {
+    'n_estimators': [200, 500],
+    'learning_rate': [0.01, 0.05],
+    'max_depth': [3, 5],
+    'gamma': [1, 5],
+    'reg_lambda': [5, 10],
+    'subsample': [0.7, 0.9],
+    'colsample_bytree': [0.7, 0.9]
+}
+
+# Memory-mapped matrices opened once per worker process.
+_worker_data = {}
+
+
+def _init_worker(cache_dir: str):
+    _worker_data['X'] = np.load(os.path.join(cache_dir, 'features.npy'), mmap_mode='r')
+    _worker_data['y'] = np.load(os.path.join(cache_dir, 'target.npy'), mmap_mode='r')
+
+
+def _evaluate(params: dict, train_end: int, valid_start: int, valid_end: int, n_threads: int) -> float:
+    """Fits one candidate on rows [0, train_end) and returns its weighted F1 on [valid_start, valid_end)."""
+    X, y = _worker_data['X'], _worker_data['y']
+    model = xgb.XGBClassifier(objective='multi:softprob', num_class=3, eval_metric='mlogloss',
+                              n_jobs=n_threads, **params)
+    model.fit(X[:train_end], y[:train_end])
+    y_pred = model.predict(X[valid_start:valid_end])
+    return float(f1_score(y[valid_start:valid_end], y_pred, average='weighted', zero_division=0))
+
+
+class HyperparameterSearchService:
+    """
+    Walk-forward hyperparameter search for the XGBoost models. The labeled CSV is parsed once
+    into .npy matrices that every worker memory-maps; candidates are scored on time-ordered
+    expanding-window folds (training data always precedes validation data, separated by a gap
+    of at least the labeling lookahead) and raced with successive halving, so only the best
+    1/eta of the candidates go on to the next, larger set of folds. Every fold score is appended
+    to a checkpoint file, and a resumed search skips what is already there. The checkpoint starts
+    with the fold boundaries and a fingerprint of the matrix; a run with other folds (n_splits,
+    gap, data window) or another matrix starts over instead of reusing scores of different folds.
+    """
+    def __init__(self, cache_dir: str, n_splits: int = 5, gap: int = 40, eta: int = 3,
+                 max_workers: int | None = None, threads_per_worker: int = 1):
+        self.cache_dir = cache_dir
+        self.n_splits = n_splits
+        # Labels look `lookahead_candles` into the future; drop that many rows between train and validation.
+        self.gap = gap
+        self.eta = eta
+        self.max_workers = max_workers or os.cpu_count()
+        self.threads_per_worker = threads_per_worker
+        self.checkpoint_file = os.path.join(cache_dir, 'search_checkpoint.jsonl')
+
+    def build_matrix(self, data_path: str, holdout_fraction: float = 0.3) -> list:
+        """
+        Writes the feature matrix (float32) and target (-1 mapped to 2) for the part of the data
+        before the holdout, and the same for the holdout, unless the cache is already up to date.
+        `data_path` is a labeled CSV or a FeatureStore dataset directory. Returns the feature names.
+        """
+        meta_file = os.path.join(self.cache_dir, 'matrix.json')
+        is_store = os.path.isfile(os.path.join(data_path, 'schema.json'))
+        source_file = os.path.join(data_path, 'schema.json') if is_store else data_path
+        source = {"data_path": os.path.abspath(data_path), "mtime": os.path.getmtime(source_file),
+                  "holdout_fraction": holdout_fraction}
+        try:
+            with open(meta_file, 'r') as f:
+                meta = json.load(f)
+            if meta['source'] == source and os.path.exists(os.path.join(self.cache_dir, 'holdout_target.npy')):
+                print(f"HyperparameterSearchService: Using cached matrix in '{self.cache_dir}'.")
+                return meta['features']
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            pass
+
+        print(f"HyperparameterSearchService: Building matrix from '{data_path}'...")
+        if is_store:
+            df = FeatureStore(os.path.dirname(os.path.abspath(data_path))).load(os.path.basename(os.path.normpath(data_path)))
+        else:
+            df = pd.read_csv(data_path, index_col='time', parse_dates=True)
+        df = df.dropna()
+        split = int(len(df) * (1 - holdout_fraction))
+        features = [col for col in df.columns if col not in NON_FEATURE_COLUMNS]
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        for prefix, part in (('', df.iloc[:split]), ('holdout_', df.iloc[split:])):
+            np.save(os.path.join(self.cache_dir, f'{prefix}features.npy'), part[features].to_numpy(dtype=np.float32))
+            np.save(os.path.join(self.cache_dir, f'{prefix}target.npy'), part['target'].replace({-1: 2}).to_numpy(dtype=np.int32))
+        with open(meta_file, 'w') as f:
+            json.dump({"source": source, "features": features, "rows": split, "holdout_rows": len(df) - split}, f, indent=2)
+        # Scores from an older matrix are not comparable.
+        if os.path.exists(self.checkpoint_file):
+            os.remove(self.checkpoint_file)
+        return features
+
+    def load_matrix(self, holdout: bool = False) -> tuple[np.ndarray, np.ndarray]:
+        """The cached features and target (memory-mapped, target with -1 mapped to 2); the holdout part with `holdout`."""
+        prefix = 'holdout_' if holdout else ''
+        return (np.load(os.path.join(self.cache_dir, f'{prefix}features.npy'), mmap_mode='r'),
+                np.load(os.path.join(self.cache_dir, f'{prefix}target.npy'), mmap_mode='r'))
+
+    def walk_forward_splits(self, n_rows: int) -> list:
+        """
+        Expanding-window folds as (train_end, valid_start, valid_end): the data is cut into
+        n_splits + 1 blocks and fold k trains on blocks 0..k and validates on block k + 1.
+        """
+        block = n_rows // (self.n_splits + 1)
+        splits = []
+        for k in range(1, self.n_splits + 1):
+            train_end = block * k
+            valid_end = n_rows if k == self.n_splits else block * (k + 1)
+            if train_end + self.gap < valid_end:
+                splits.append((train_end, train_end + self.gap, valid_end))
+        return splits
+
+    def search(self, param_grid: dict | None = None) -> pd.DataFrame:
+        """
+        Runs successive halving over the grid. Rung r scores the surviving candidates on the
+        earliest eta**r folds (all folds in the last rung): the early folds train on the fewest
+        rows, so the many candidates of the first rung get the cheapest fits and only the
+        survivors reach the larger training windows. Returns every candidate's mean
+        score on the folds it reached, best first.
+        """
+        candidates = [dict(sorted(p.items())) for p in ParameterGrid(param_grid or DEFAULT_PARAM_GRID)]
+        n_rows = np.load(os.path.join(self.cache_dir, 'target.npy'), mmap_mode='r').shape[0]
+        splits = self.walk_forward_splits(n_rows)
+        scores = self._load_checkpoint(self._checkpoint_meta(splits))
+
+        n_rungs = max(int(math.ceil(math.log(len(splits), self.eta))), 0) + 1
+        print(f"HyperparameterSearchService: {len(candidates)} candidates, {len(splits)} folds, {n_rungs} rungs, "
+              f"{self.max_workers} workers ({len(scores)} fold scores restored).")
+
+        survivors = candidates
+        with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker, initargs=(self.cache_dir,)) as pool:
+            for rung in range(n_rungs):
+                folds = self.rung_folds(rung, len(splits))
+                self._run_rung(pool, survivors, folds, splits, scores)
+                ranked = sorted(survivors, key=lambda p: self._mean_score(scores, p, folds), reverse=True)
+                print(f"HyperparameterSearchService: Rung {rung + 1}/{n_rungs} on {len(folds)} fold(s): "
+                      f"best {self._mean_score(scores, ranked[0], folds):.4f} {ranked[0]}")
+                if rung < n_rungs - 1:
+                    survivors = ranked[:max(len(ranked) // self.eta, 1)]
+
+        rows = []
+        for params in candidates:
+            reached = [k for k in range(len(splits)) if (self._key(params), k) in scores]
+            rows.append({**params, "mean_f1_weighted": self._mean_score(scores, params, reached), "folds": len(reached)})
+        return pd.DataFrame(rows).sort_values(["folds", "mean_f1_weighted"], ascending=False).reset_index(drop=True)
+
+    def rung_folds(self, rung: int, n_folds: int) -> list:
+        """The folds rung `rung` scores on: the earliest (smallest) eta**rung of them."""
+        return list(range(min(self.eta ** rung, n_folds)))
+
+    def _run_rung(self, pool, candidates: list, folds: list, splits: list, scores: dict):
+        jobs = {}
+        for params in candidates:
+            for k in folds:
+                if (self._key(params), k) not in scores:
+                    jobs[pool.submit(_evaluate, params, *splits[k], self.threads_per_worker)] = (params, k)
+
+        with open(self.checkpoint_file, 'a') as checkpoint:
+            for done, future in enumerate(as_completed(jobs), start=1):
+                params, k = jobs[future]
+                try:
+                    score = future.result()
+                except Exception as e:
+                    print(f"HyperparameterSearchService: Candidate {params} failed on fold {k}: {e}")
+                    score = float('-inf')
+                scores[(self._key(params), k)] = score
+                checkpoint.write(json.dumps({"params": params, "fold": k, "score": score}) + "\n")
+                checkpoint.flush()
+                if done % 20 == 0 or done == len(jobs):
+                    print(f"HyperparameterSearchService: {done}/{len(jobs)} fits done.")
+
+    def _checkpoint_meta(self, splits: list) -> dict:
+        return {"n_splits": self.n_splits, "gap": self.gap, "splits": [list(split) for split in splits],
+                "matrix": self._fingerprint()}
+
+    def _fingerprint(self) -> str:
+        """A hash of the cached feature matrix and target, read in blocks."""
+        digest = hashlib.sha1()
+        for name in ('features.npy', 'target.npy'):
+            with open(os.path.join(self.cache_dir, name), 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+        return digest.hexdigest()
+
+    def _load_checkpoint(self, meta: dict) -> dict:
+        """The fold scores of a checkpoint written for the same folds and matrix; any other checkpoint is discarded."""
+        scores = {}
+        try:
+            with open(self.checkpoint_file, 'r') as f:
+                try:
+                    header = json.loads(f.readline())
+                except json.JSONDecodeError:
+                    header = None
+                if not isinstance(header, dict) or header.get('meta') != meta:
+                    raise FileNotFoundError
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # a line cut short by an interruption
+                    scores[(self._key(record['params']), record['fold'])] = record['score']
+        except FileNotFoundError:
+            if os.path.exists(self.checkpoint_file):
+                print("HyperparameterSearchService: Checkpoint is for other folds or another matrix. Starting over.")
+            with open(self.checkpoint_file, 'w') as f:
+                f.write(json.dumps({"meta": meta}) + "\n")
+        return scores
+
+    @staticmethod
+    def _key(params: dict) -> str:
+        return json.dumps(params, sort_keys=True)
+
+    def _mean_score(self, scores: dict, params: dict, folds: list) -> float:
+        values = [scores[(self._key(params), k)] for k in folds if (self._key(params), k) in scores]
+        return float(np.mean(values)) if values else float('-inf')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Walk-forward successive-halving search over XGBoost parameters.")
+    parser.add_argument('input', help="Labeled CSV or FeatureStore dataset written by the Target Labeling notebook.")
+    parser.add_argument('--cache-dir', default=None, help="Defaults to <input>.search/.")
+    parser.add_argument('--holdout', type=float, default=0.3, help="Fraction of the newest rows kept out of the search.")
+    parser.add_argument('--splits', type=int, default=5)
+    parser.add_argument('--gap', type=int, default=40, help="Rows dropped between train and validation (labeling lookahead).")
+    parser.add_argument('--eta', type=int, default=3, help="Keep the best 1/eta candidates after each rung.")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', default=None, help="Optional CSV for the ranked results.")
+    args = parser.parse_args()
+
+    search_svc = HyperparameterSearchService(args.cache_dir or f"{os.path.splitext(os.path.normpath(args.input))[0]}.search", n_splits=args.splits,
+                                             gap=args.gap, eta=args.eta, max_workers=args.workers)
+    search_svc.build_matrix(args.input, holdout_fraction=args.holdout)
+    results = search_svc.search()
+    print(results.head(10).to_string())
+    if args.output:
+        results.to_csv(args.output, index=False)
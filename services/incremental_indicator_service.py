@@ -0,0 +1,295 @@
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from services.indicator_service import IndicatorService
+
+# Column order produced by IndicatorService.add_all_indicators (pandas_ta 0.3.14b).
+FEATURE_COLUMNS = [
+    'ichimoku_senkou_span_a', 'ichimoku_senkou_span_b', 'ichimoku_tenkan_sen',
+    'ichimoku_kijun_sen', 'ichimoku_chikou_span',
+    'EMA_21', 'EMA_50', 'SMA_200', 'RSI_14',
+    'MACD_12_26_9', 'MACDh_12_26_9', 'MACDs_12_26_9',
+    'BBL_20_2.0', 'BBM_20_2.0', 'BBU_20_2.0', 'BBB_20_2.0', 'BBP_20_2.0',
+    'ATRr_14', 'ADX_14', 'DMP_14', 'DMN_14',
+    'SQZ_20_2.0_20_1.5', 'SQZ_ON', 'SQZ_OFF', 'SQZ_NO',
+]
+INT_COLUMNS = ['SQZ_ON', 'SQZ_OFF', 'SQZ_NO']
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+TENKAN, KIJUN, SENKOU = 9, 26, 52
+
+
+class _Ewm:
+    """
+    Mirrors pandas' Series.ewm(...).mean() one observation at a time,
+    including adjust=True weighting, min_periods and NaN handling.
+    """
+    def __init__(self, alpha: float, adjust: bool, min_periods: int = 0):
+        self.old_wt_factor = 1.0 - alpha
+        self.new_wt = 1.0 if adjust else alpha
+        self.adjust = adjust
+        self.min_periods = min_periods
+        self.weighted = math.nan
+        self.old_wt = 1.0
+        self.nobs = 0
+
+    def update(self, value: float) -> float:
+        is_observation = value == value
+        self.nobs += is_observation
+        if self.weighted == self.weighted:
+            self.old_wt *= self.old_wt_factor
+            if is_observation:
+                if self.weighted != value:
+                    self.weighted = (self.old_wt * self.weighted + self.new_wt * value) / (self.old_wt + self.new_wt)
+                self.old_wt = self.old_wt + self.new_wt if self.adjust else 1.0
+        elif is_observation:
+            self.weighted = value
+        return self.weighted if self.nobs >= max(self.min_periods, 1) else math.nan
+
+
+class _Ema:
+    """pandas_ta ema(): SMA of the first `length` values, then ewm(span=length, adjust=False)."""
+    def __init__(self, length: int):
+        self.length = length
+        self.seed = []
+        self.ewm = _Ewm(alpha=2.0 / (length + 1.0), adjust=False)
+
+    def update(self, value: float) -> float:
+        if len(self.seed) < self.length:
+            self.seed.append(value)
+            if len(self.seed) < self.length:
+                return math.nan
+            value = sum(self.seed) / self.length
+        return self.ewm.update(value)
+
+
+def _rma(length: int) -> _Ewm:
+    """pandas_ta rma(): ewm(alpha=1/length, min_periods=length) with pandas' default adjust=True."""
+    return _Ewm(alpha=1.0 / length, adjust=True, min_periods=length)
+
+
+def _div(a: float, b: float) -> float:
+    """IEEE division (inf/NaN instead of ZeroDivisionError), like the vectorized pandas code."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return float(np.float64(a) / np.float64(b))
+
+
+def _window_mean(window: deque, length: int) -> float:
+    return math.fsum(window) / length if len(window) == length else math.nan
+
+
+class _IndicatorState:
+    """Recurrences and rolling windows for a single symbol/timeframe."""
+    def __init__(self, max_rows: int):
+        self.last_time = None
+        self.prev = None  # (high, low, close) of the previous bar
+        self.highs = deque(maxlen=SENKOU)
+        self.lows = deque(maxlen=SENKOU)
+        self.closes = deque(maxlen=200)
+        self.true_ranges = deque(maxlen=20)
+        self.moms = deque(maxlen=6)
+        self.spans = deque(maxlen=KIJUN + 1)  # unshifted (span_a, span_b)
+
+        self.ema21, self.ema50 = _Ema(21), _Ema(50)
+        self.ema12, self.ema26, self.macd_signal = _Ema(12), _Ema(26), _Ema(9)
+        self.rsi_pos, self.rsi_neg = _rma(14), _rma(14)
+        self.atr = _rma(14)
+        self.dm_pos, self.dm_neg, self.adx = _rma(14), _rma(14), _rma(14)
+
+        # Rows wait here until the close KIJUN bars later (the chikou span) is known.
+        self.pending = deque()
+
+        # Completed rows live in a buffer twice the retained size so appends are amortized O(1).
+        self.max_rows = max_rows
+        self.values = np.empty((2 * max_rows, len(OHLCV_COLUMNS) + len(FEATURE_COLUMNS)))
+        self.times = np.empty(2 * max_rows, dtype='int64')
+        self.tz = None
+        self.count = 0
+
+    def _midprice(self, length: int) -> float:
+        if len(self.highs) < length:
+            return math.nan
+        highs, lows = list(self.highs)[-length:], list(self.lows)[-length:]
+        return 0.5 * (min(lows) + max(highs))
+
+    def push(self, time, o: float, h: float, l: float, c: float, v: float):
+        self.highs.append(h)
+        self.lows.append(l)
+        self.closes.append(c)
+
+        # --- 1. Ichimoku Cloud (spans are shifted forward by KIJUN bars) ---
+        tenkan = self._midprice(TENKAN)
+        kijun = self._midprice(KIJUN)
+        self.spans.append((0.5 * (tenkan + kijun), self._midprice(SENKOU)))
+        span_a, span_b = self.spans[0] if len(self.spans) > KIJUN else (math.nan, math.nan)
+
+        # --- 2. Trend, Volatility and Momentum ---
+        ema21 = self.ema21.update(c)
+        ema50 = self.ema50.update(c)
+        sma200 = _window_mean(self.closes, 200)
+
+        fast, slow = self.ema12.update(c), self.ema26.update(c)
+        macd = fast - slow
+        signal = self.macd_signal.update(macd) if macd == macd else math.nan
+
+        if self.prev is None:
+            change = true_range = up = dn = math.nan
+        else:
+            prev_h, prev_l, prev_c = self.prev
+            change = c - prev_c
+            true_range = max(abs(h - l), abs(h - prev_c), abs(prev_c - l))
+            up, dn = h - prev_h, prev_l - l
+        self.prev = (h, l, c)
+
+        pos_avg = self.rsi_pos.update(max(change, 0.0) if change == change else change)
+        neg_avg = self.rsi_neg.update(min(change, 0.0) if change == change else change)
+        rsi = 100.0 * _div(pos_avg, pos_avg + abs(neg_avg))
+
+        window20 = list(self.closes)[-20:]
+        if len(window20) == 20:
+            bbm = math.fsum(window20) / 20
+            std = math.sqrt(math.fsum((x - bbm) ** 2 for x in window20) / 20)
+            bbl, bbu = bbm - 2.0 * std, bbm + 2.0 * std
+            bbb = 100.0 * _div(bbu - bbl, bbm)
+            bbp = _div(c - bbl, bbu - bbl)
+        else:
+            bbm = bbl = bbu = bbb = bbp = math.nan
+
+        atr = self.atr.update(true_range)
+        if up == up:
+            pos_dm = up if (up > dn and up > 0) else 0.0
+            neg_dm = dn if (dn > up and dn > 0) else 0.0
+        else:
+            pos_dm = neg_dm = math.nan
+        k = _div(100.0, atr)
+        dmp = k * self.dm_pos.update(pos_dm)
+        dmn = k * self.dm_neg.update(neg_dm)
+        adx = self.adx.update(100.0 * _div(abs(dmp - dmn), dmp + dmn))
+
+        # Squeeze: the repo passes `lazy_bear`, which pandas_ta ignores, so this is SMA(MOM(12), 6).
+        if true_range == true_range:
+            self.true_ranges.append(true_range)
+        kc_band = _window_mean(self.true_ranges, 20)
+        kcl, kcu = bbm - 1.5 * kc_band, bbm + 1.5 * kc_band
+        if len(self.closes) > 12:
+            self.moms.append(c - self.closes[-13])
+        squeeze = _window_mean(self.moms, 6)
+        squeeze_on = int(bbl > kcl and bbu < kcu)
+        squeeze_off = int(bbl < kcl and bbu > kcu)
+        no_squeeze = int(not squeeze_on and not squeeze_off)
+
+        row = [
+            o, h, l, c, v,
+            span_a, span_b, tenkan, kijun, math.nan,
+            ema21, ema50, sma200, rsi,
+            macd, macd - signal, signal,
+            bbl, bbm, bbu, bbb, bbp,
+            atr, adx, dmp, dmn,
+            squeeze, squeeze_on, squeeze_off, no_squeeze,
+        ]
+        self.pending.append((time, row))
+        self.last_time = time
+
+        # --- 3. Release the row whose chikou span (close KIJUN bars ahead) is now known ---
+        if len(self.pending) > KIJUN:
+            ready_time, ready_row = self.pending.popleft()
+            ready_row[9] = c
+            if not any(x != x for x in ready_row):
+                self._store(ready_time, ready_row)
+                return ready_time
+        return None
+
+    def _store(self, time, row: list):
+        if self.count == len(self.times):
+            self.values[:self.max_rows] = self.values[-self.max_rows:]
+            self.times[:self.max_rows] = self.times[-self.max_rows:]
+            self.count = self.max_rows
+        time = pd.Timestamp(time)
+        self.tz = time.tz
+        self.times[self.count] = time.value
+        self.values[self.count] = row
+        self.count += 1
+
+    def frame(self) -> pd.DataFrame:
+        start = max(0, self.count - self.max_rows)
+        index = pd.DatetimeIndex(self.times[start:self.count].view('datetime64[ns]'), name='time')
+        if self.tz is not None:
+            index = index.tz_localize('UTC').tz_convert(self.tz)
+        values = self.values[start:self.count]
+        columns = OHLCV_COLUMNS + FEATURE_COLUMNS
+        data = {col: values[:, i].astype('int64') if col in INT_COLUMNS else values[:, i]
+                for i, col in enumerate(columns)}
+        return pd.DataFrame(data, index=index)
+
+
+class IncrementalIndicatorService:
+    """
+    Stateful counterpart of IndicatorService. Keeps the indicator recurrences and
+    rolling windows per symbol/timeframe so each newly closed candle is appended
+    in O(1) instead of recomputing the whole suite over the full history.
+
+    The returned frame has exactly the rows and columns add_all_indicators would
+    produce, including its quirk that the chikou span looks 26 bars ahead: the
+    latest complete feature row always belongs to the candle 26 bars back.
+    """
+    def __init__(self, max_rows: int = 1000):
+        self.max_rows = max_rows
+        self.states = {}
+        print("IncrementalIndicatorService: Initialized.")
+
+    def seed(self, symbol: str, timeframe: str, df: pd.DataFrame) -> pd.DataFrame | None:
+        """Rebuilds the state for symbol/timeframe from a full window of closed candles."""
+        if df is None or df.empty:
+            print("IncrementalIndicatorService: Input DataFrame is empty. Cannot seed state.")
+            return None
+        state = _IndicatorState(self.max_rows)
+        for time, bar in zip(df.index, df[OHLCV_COLUMNS].itertuples(index=False, name=None)):
+            state.push(time, *bar)
+        self.states[(symbol, timeframe)] = state
+        print(f"IncrementalIndicatorService: Seeded {symbol} {timeframe} state from {len(df)} candles.")
+        return state.frame()
+
+    def update(self, symbol: str, timeframe: str, df: pd.DataFrame) -> pd.DataFrame | None:
+        """
+        Appends only the candles of `df` newer than the last one seen for symbol/timeframe.
+        Seeds the state on first use, or re-seeds when `df` no longer overlaps it (a gap).
+        """
+        if df is None or df.empty:
+            print("IncrementalIndicatorService: Input DataFrame is empty. Cannot update state.")
+            return None
+
+        state = self.states.get((symbol, timeframe))
+        if state is None or state.last_time not in df.index:
+            return self.seed(symbol, timeframe, df)
+
+        new_bars = df[df.index > state.last_time]
+        for time, bar in zip(new_bars.index, new_bars[OHLCV_COLUMNS].itertuples(index=False, name=None)):
+            state.push(time, *bar)
+        if len(new_bars):
+            print(f"IncrementalIndicatorService: Appended {len(new_bars)} new candle(s) to {symbol} {timeframe}.")
+        return state.frame()
+
+    def get_features(self, symbol: str, timeframe: str) -> pd.DataFrame | None:
+        state = self.states.get((symbol, timeframe))
+        return state.frame() if state is not None else None
+
+    def verify_parity(self, df: pd.DataFrame, tolerance: float = 1e-8) -> bool:
+        """
+        Replays `df` bar by bar and compares the result with IndicatorService.add_all_indicators.
+        Returns True when both frames have the same rows and columns and agree within `tolerance`.
+        """
+        expected = IndicatorService().add_all_indicators(df.copy())
+        state = _IndicatorState(max_rows=len(df))
+        for time, bar in zip(df.index, df[OHLCV_COLUMNS].itertuples(index=False, name=None)):
+            state.push(time, *bar)
+        actual = state.frame()
+
+        if not expected.index.equals(actual.index) or list(expected.columns) != list(actual.columns):
+            print("IncrementalIndicatorService: Parity FAILED - rows or columns differ from the full recompute.")
+            return False
+        deviation = (expected.astype(float) - actual.astype(float)).abs().max().max()
+        print(f"IncrementalIndicatorService: Parity max abs deviation = {deviation:.3e}.")
+        return bool(deviation <= tolerance)
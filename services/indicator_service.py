@@ -1,5 +1,4 @@
 import pandas as pd
-import pandas_ta as ta
 
 class IndicatorService:
     """
@@ -9,7 +8,10 @@ class IndicatorService:
     def __init__(self):
         print("IndicatorService: Initialized.")
 
-    def add_all_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
+    def add_all_indicators(self, df: pd.DataFrame, dropna: bool = True) -> pd.DataFrame:
+        # Imported on first use (it also registers the df.ta accessor); pandas_ta is slow to import.
+        import pandas_ta as ta
+
         if df is None or df.empty:
             print("IndicatorService: Input DataFrame is empty. Cannot add indicators.")
             return df
@@ -48,8 +50,10 @@ class IndicatorService:
         df.ta.squeeze(lazy_bear=True, append=True)
 
         # --- 3. Final Cleanup ---
-        # Drop all rows with NaN values that were created during the indicator calculations
-        df.dropna(inplace=True)
+        # Drop all rows with NaN values that were created during the indicator calculations.
+        # FeatureCache keeps them and drops only the rows each consumer's columns need.
+        if dropna:
+            df.dropna(inplace=True)
         
         print("IndicatorService: Final, optimized indicator suite successfully added.")
         return df
\ No newline at end of file
@@ -0,0 +1,207 @@
+import cProfile
+import functools
+import inspect
+import json
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+import pytz
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    def __init__(self, metrics, stage: str, symbol: str | None):
+        self.metrics = metrics
+        self.stage = stage
+        self.symbol = symbol
+
+    def __enter__(self):
+        local = self.metrics.local
+        self.previous_symbol = getattr(local, 'symbol', None)
+        if self.symbol is not None:
+            local.symbol = self.symbol
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        self.metrics.record(self.stage, self.symbol or self.previous_symbol, elapsed, error=exc_type is not None)
+        self.metrics.local.symbol = self.previous_symbol
+        return False
+
+
+class MetricsService:
+    """
+    Timers and counters for the trading loop. instrument() wraps a service's methods so every
+    call is timed under '<name>.<method>' and attributed to the symbol it runs for (its
+    `symbol` argument, or the symbol of the enclosing timer()); the last `window` durations of
+    each stage/symbol pair give rolling percentiles. end_cycle() appends one JSON line per cycle
+    to `log_file`. Creating `profile_trigger_file` makes the next cycle run under cProfile and
+    dump its stats next to the log.
+
+    When disabled, instrument() returns the service untouched and timer() is a shared no-op,
+    so the loop pays nothing.
+    """
+    def __init__(self, enabled: bool = False, log_file: str = 'metrics/cycles.jsonl', window: int = 500,
+                 profile_trigger_file: str = 'metrics/profile.request'):
+        self.enabled = enabled
+        self.log_file = log_file
+        self.window = window
+        self.profile_trigger_file = profile_trigger_file
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.durations = {}   # (stage, symbol) -> deque of seconds
+        self.counters = {}    # (stage, symbol) -> {"calls": n, "errors": n}
+        self.cycle = 0
+        self.cycle_started = None
+        self.cycle_events = {}
+        self.profiling = False
+        self.profiles = []
+        if enabled:
+            os.makedirs(os.path.dirname(log_file) or '.', exist_ok=True)
+            print(f"MetricsService: Instrumentation enabled, logging cycles to '{log_file}'.")
+
+    # --- Recording ---
+
+    def timer(self, stage: str, symbol: str | None = None):
+        """Context manager timing a block; nested calls inherit its symbol."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, stage, symbol)
+
+    def record(self, stage: str, symbol: str | None, seconds: float, error: bool = False):
+        key = (stage, symbol or '-')
+        with self.lock:
+            samples = self.durations.get(key)
+            if samples is None:
+                samples = self.durations[key] = deque(maxlen=self.window)
+                self.counters[key] = {"calls": 0, "errors": 0}
+            samples.append(seconds)
+            self.counters[key]["calls"] += 1
+            self.counters[key]["errors"] += int(error)
+            cycle_stage = self.cycle_events.setdefault(key, [0, 0.0])
+            cycle_stage[0] += 1
+            cycle_stage[1] += seconds
+
+    def instrument(self, service, name: str, methods: list | None = None):
+        """Wraps the public methods of `service` (or just `methods`) in timers; returns the service."""
+        if not self.enabled or service is None:
+            return service
+        if methods is None:
+            methods = [m for m, _ in inspect.getmembers(type(service), inspect.isfunction) if not m.startswith('_')]
+        for method_name in methods:
+            setattr(service, method_name, self._wrap(getattr(service, method_name), f"{name}.{method_name}"))
+        return service
+
+    def _wrap(self, method, stage: str):
+        parameters = list(inspect.signature(method).parameters)
+        symbol_position = parameters.index('symbol') if 'symbol' in parameters else None
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            symbol = kwargs.get('symbol')
+            if symbol is None and symbol_position is not None and symbol_position < len(args):
+                symbol = args[symbol_position]
+            with self.timer(stage, symbol):
+                if self.profiling and getattr(self.local, 'profiler', None) is None:
+                    return self._profiled(method, *args, **kwargs)
+                return method(*args, **kwargs)
+        return wrapper
+
+    def _profiled(self, method, *args, **kwargs):
+        profiler = self.local.profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(method, *args, **kwargs)
+        finally:
+            self.local.profiler = None
+            with self.lock:
+                self.profiles.append(profiler)
+
+    # --- Cycles ---
+
+    def begin_cycle(self):
+        if not self.enabled:
+            return
+        self.cycle += 1
+        self.cycle_started = time.perf_counter()
+        with self.lock:
+            self.cycle_events = {}
+            self.profiles = []
+        if os.path.exists(self.profile_trigger_file):
+            os.remove(self.profile_trigger_file)
+            self.profiling = True
+            print(f"MetricsService: Profiling cycle {self.cycle}.")
+
+    def end_cycle(self):
+        if not self.enabled or self.cycle_started is None:
+            return
+        duration = time.perf_counter() - self.cycle_started
+        with self.lock:
+            events = self.cycle_events
+            self.cycle_events = {}
+
+        stages = {}
+        for (stage, symbol), (calls, seconds) in events.items():
+            entry = stages.setdefault(stage, {"calls": 0, "total_ms": 0.0, "symbols": {}})
+            entry["calls"] += calls
+            entry["total_ms"] = round(entry["total_ms"] + seconds * 1000, 3)
+            entry["symbols"][symbol] = round(seconds * 1000, 3)
+
+        record = {
+            "cycle": self.cycle,
+            "time": datetime.now(pytz.utc).isoformat(),
+            "duration_ms": round(duration * 1000, 3),
+            "stages": stages,
+            "rolling": self.percentiles(stages=set(stages)),
+        }
+        if self.profiling:
+            record["profile"] = self._dump_profile()
+            self.profiling = False
+        try:
+            with open(self.log_file, 'a') as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            print(f"MetricsService: Could not write metrics log: {e}")
+
+    def percentiles(self, stages: set | None = None) -> dict:
+        """{stage: {symbol: {calls, errors, p50_ms, p95_ms, p99_ms, max_ms}}} over the rolling window."""
+        with self.lock:
+            snapshot = {key: (np.fromiter(samples, dtype=float), dict(self.counters[key]))
+                        for key, samples in self.durations.items() if stages is None or key[0] in stages}
+        result = {}
+        for (stage, symbol), (samples, counters) in snapshot.items():
+            p50, p95, p99 = np.percentile(samples, [50, 95, 99]) * 1000
+            result.setdefault(stage, {})[symbol] = {
+                **counters, "p50_ms": round(p50, 3), "p95_ms": round(p95, 3),
+                "p99_ms": round(p99, 3), "max_ms": round(samples.max() * 1000, 3),
+            }
+        return result
+
+    def _dump_profile(self) -> str | None:
+        with self.lock:
+            profiles = self.profiles
+            self.profiles = []
+        if not profiles:
+            return None
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        profile_file = os.path.join(os.path.dirname(self.log_file) or '.', f"profile_cycle_{self.cycle}.prof")
+        stats.dump_stats(profile_file)
+        print(f"MetricsService: Profile of cycle {self.cycle} written to '{profile_file}'.")
+        return profile_file
@@ -0,0 +1,51 @@
+import os
+import threading
+
+from services.ml_service import MLService
+
+class ModelRegistry:
+    """
+    Keeps one warm MLService per model file instead of unpickling the model on every
+    check, and transparently reloads a model when its file's modification time changes.
+    With fast_inference, models are scored through MLService's inplace_predict path.
+    """
+    def __init__(self, fast_inference: bool = False):
+        self.fast_inference = fast_inference
+        self.models = {}  # model_path -> (mtime, MLService)
+        self.lock = threading.Lock()
+        print("ModelRegistry: Initialized.")
+
+    def get(self, model_path: str) -> MLService | None:
+        try:
+            mtime = os.path.getmtime(model_path)
+        except OSError:
+            print(f"ModelRegistry: Model file not found at {model_path}.")
+            return None
+
+        with self.lock:
+            cached = self.models.get(model_path)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+
+            if cached is not None:
+                print(f"ModelRegistry: {model_path} changed on disk. Reloading...")
+            ml_svc = MLService(model_path=model_path, fast_inference=self.fast_inference)
+            if ml_svc.model is None:
+                # Keep serving the previous model if the new file cannot be loaded (e.g. mid-copy).
+                return cached[1] if cached is not None else None
+            self.models[model_path] = (mtime, ml_svc)
+            return ml_svc
+
+    def get_latest_predictions(self, frames_by_model: dict[str, dict]) -> dict[str, int]:
+        """
+        Batch inference across symbols: maps model_path -> {symbol: feature frame} to
+        {symbol: prediction}, with one predict_proba call per model.
+        """
+        predictions = {}
+        for model_path, frames in frames_by_model.items():
+            ml_svc = self.get(model_path)
+            if ml_svc is None:
+                predictions.update({symbol: 0 for symbol in frames})
+                continue
+            predictions.update(ml_svc.get_latest_predictions(frames))
+        return predictions
@@ -0,0 +1,191 @@
+import importlib
+import threading
+import time
+
+# The MetaTrader5 package talks to one terminal per process and is not thread-safe, so every
+# connection object shares this lock and concurrent pipelines take turns.
+_terminal_lock = threading.RLock()
+
+
+class MT5ConnectionError(Exception):
+    """The terminal is unreachable (disconnected, or waiting to retry the connection)."""
+
+
+class _Request:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MT5Connection:
+    """
+    Supervisor around the MetaTrader5 module. Calls go through call() (or simply
+    `connection.copy_rates_range(...)`, which is forwarded to it): they are serialized, the
+    terminal is health-checked at most every `health_interval` seconds and after any call that
+    returns None, and a lost terminal is re-initialized with exponential backoff. While it is
+    unreachable, calls raise MT5ConnectionError at once instead of stalling the callers, so an
+    outage is never mistaken for "no data"; cycle_healthy() tells the scheduler whether the
+    terminal stayed reachable through a cycle.
+
+    coalesce() shares one result between identical requests made between begin_cycle() and
+    end_cycle(), so several stages asking for the same symbol and timeframe hit the terminal
+    once. Outside a cycle only requests still in flight are shared, and every later call
+    reaches the terminal. Constants such as TIMEFRAME_H1 are read from the module.
+
+    `module` defaults to the MetaTrader5 package; pass a stub to run without a terminal.
+    """
+    def __init__(self, module=None, health_interval: float = 30.0, initial_backoff: float = 1.0,
+                 max_backoff: float = 60.0, **initialize_kwargs):
+        self.mt5 = module if module is not None else importlib.import_module('MetaTrader5')
+        self.lock = _terminal_lock
+        self.health_interval = health_interval
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        # Passed to mt5.initialize(), e.g. path, login, password, server.
+        self.initialize_kwargs = initialize_kwargs
+        self.connected = False
+        self.checked_at = float('-inf')
+        self.failures = 0
+        self.retry_at = float('-inf')
+        self.lost_in_cycle = False
+        self.in_cycle = False
+        self.requests = {}
+        self.requests_lock = threading.Lock()
+
+    # --- Connection ---
+
+    def connect(self) -> bool:
+        """Initializes the terminal connection now, ignoring any backoff."""
+        with self.lock:
+            self.retry_at = float('-inf')
+            return self._reconnect()
+
+    def ensure_connected(self) -> bool:
+        with self.lock:
+            now = time.monotonic()
+            if self.connected:
+                if now - self.checked_at < self.health_interval:
+                    return True
+                self.checked_at = now
+                if self._healthy():
+                    return True
+                print(f"MT5Connection: Lost the terminal connection: {self._last_error()}")
+                self.connected = False
+            self.lost_in_cycle = True
+            if now < self.retry_at:
+                return False
+            return self._reconnect()
+
+    def _healthy(self) -> bool:
+        try:
+            return self.mt5.terminal_info() is not None
+        except Exception:
+            return False
+
+    def _reconnect(self) -> bool:
+        try:
+            if self.failures or self.connected:
+                self.mt5.shutdown()
+            ok = bool(self.mt5.initialize(**self.initialize_kwargs))
+        except Exception as e:
+            print(f"MT5Connection: initialize() raised: {e}")
+            ok = False
+
+        now = time.monotonic()
+        if ok:
+            if self.failures:
+                print(f"MT5Connection: Reconnected to the terminal after {self.failures} failed attempt(s).")
+            self.connected, self.failures, self.checked_at = True, 0, now
+            return True
+        self.connected = False
+        self.failures += 1
+        backoff = min(self.initial_backoff * 2 ** (self.failures - 1), self.max_backoff)
+        self.retry_at = now + backoff
+        print(f"MT5Connection: Could not connect to the terminal ({self._last_error()}). Retrying in {backoff:g}s.")
+        return False
+
+    def _last_error(self):
+        try:
+            return self.mt5.last_error()
+        except Exception:
+            return None
+
+    def shutdown(self):
+        with self.lock:
+            if self.connected:
+                self.mt5.shutdown()
+            self.connected = False
+
+    # --- Calls ---
+
+    def call(self, name: str, *args, **kwargs):
+        """Calls mt5.<name>(...) under the terminal lock; raises MT5ConnectionError if the terminal is unavailable."""
+        with self.lock:
+            if not self.ensure_connected():
+                raise MT5ConnectionError(f"MetaTrader5 terminal unavailable (retrying in {max(self.retry_at - time.monotonic(), 0):.0f}s)")
+            result = getattr(self.mt5, name)(*args, **kwargs)
+            if result is None:
+                # Check the terminal on the next call rather than waiting for the health interval.
+                self.checked_at = float('-inf')
+            return result
+
+    def __getattr__(self, name: str):
+        module = self.__dict__.get('mt5')
+        if name.startswith('_') or module is None:
+            raise AttributeError(name)
+        value = getattr(module, name)
+        if not callable(value):
+            return value
+        return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+
+    # --- Coalescing ---
+
+    def begin_cycle(self):
+        """Starts a cycle: results are shared until end_cycle(), and outages are tracked for cycle_healthy()."""
+        with self.requests_lock:
+            self.requests = {}
+            self.in_cycle = True
+        self.lost_in_cycle = False
+
+    def end_cycle(self):
+        """Forgets the results shared in this cycle; later requests reach the terminal again."""
+        with self.requests_lock:
+            self.requests = {}
+            self.in_cycle = False
+
+    def cycle_healthy(self) -> bool:
+        """
+        True if the terminal stayed reachable since begin_cycle(). It is re-checked now if a call
+        failed, so a stage that ran on failed fetches is not counted as done.
+        """
+        return self.ensure_connected() and not self.lost_in_cycle
+
+    def coalesce(self, key, func):
+        """
+        Returns func() for the first request with `key` in this cycle and the same result for
+        the later ones, waiting if the first is still running. Outside a cycle the result is only
+        shared with requests made while it runs. Failures (None or an exception, which the
+        waiters re-raise) are not kept.
+        """
+        with self.requests_lock:
+            request = self.requests.get(key)
+            is_owner = request is None
+            if is_owner:
+                request = self.requests[key] = _Request()
+        if not is_owner:
+            request.done.wait()
+            if request.error is not None:
+                raise request.error
+            return request.result
+        try:
+            request.result = func()
+        except Exception as e:
+            request.error = e
+            raise
+        finally:
+            with self.requests_lock:
+                if (request.result is None or not self.in_cycle) and self.requests.get(key) is request:
+                    del self.requests[key]
+            request.done.set()
+        return request.result
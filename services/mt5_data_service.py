@@ -1,77 +1,373 @@
-import MetaTrader5 as mt5
+import argparse
+import functools
+import time
 import pandas as pd
 from datetime import datetime, timedelta
 import pytz
 
+from services.bar_store import BAR_SECONDS, BarStore, rates_to_bars, bars_to_frame, resample_bars
+from services.mt5_connection import MT5Connection, MT5ConnectionError
+
+def _serialized(method):
+    """Runs the whole method under the terminal lock, so a multi-call sync is not interleaved."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.mt5.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+# Timeframes that can be built from the M1 feed instead of being fetched separately.
+DERIVED_TIMEFRAMES = ('M15', 'H1', 'H4')
+
+# Candles per copy_rates_range call when downloading history (about 2.4 MB of rates).
+HISTORY_CHUNK_BARS = 50_000
+
 class MT5DataService:
-    def __init__(self):
-        pass 
+    def __init__(self, cache_dir: str | None = None, aggregate_from_m1: bool = False, m1_history: int = 1440,
+                 m1_refresh_seconds: float = 5.0, connection: MT5Connection | None = None, clock=None):
+        # All terminal calls go through the connection supervisor (serialized, health-checked, reconnecting).
+        self.mt5 = connection or MT5Connection()
+        # With a cache_dir, candles are kept in a local BarStore and only newer ones are fetched.
+        self.bar_store = BarStore(cache_dir) if cache_dir else None
+        # With aggregate_from_m1 (needs a cache_dir), M15/H1/H4 are kept up to date from one M1 feed per symbol.
+        self.aggregate_from_m1 = aggregate_from_m1 and self.bar_store is not None
+        self.m1_history = m1_history
+        self.m1_refresh_seconds = m1_refresh_seconds
+        self.m1_synced_at = {}
+        # The current time (tz-aware UTC), which decides whether the final candle is still forming.
+        self.clock = clock or (lambda: datetime.now(pytz.utc))
+
+    @_serialized
+    def sync_bars(self, symbol: str, timeframe_str: str, timeframe: int, limit: int | None = None, start_datetime: datetime | None = None) -> bool:
+        """
+        Brings the local store for symbol/timeframe up to date. Only candles from the last
+        stored one onwards are requested, unless the store cannot cover `limit` candles or
+        `start_datetime`, in which case the missing history is downloaded and merged in.
+        """
+        store = self.bar_store
+        # Broker server time often runs ahead of UTC, so ask for everything up to tomorrow.
+        date_to = datetime.now(pytz.utc) + timedelta(days=1)
+        try:
+            last = store.last_time(symbol, timeframe_str)
+            if last is None or (limit is not None and store.count(symbol, timeframe_str) < limit):
+                rates = self.mt5.copy_rates_from_pos(symbol, timeframe, 0, limit) if limit is not None else self.mt5.copy_rates_range(symbol, timeframe, start_datetime, date_to)
+                if rates is None or len(rates) == 0:
+                    print("MT5DataService (Cache): No data returned from MT5 terminal.")
+                    return False
+                store.merge(symbol, timeframe_str, rates_to_bars(rates))
+                print(f"MT5DataService (Cache): Stored {len(rates)} '{timeframe_str}' candles for {symbol}.")
+                last = store.last_time(symbol, timeframe_str)
+
+            first = store.first_time(symbol, timeframe_str)
+            if start_datetime is not None and first > start_datetime.timestamp():
+                rates = self.mt5.copy_rates_range(symbol, timeframe, start_datetime, datetime.fromtimestamp(first, pytz.utc))
+                if rates is not None and len(rates):
+                    store.merge(symbol, timeframe_str, rates_to_bars(rates))
+                    print(f"MT5DataService (Cache): Backfilled {len(rates)} older '{timeframe_str}' candles for {symbol}.")
+
+            rates = self.mt5.copy_rates_range(symbol, timeframe, datetime.fromtimestamp(last, pytz.utc), date_to)
+            if rates is None:
+                # A terminal error, not "no new candles": serving the stored window would look current.
+                print(f"MT5DataService (Cache): Delta fetch failed for {symbol}: {self.mt5.last_error()}")
+                return False
+            if len(rates) == 0:
+                return True
+            if rates['time'][0] != last:
+                # The last stored candle is not where the terminal says it is: rebuild the store.
+                print(f"MT5DataService (Cache): Stored '{timeframe_str}' history for {symbol} is out of sync. Re-syncing...")
+                return self.resync(symbol, timeframe_str, timeframe, full=True)
+
+            written = store.append(symbol, timeframe_str, rates_to_bars(rates))
+            print(f"MT5DataService (Cache): Delta fetch wrote {written} '{timeframe_str}' candle(s) for {symbol}.")
+            return True
+        except Exception as e:
+            print(f"MT5DataService (Cache): An error occurred while syncing: {e}")
+            return False
+
+    @_serialized
+    def resync(self, symbol: str, timeframe_str: str, timeframe: int, full: bool = False) -> bool:
+        """
+        Re-downloads the ranges around every gap the store reports, or the whole stored
+        span when `full` is set. Gaps that remain afterwards are real market closures.
+        """
+        store = self.bar_store
+        first = store.first_time(symbol, timeframe_str)
+        if first is None:
+            return False
+        spans = [(first, None)] if full else store.find_gaps(symbol, timeframe_str)
+        try:
+            for gap_start, gap_end in spans:
+                date_from = datetime.fromtimestamp(gap_start, pytz.utc)
+                date_to = datetime.fromtimestamp(gap_end, pytz.utc) if gap_end is not None else datetime.now(pytz.utc) + timedelta(days=1)
+                rates = self.mt5.copy_rates_range(symbol, timeframe, date_from, date_to)
+                if rates is None or len(rates) == 0:
+                    continue
+                bars = rates_to_bars(rates)
+                if full:
+                    store.write(symbol, timeframe_str, bars)
+                else:
+                    store.merge(symbol, timeframe_str, bars)
+            if spans:
+                print(f"MT5DataService (Cache): Re-synced {len(spans)} range(s) of '{timeframe_str}' history for {symbol}.")
+            return True
+        except Exception as e:
+            print(f"MT5DataService (Cache): An error occurred while re-syncing: {e}")
+            return False
+
+    @_serialized
+    def sync_from_m1(self, symbol: str, timeframe_str: str, timeframe: int, limit: int) -> bool:
+        """
+        Updates a derived timeframe from the M1 feed: the M1 candles from the last stored
+        `timeframe_str` candle onwards are resampled and appended. The history the M1 feed
+        does not cover is downloaded natively, once, when the store has fewer than `limit`
+        candles or the M1 feed no longer reaches back to the last stored candle.
+        """
+        store = self.bar_store
+        if store.count(symbol, timeframe_str) < limit:
+            if not self.sync_bars(symbol, timeframe_str, timeframe, limit=limit): return False
+        if not self.sync_m1(symbol): return False
+
+        last = store.last_time(symbol, timeframe_str)
+        first_m1 = store.first_time(symbol, 'M1')
+        if first_m1 is None or first_m1 > last:
+            return self.sync_bars(symbol, timeframe_str, timeframe, limit=limit)
+        try:
+            store.append(symbol, timeframe_str, resample_bars(store.range(symbol, 'M1', last), timeframe_str))
+            return True
+        except Exception as e:
+            print(f"MT5DataService (Cache): An error occurred while resampling '{timeframe_str}' for {symbol}: {e}")
+            return False
+
+    @_serialized
+    def sync_m1(self, symbol: str) -> bool:
+        """Delta-syncs the M1 feed, at most once per `m1_refresh_seconds` however many timeframes ask."""
+        now = time.monotonic()
+        if now - self.m1_synced_at.get(symbol, float('-inf')) < self.m1_refresh_seconds:
+            return True
+        if not self.sync_bars(symbol, 'M1', self.mt5.TIMEFRAME_M1, limit=self.m1_history):
+            return False
+        self.m1_synced_at[symbol] = now
+        return True
 
     def get_all_historical_data(self, symbol: str, timeframe_str: str, start_date: str) -> pd.DataFrame | None:
         """
-        Fetches a large, historical dataset for model training.
+        Fetches a large, historical dataset for model training, for any MT5 timeframe. With a
+        cache_dir the history is downloaded into the store chunk by chunk (see download_history)
+        and served from it; otherwise the chunks are streamed and joined.
         """
         print(f"MT5DataService (Hist): Fetching all data for {symbol} on {timeframe_str} since {start_date}...")
-        
-        timeframe_map = { 'H4': mt5.TIMEFRAME_H4, 'H1': mt5.TIMEFRAME_H1 }
-        if timeframe_str not in timeframe_map: return None
-        timeframe = timeframe_map[timeframe_str]
+        start, _ = self._history_bounds(start_date)
+
+        if self.bar_store is not None:
+            if not self.download_history(symbol, timeframe_str, start_date): return None
+            df = bars_to_frame(self.bar_store.range(symbol, timeframe_str, start))
+            print(f"MT5DataService (Hist): Served {len(df)} candles from the local cache.")
+            return df
+
+        chunks = list(self.iter_historical_data(symbol, timeframe_str, start_date))
+        if not chunks:
+            print("MT5DataService (Hist): No data returned from MT5 terminal.")
+            return None
+        df = pd.concat(chunks)
+        print(f"MT5DataService (Hist): Successfully downloaded and processed {len(df)} candles.")
+        print(f"MT5DataService (Hist): Data range from {df.index.min()} to {df.index.max()}")
+        return df
+
+    # --- Chunked history download ---
 
-        timezone = pytz.timezone("Etc/UTC")
-        start_datetime = timezone.localize(datetime.strptime(start_date, "%Y-%m-%d"))
-        
+    def iter_historical_data(self, symbol: str, timeframe_str: str, start_date: str, end_date: str | None = None,
+                             chunk_bars: int = HISTORY_CHUNK_BARS):
+        """
+        Streams the history from start_date to end_date (YYYY-MM-DD, default: now) as one
+        DataFrame per chunk of at most `chunk_bars` candles, oldest first. Stops early if the
+        terminal reports an error.
+        """
+        timeframe = self._timeframe(timeframe_str)
+        if timeframe is None: return
+        start, end = self._history_bounds(start_date, end_date)
+        span = chunk_bars * BAR_SECONDS[timeframe_str]
+        for chunk_from in range(start, end, span):
+            bars = self._fetch_chunk(symbol, timeframe_str, timeframe, chunk_from, min(chunk_from + span, end))
+            if bars is None:
+                return
+            if len(bars):
+                yield bars_to_frame(bars)
+
+    def download_history(self, symbol: str, timeframe_str: str, start_date: str, chunk_bars: int = HISTORY_CHUNK_BARS) -> bool:
+        """
+        Downloads the history since start_date (YYYY-MM-DD) into the bar store one chunk at a
+        time, each appended to disk as soon as it arrives, so memory stays bounded by the chunk
+        size whatever the timeframe and span. The download resumes from the last stored candle:
+        an interrupted run picks up at the last completed chunk. History older than what is
+        already stored goes to a staging series first and is spliced in front once complete.
+        """
+        store = self.bar_store
+        timeframe = self._timeframe(timeframe_str)
+        if store is None or timeframe is None: return False
+        start, end = self._history_bounds(start_date)
+
+        first = store.first_time(symbol, timeframe_str)
+        if first is not None and first > start:
+            staging = f"{timeframe_str}_backfill"
+            if not self._download_chunks(symbol, timeframe_str, timeframe, staging, start, first, chunk_bars): return False
+            with self.mt5.lock:
+                store.prepend(symbol, timeframe_str, staging)
+        return self._download_chunks(symbol, timeframe_str, timeframe, timeframe_str, start, end, chunk_bars)
+
+    def _download_chunks(self, symbol: str, timeframe_str: str, timeframe: int, series: str, start: int, end: int,
+                         chunk_bars: int) -> bool:
+        """Appends [start, end) to the stored `series`, from its last candle onwards."""
+        store = self.bar_store
+        last = store.last_time(symbol, series)
+        chunk_from = max(start, last) if last is not None else start
+        span = chunk_bars * BAR_SECONDS[timeframe_str]
+        written = 0
+        while chunk_from < end:
+            chunk_to = min(chunk_from + span, end)
+            bars = self._fetch_chunk(symbol, timeframe_str, timeframe, chunk_from, chunk_to)
+            if bars is None:
+                print(f"MT5DataService (Hist): Stopped at {datetime.fromtimestamp(chunk_from, pytz.utc)} after {written} "
+                      f"'{timeframe_str}' candles for {symbol}; the next run resumes there.")
+                return False
+            # Under the terminal lock so a live sync of the same series is not interleaved with the write.
+            with self.mt5.lock:
+                written += store.append(symbol, series, bars)
+            chunk_from = chunk_to
+        print(f"MT5DataService (Hist): Downloaded {written} '{timeframe_str}' candles for {symbol}.")
+        return True
+
+    def _fetch_chunk(self, symbol: str, timeframe_str: str, timeframe: int, chunk_from: int, chunk_to: int):
+        """The candles opening in [chunk_from, chunk_to) as BAR_DTYPE records, or None on a terminal error."""
         try:
-            now = datetime.now(timezone)
-            rates = mt5.copy_rates_range(symbol, timeframe, start_datetime, now)
-            if rates is None or len(rates) == 0:
-                print("MT5DataService (Hist): No data returned from MT5 terminal.")
+            rates = self.mt5.copy_rates_range(symbol, timeframe, datetime.fromtimestamp(chunk_from, pytz.utc),
+                                              datetime.fromtimestamp(chunk_to, pytz.utc))
+            if rates is None:
+                print(f"MT5DataService (Hist): Chunk from {datetime.fromtimestamp(chunk_from, pytz.utc)} failed: {self.mt5.last_error()}")
                 return None
-
-            df = pd.DataFrame(rates)
-            df['time'] = pd.to_datetime(df['time'], unit='s')
-            df.set_index('time', inplace=True)
-            df.index = df.index.tz_localize('UTC')
-            df = df[df.index >= start_datetime]
-            df.rename(columns={'tick_volume': 'volume'}, inplace=True)
-            df = df[['open', 'high', 'low', 'close', 'volume']]
-            
-            print(f"MT5DataService (Hist): Successfully downloaded and processed {len(df)} candles.")
-            print(f"MT5DataService (Hist): Data range from {df.index.min()} to {df.index.max()}")
-            return df
+            bars = rates_to_bars(rates)
+            # copy_rates_range includes date_to; that candle belongs to the next chunk.
+            return bars[(bars['time'] >= chunk_from) & (bars['time'] < chunk_to)]
         except Exception as e:
-            print(f"MT5DataService (Hist): An error occurred: {e}")
+            print(f"MT5DataService (Hist): An error occurred while downloading a chunk: {e}")
             return None
 
+    def _timeframe(self, timeframe_str: str) -> int | None:
+        timeframe = getattr(self.mt5, f"TIMEFRAME_{timeframe_str}", None) if timeframe_str in BAR_SECONDS else None
+        if timeframe is None:
+            print(f"MT5DataService (Hist): Unsupported timeframe '{timeframe_str}'.")
+        return timeframe
+
+    @staticmethod
+    def _history_bounds(start_date: str, end_date: str | None = None) -> tuple[int, int]:
+        """Epoch seconds of start_date and end_date (default: tomorrow, as broker time often runs ahead of UTC)."""
+        start = int(pytz.utc.localize(datetime.strptime(start_date, "%Y-%m-%d")).timestamp())
+        if end_date is None:
+            end = int((datetime.now(pytz.utc) + timedelta(days=1)).timestamp())
+        else:
+            end = int(pytz.utc.localize(datetime.strptime(end_date, "%Y-%m-%d")).timestamp())
+        return start, end
+
     def get_market_data(self, symbol: str, timeframe_str: str, limit: int = 1000, is_startup_run: bool = False) -> pd.DataFrame | None:
         """
-        Fetches a recent chunk of market data for LIVE analysis.
+        Fetches a recent chunk of market data for LIVE analysis. Identical requests within one
+        scheduler cycle share a single fetch; each caller gets its own copy.
         """
-        timeframe_map = { 'H4': mt5.TIMEFRAME_H4, 'H1': mt5.TIMEFRAME_H1, 'M1': mt5.TIMEFRAME_M1 }
+        df = self.mt5.coalesce(('market_data', symbol, timeframe_str, limit, is_startup_run),
+                               lambda: self._fetch_market_data(symbol, timeframe_str, limit, is_startup_run))
+        return df.copy() if df is not None else None
+
+    @_serialized
+    def _fetch_market_data(self, symbol: str, timeframe_str: str, limit: int, is_startup_run: bool) -> pd.DataFrame | None:
+        timeframe_map = { 'H4': self.mt5.TIMEFRAME_H4, 'H1': self.mt5.TIMEFRAME_H1, 'M15': self.mt5.TIMEFRAME_M15, 'M1': self.mt5.TIMEFRAME_M1 }
         if timeframe_str not in timeframe_map: return None
         timeframe = timeframe_map[timeframe_str]
 
         print(f"MT5DataService (Live): Fetching {limit} recent '{timeframe_str}' klines for {symbol}...")
         try:
-            rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, limit)
-            if rates is None or len(rates) == 0:
-                print("MT5DataService (Live): No data returned from MT5 terminal.")
-                return None
+            if self.aggregate_from_m1 and timeframe_str in DERIVED_TIMEFRAMES:
+                if not self.sync_from_m1(symbol, timeframe_str, timeframe, limit): return None
+                df = bars_to_frame(self.bar_store.window(symbol, timeframe_str, limit))
+            elif self.bar_store is not None:
+                if not self.sync_bars(symbol, timeframe_str, timeframe, limit=limit): return None
+                df = bars_to_frame(self.bar_store.window(symbol, timeframe_str, limit))
+            else:
+                rates = self.mt5.copy_rates_from_pos(symbol, timeframe, 0, limit)
+                if rates is None or len(rates) == 0:
+                    print("MT5DataService (Live): No data returned from MT5 terminal.")
+                    return None
 
-            df = pd.DataFrame(rates)
-            df['time'] = pd.to_datetime(df['time'], unit='s')
-            df.set_index('time', inplace=True)
-            df.index = df.index.tz_localize('UTC')
-            df.rename(columns={'tick_volume': 'volume'}, inplace=True)
-            df = df[['open', 'high', 'low', 'close', 'volume']]
+                df = pd.DataFrame(rates)
+                df['time'] = pd.to_datetime(df['time'], unit='s')
+                df.set_index('time', inplace=True)
+                df.index = df.index.tz_localize('UTC')
+                df.rename(columns={'tick_volume': 'volume'}, inplace=True)
+                df = df[['open', 'high', 'low', 'close', 'volume']]
             
             print(f"MT5DataService (Live): Successfully fetched {len(df)} candles.")
             print(f"MT5DataService (Live): Most recent candle timestamp is {df.index[-1]}")
             
-            if not is_startup_run:
+            # Only a candle that is still forming is removed. Right after a bar close the new bar may
+            # have no tick yet, and then the final candle is the one that just closed: the scheduled
+            # check must see it, as must a startup run while the market is shut.
+            if df.index[-1] + pd.Timedelta(seconds=BAR_SECONDS[timeframe_str]) > self.clock():
                 df = df.iloc[:-1]
-                print("MT5DataService (Live): Scheduled run. Removed final (incomplete) candle.")
+                print(f"MT5DataService (Live): {'Startup' if is_startup_run else 'Scheduled'} run. Removed final (still forming) candle.")
 
             return df
         except Exception as e:
             print(f"MT5DataService (Live): An error occurred: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    @_serialized
+    def latest_tick_msc(self, symbol: str) -> int | None:
+        """Server time (ms since the epoch) of the symbol's last tick, the starting point of a tick cursor."""
+        try:
+            tick = self.mt5.symbol_info_tick(symbol)
+            if tick is None:
+                print(f"MT5DataService (Ticks): No last tick for {symbol}: {self.mt5.last_error()}")
+                return None
+            return int(tick.time_msc)
+        except MT5ConnectionError:
+            return None  # the supervisor reports the outage; the monitor polls again
+        except Exception as e:
+            print(f"MT5DataService (Ticks): An error occurred: {e}")
+            return None
+
+    @_serialized
+    def get_ticks(self, symbol: str, after_msc: int, count: int = 10000):
+        """
+        Returns the ticks (structured array with time_msc, bid, ask) newer than `after_msc`
+        milliseconds since the epoch, oldest first, or None on error.
+        """
+        try:
+            date_from = datetime.fromtimestamp(after_msc // 1000, tz=pytz.utc)
+            ticks = self.mt5.copy_ticks_from(symbol, date_from, count, self.mt5.COPY_TICKS_INFO)
+            if ticks is None:
+                print(f"MT5DataService (Ticks): No ticks returned for {symbol}: {self.mt5.last_error()}")
+                return None
+            # copy_ticks_from works in whole seconds; drop the ticks already seen in that second.
+            return ticks[ticks['time_msc'] > after_msc]
+        except MT5ConnectionError:
+            return None  # the supervisor reports the outage; the monitor polls again
+        except Exception as e:
+            print(f"MT5DataService (Ticks): An error occurred: {e}")
+            return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Download (or resume downloading) candle history into the bar store.")
+    parser.add_argument('symbol')
+    parser.add_argument('--timeframes', nargs='+', default=['M1', 'M15', 'H1', 'H4'])
+    parser.add_argument('--start', required=True, help="First day to download (YYYY-MM-DD).")
+    parser.add_argument('--cache-dir', default='data/bars')
+    parser.add_argument('--chunk-bars', type=int, default=HISTORY_CHUNK_BARS)
+    args = parser.parse_args()
+
+    connection = MT5Connection()
+    if not connection.connect(): raise SystemExit(1)
+    data_svc = MT5DataService(cache_dir=args.cache_dir, connection=connection)
+    try:
+        for timeframe_str in args.timeframes:
+            data_svc.download_history(args.symbol, timeframe_str, args.start, chunk_bars=args.chunk_bars)
+    finally:
+        connection.shutdown()
@@ -0,0 +1,141 @@
+import argparse
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import ParameterGrid
+
+from services.backtest_service import BacktestService
+from services.bar_store import BarStore, bars_to_frame
+from services.heuristic_service import HEURISTIC_COLUMNS, HeuristicService
+from services.ml_service import MLService
+
+DEFAULT_SWEEP_GRID = {
+    'sl_multiplier': [1.0, 1.5, 2.0, 2.5],
+    'tp1_multiplier': [1.5, 2.0, 2.5, 3.0],
+    'confidence_threshold': [0.35, 0.40, 0.45, 0.50],
+}
+
+# The precomputed history, loaded once per worker process.
+_worker_data = {}
+
+
+def _init_worker(prepared_file: str):
+    with open(prepared_file, 'rb') as f:
+        _worker_data.update(pickle.load(f))
+
+
+def _evaluate(params: dict, bias_tf: str, entry_tf: str) -> dict:
+    """Replays the history with one parameter combination and returns its summary."""
+    data = _worker_data
+    predictions = MLService.signals_from_probabilities(data['probabilities'], params['confidence_threshold'])
+    heuristic_svc = HeuristicService(sl_multiplier=params['sl_multiplier'], tp1_multiplier=params['tp1_multiplier'])
+    backtest_svc = BacktestService(None, heuristic_svc, bias_tf=bias_tf, entry_tf=entry_tf)
+    trade_log = backtest_svc.replay(data['symbol'], data['features'], predictions, data['decision_times'],
+                                    data['entry_df'], data['pip_size'])
+    return {**params, **summarize(trade_log)}
+
+
+def summarize(trade_log: pd.DataFrame) -> dict:
+    """
+    Win rate, expectancy (mean pips per closed trade), total pips and max drawdown in pips, from
+    each trade's actual exit: a trade stopped out after a take profit ("SL after TP1") is a loss.
+    Also counts those trades, the ones a partial close at the targets would have saved.
+    """
+    closed = trade_log[trade_log['Outcome'] != "OPEN"]
+    pips = pd.to_numeric(closed['Profit_Pips']).to_numpy(dtype=float)
+    if len(pips) == 0:
+        return {"trades": 0, "win_rate": float('nan'), "expectancy_pips": float('nan'), "total_pips": 0.0,
+                "max_drawdown_pips": 0.0, "stopped_after_tp": 0}
+    equity = np.cumsum(pips)
+    drawdown = np.maximum.accumulate(np.r_[0.0, equity])[1:] - equity
+    return {
+        "trades": len(pips),
+        "win_rate": float((pips > 0).mean()),
+        "expectancy_pips": float(pips.mean()),
+        "total_pips": float(equity[-1]),
+        "max_drawdown_pips": float(drawdown.max()),
+        "stopped_after_tp": int(closed['Outcome'].str.startswith("SL after").sum()),
+    }
+
+
+class ParameterSweepService:
+    """
+    Grid sweep over the risk knobs: the SL and TP1 ATR multipliers of HeuristicService and
+    MLService's confidence threshold. Features and the model's class probabilities are computed
+    once; every grid point only re-thresholds the probabilities and replays the strategy
+    (BacktestService.replay), so the points are cheap and fan out over a process pool. Each
+    worker loads the precomputed history once. Results are ranked by expectancy.
+    """
+    def __init__(self, cache_dir: str, max_workers: int | None = None, bias_tf: str = 'H1', entry_tf: str = 'M15'):
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers or os.cpu_count()
+        self.bias_tf = bias_tf
+        self.entry_tf = entry_tf
+        self.prepared_file = os.path.join(cache_dir, 'sweep_history.pkl')
+
+    def prepare(self, symbol: str, bias_df: pd.DataFrame, entry_df: pd.DataFrame, ml_svc: MLService,
+                pip_size: float | None = None):
+        """Computes the features and class probabilities of the history and writes them for the workers."""
+        backtest_svc = BacktestService(ml_svc, HeuristicService(), bias_tf=self.bias_tf, entry_tf=self.entry_tf)
+        features, probabilities, decision_times = backtest_svc.precompute(bias_df, symbol)
+        prepared = {
+            "symbol": symbol, "features": features[HEURISTIC_COLUMNS], "probabilities": probabilities,
+            "decision_times": decision_times, "entry_df": entry_df[['open', 'high', 'low', 'close']],
+            "pip_size": pip_size or (0.01 if 'JPY' in symbol.upper() else 0.0001),
+        }
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self.prepared_file, 'wb') as f:
+            pickle.dump(prepared, f, protocol=pickle.HIGHEST_PROTOCOL)
+        print(f"ParameterSweepService: Prepared {len(features)} '{self.bias_tf}' decisions and "
+              f"{len(entry_df)} '{self.entry_tf}' candles for {symbol}.")
+
+    def sweep(self, param_grid: dict | None = None) -> pd.DataFrame:
+        """Evaluates every combination of the grid; returns one row per combination, best expectancy first."""
+        combinations = list(ParameterGrid(param_grid or DEFAULT_SWEEP_GRID))
+        print(f"ParameterSweepService: Sweeping {len(combinations)} combinations on {self.max_workers} workers...")
+
+        rows = []
+        with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker, initargs=(self.prepared_file,)) as pool:
+            jobs = {pool.submit(_evaluate, params, self.bias_tf, self.entry_tf): params for params in combinations}
+            for done, future in enumerate(as_completed(jobs), start=1):
+                try:
+                    rows.append(future.result())
+                except Exception as e:
+                    print(f"ParameterSweepService: Combination {jobs[future]} failed: {e}")
+                if done % 10 == 0 or done == len(jobs):
+                    print(f"ParameterSweepService: {done}/{len(jobs)} combinations done.")
+
+        results = pd.DataFrame(rows)
+        if results.empty:
+            return results
+        return results.sort_values(["expectancy_pips", "max_drawdown_pips"], ascending=[False, True],
+                                   na_position='last').reset_index(drop=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Sweep SL/TP1 multipliers and the confidence threshold over cached candles.")
+    parser.add_argument('symbol')
+    parser.add_argument('--cache-dir', default='data/bars', help="BarStore directory filled by MT5DataService.")
+    parser.add_argument('--model', default=None, help="Defaults to models/<symbol>_h1.pkl.")
+    parser.add_argument('--start', default=None, help="Only use candles from this date (YYYY-MM-DD).")
+    parser.add_argument('--sl', type=float, nargs='+', default=DEFAULT_SWEEP_GRID['sl_multiplier'])
+    parser.add_argument('--tp1', type=float, nargs='+', default=DEFAULT_SWEEP_GRID['tp1_multiplier'])
+    parser.add_argument('--threshold', type=float, nargs='+', default=DEFAULT_SWEEP_GRID['confidence_threshold'])
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', default=None, help="Optional CSV for the ranked results.")
+    args = parser.parse_args()
+
+    store = BarStore(args.cache_dir)
+    start = int(pd.Timestamp(args.start, tz='UTC').timestamp()) if args.start else 0
+    bias_df = bars_to_frame(store.range(args.symbol, 'H1', start))
+    entry_df = bars_to_frame(store.range(args.symbol, 'M15', start))
+
+    sweep_svc = ParameterSweepService(os.path.join(args.cache_dir, f"{args.symbol.lower()}_sweep"), max_workers=args.workers)
+    sweep_svc.prepare(args.symbol, bias_df, entry_df, MLService(args.model or f"models/{args.symbol.lower()}_h1.pkl"))
+    results = sweep_svc.sweep({'sl_multiplier': args.sl, 'tp1_multiplier': args.tp1, 'confidence_threshold': args.threshold})
+    print(results.head(10).to_string())
+    if args.output:
+        results.to_csv(args.output, index=False)
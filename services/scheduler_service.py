@@ -0,0 +1,82 @@
+import time
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+
+import pytz
+
+class SchedulerService:
+    """
+    Runs per-symbol pipeline stages concurrently on a bounded thread pool, with a
+    per-task timeout so one slow MT5 call or Telegram send cannot hold up the other
+    symbols, and sleeps until exact bar-close boundaries instead of a fixed interval.
+    """
+    def __init__(self, max_workers: int = 4, task_timeout: float = 45.0, bar_close_delay: float = 3.0, metrics=None):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipeline")
+        self.task_timeout = task_timeout
+        # Give the terminal a moment after a boundary to open the new candle.
+        self.bar_close_delay = bar_close_delay
+        self.running = {}  # (stage, symbol) -> Future, kept while a timed-out task is still running
+        self.lock = threading.Lock()
+        # Optional MetricsService: each task is timed per stage and symbol.
+        self.metrics = metrics
+        print(f"SchedulerService: Initialized with {max_workers} workers and a {task_timeout:g}s task timeout.")
+
+    def run_for_symbols(self, stage: str, func, symbols: list) -> dict:
+        """
+        Runs func(symbol) for every symbol concurrently and returns {symbol: result} for the
+        tasks that finished in time. A task counts as timed out `task_timeout` seconds after it
+        started (not after it was queued); it cannot be killed, so the symbol is skipped for this
+        stage until it finishes.
+        """
+        started = {}
+        futures = {}
+
+        def timed(symbol):
+            started[symbol] = time.monotonic()
+            if self.metrics is None:
+                return func(symbol)
+            with self.metrics.timer(stage, symbol):
+                return func(symbol)
+
+        with self.lock:
+            for symbol in symbols:
+                previous = self.running.get((stage, symbol))
+                if previous is not None and not previous.done():
+                    print(f"SchedulerService: '{stage}' for {symbol} is still running from an earlier cycle. Skipping.")
+                    continue
+                futures[self.executor.submit(timed, symbol)] = symbol
+
+        results = {}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in done:
+                symbol = futures[future]
+                try:
+                    results[symbol] = future.result()
+                except Exception as e:
+                    print(f"SchedulerService: '{stage}' for {symbol} failed: {e}")
+
+            now = time.monotonic()
+            for future in [f for f in pending if futures[f] in started and now - started[futures[f]] > self.task_timeout]:
+                symbol = futures[future]
+                print(f"SchedulerService: '{stage}' for {symbol} timed out after {self.task_timeout:g}s. Moving on.")
+                with self.lock:
+                    self.running[(stage, symbol)] = future
+                pending.discard(future)
+        return results
+
+    def next_wake_time(self, now: datetime, minutes: int = 1) -> datetime:
+        """The first `minutes`-aligned candle close (plus the bar-close delay) after `now`."""
+        boundary = now.replace(second=0, microsecond=0) - timedelta(minutes=now.minute % minutes)
+        wake_time = boundary + timedelta(seconds=self.bar_close_delay)
+        return wake_time if wake_time > now else wake_time + timedelta(minutes=minutes)
+
+    def sleep_until_next_bar(self, minutes: int = 1):
+        now = datetime.now(pytz.utc)
+        wake_time = self.next_wake_time(now, minutes)
+        time.sleep(max((wake_time - now).total_seconds(), 0))
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
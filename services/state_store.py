@@ -0,0 +1,117 @@
+import json
+import os
+import threading
+from typing import TypedDict
+
+STATES = ("HUNTING", "WATCHING_FOR_ENTRY", "IN_TRADE")
+LEVEL_KEYS = ("bias", "sl", "tp1", "tp2", "tp3")
+
+
+class StrategyState(TypedDict, total=False):
+    state: str                # one of STATES
+    bias_details: dict        # required while WATCHING_FOR_ENTRY
+    trade_details: dict       # required while IN_TRADE (bias_details plus 'entry')
+
+
+def validate_state(status: dict) -> StrategyState:
+    """Checks a state dict against the schema and returns it; raises ValueError otherwise."""
+    state = status.get('state')
+    if state not in STATES:
+        raise ValueError(f"Unknown state '{state}'.")
+    required = {"WATCHING_FOR_ENTRY": "bias_details", "IN_TRADE": "trade_details"}.get(state)
+    if required:
+        details = status.get(required) or {}
+        missing = [key for key in LEVEL_KEYS + (('entry',) if state == "IN_TRADE" else ()) if key not in details]
+        if missing:
+            raise ValueError(f"State {state} needs '{required}' with {', '.join(missing)}.")
+    return status
+
+
+class StrategyStateStore:
+    """
+    In-memory copy of every symbol's strategy state, persisted to the existing
+    `{symbol}_h1_status.json` files. Reads never touch the disk; set() only marks a
+    symbol dirty and flush() writes all dirty symbols at once, each through a temp file
+    and os.replace so a crash cannot leave a half-written state behind.
+    """
+    def __init__(self, symbols: list, status_dir: str = '.', file_pattern: str = "{symbol}_h1_status.json"):
+        self.status_dir = status_dir
+        self.file_pattern = file_pattern
+        self.lock = threading.Lock()
+        self.states = {}
+        self.mtimes = {}
+        self.dirty = set()
+        for symbol in symbols:
+            self._load(symbol)
+
+    def path(self, symbol: str) -> str:
+        return os.path.join(self.status_dir, self.file_pattern.format(symbol=symbol.lower()))
+
+    def get(self, symbol: str) -> StrategyState:
+        with self.lock:
+            return json.loads(json.dumps(self.states.get(symbol, {"state": "HUNTING"})))
+
+    def symbols_in(self, state: str) -> list:
+        with self.lock:
+            return [symbol for symbol, status in self.states.items() if status.get('state') == state]
+
+    def set(self, symbol: str, status: dict, flush: bool = False):
+        validate_state(status)
+        with self.lock:
+            self.states[symbol] = json.loads(json.dumps(status))
+            self.dirty.add(symbol)
+        if flush:
+            self.flush()
+
+    def flush(self) -> int:
+        """Writes every changed symbol; returns how many files were written."""
+        with self.lock:
+            pending = {symbol: self.states[symbol] for symbol in self.dirty}
+            self.dirty.clear()
+        for symbol, status in pending.items():
+            try:
+                self._write(symbol, status)
+            except OSError as e:
+                print(f"StrategyStateStore: Could not write state for {symbol}: {e}")
+                with self.lock:
+                    self.dirty.add(symbol)
+        return len(pending)
+
+    def refresh(self):
+        """
+        Picks up status files changed by another writer (e.g. the trade manager closing a
+        trade). Costs one stat() per symbol; unchanged files are not re-read.
+        """
+        for symbol in list(self.states):
+            try:
+                mtime = os.stat(self.path(symbol)).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            if mtime != self.mtimes.get(symbol) and symbol not in self.dirty:
+                self._load(symbol)
+
+    def _load(self, symbol: str):
+        path = self.path(symbol)
+        try:
+            with open(path, 'r') as f:
+                status = validate_state(json.load(f))
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            status, mtime = {"state": "HUNTING"}, None
+        except (json.JSONDecodeError, ValueError, OSError) as e:
+            print(f"StrategyStateStore: Ignoring invalid state file '{path}' ({e}). {symbol} starts HUNTING.")
+            status, mtime = {"state": "HUNTING"}, None
+        with self.lock:
+            self.states[symbol] = status
+            self.mtimes[symbol] = mtime
+
+    def _write(self, symbol: str, status: dict):
+        path = self.path(symbol)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(status, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        with self.lock:
+            self.mtimes[symbol] = os.stat(path).st_mtime_ns
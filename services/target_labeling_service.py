@@ -0,0 +1,100 @@
+import argparse
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+class TargetLabelingService:
+    """
+    Vectorized replacement for the per-row `define_target` loop of the target labeling
+    notebook. For every candle it finds, in one pass over sliding windows of the future
+    highs/lows, the first candle that hits the ATR-based take profit and stop loss.
+    """
+    def __init__(self, chunk_size: int = 100_000):
+        # Rows are processed in chunks so the (rows x lookahead) hit matrices stay bounded.
+        self.chunk_size = chunk_size
+
+    def first_hits(self, df: pd.DataFrame, atr_multiplier_tp: float = 3.0, atr_multiplier_sl: float = 1.5,
+                   lookahead_candles: int = 30, sell_multiplier_tp: float | None = None,
+                   sell_multiplier_sl: float | None = None) -> pd.DataFrame:
+        """
+        Returns, per candle, how many candles ahead (1..lookahead_candles) the BUY and SELL
+        take profit / stop loss levels are first touched, or NaN if they are not touched.
+        The last `lookahead_candles` rows have no complete window and are all NaN.
+        """
+        sell_multiplier_tp = atr_multiplier_tp if sell_multiplier_tp is None else sell_multiplier_tp
+        sell_multiplier_sl = atr_multiplier_sl if sell_multiplier_sl is None else sell_multiplier_sl
+
+        atr_column_name = next((col for col in df.columns if 'ATRr_' in col), None)
+        if not atr_column_name:
+            raise ValueError("ATR column not found in DataFrame. Please ensure it's calculated in Notebook 1.")
+
+        close = df['close'].to_numpy(dtype=float)
+        high = df['high'].to_numpy(dtype=float)
+        low = df['low'].to_numpy(dtype=float)
+        atr = df[atr_column_name].to_numpy(dtype=float)
+
+        rows = max(len(df) - lookahead_candles, 0)
+        hits = {name: np.full(len(df), np.nan) for name in ('buy_tp', 'buy_sl', 'sell_tp', 'sell_sl')}
+        if rows == 0:
+            return pd.DataFrame(hits, index=df.index)
+
+        # Row i looks at candles i+1 .. i+lookahead_candles.
+        future_high = sliding_window_view(high[1:], lookahead_candles)[:rows]
+        future_low = sliding_window_view(low[1:], lookahead_candles)[:rows]
+
+        for start in range(0, rows, self.chunk_size):
+            stop = min(start + self.chunk_size, rows)
+            entry, atr_chunk = close[start:stop], atr[start:stop]
+            fh, fl = future_high[start:stop], future_low[start:stop]
+
+            hits['buy_tp'][start:stop] = self._first_hit(fh >= (entry + atr_chunk * atr_multiplier_tp)[:, None])
+            hits['buy_sl'][start:stop] = self._first_hit(fl <= (entry - atr_chunk * atr_multiplier_sl)[:, None])
+            hits['sell_tp'][start:stop] = self._first_hit(fl <= (entry - atr_chunk * sell_multiplier_tp)[:, None])
+            hits['sell_sl'][start:stop] = self._first_hit(fh >= (entry + atr_chunk * sell_multiplier_sl)[:, None])
+
+        return pd.DataFrame(hits, index=df.index)
+
+    @staticmethod
+    def _first_hit(hit_matrix: np.ndarray) -> np.ndarray:
+        """1-based offset of the first True in each row, NaN for rows without any."""
+        return np.where(hit_matrix.any(axis=1), hit_matrix.argmax(axis=1) + 1.0, np.nan)
+
+    def define_target(self, df: pd.DataFrame, atr_multiplier_tp: float = 3.0, atr_multiplier_sl: float = 1.5,
+                      lookahead_candles: int = 30, sell_multiplier_tp: float | None = None,
+                      sell_multiplier_sl: float | None = None) -> pd.DataFrame:
+        """
+        Creates the target variable based on dynamic, volatility-based (ATR) targets.
+        Produces the same labels as the notebook's loop: 1 when the BUY take profit is hit
+        strictly before its stop loss, else -1 when the same holds for SELL, else 0.
+        """
+        hits = self.first_hits(df, atr_multiplier_tp, atr_multiplier_sl, lookahead_candles,
+                               sell_multiplier_tp, sell_multiplier_sl)
+        no_hit = lookahead_candles + 1
+        buy_tp, buy_sl, sell_tp, sell_sl = (hits[col].fillna(no_hit).to_numpy()
+                                            for col in ('buy_tp', 'buy_sl', 'sell_tp', 'sell_sl'))
+
+        is_buy = (buy_tp < no_hit) & (buy_tp < buy_sl)
+        is_sell = (sell_tp < no_hit) & (sell_tp < sell_sl)
+        df['target'] = np.where(is_buy, 1, np.where(is_sell, -1, 0))
+        return df
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Label a feature CSV with ATR-based TP/SL targets.")
+    parser.add_argument('input', help="Feature CSV written by the Data & Features notebook.")
+    parser.add_argument('output', help="Where to write the labeled CSV.")
+    parser.add_argument('--tp', type=float, default=2.25, help="ATR multiplier for the take profit.")
+    parser.add_argument('--sl', type=float, default=1.5, help="ATR multiplier for the stop loss.")
+    parser.add_argument('--sell-tp', type=float, default=None, help="SELL take profit multiplier (defaults to --tp).")
+    parser.add_argument('--sell-sl', type=float, default=None, help="SELL stop loss multiplier (defaults to --sl).")
+    parser.add_argument('--lookahead', type=int, default=40, help="Number of future candles to inspect.")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.input, index_col='time', parse_dates=True)
+    labeled_df = TargetLabelingService().define_target(
+        df, atr_multiplier_tp=args.tp, atr_multiplier_sl=args.sl, lookahead_candles=args.lookahead,
+        sell_multiplier_tp=args.sell_tp, sell_multiplier_sl=args.sell_sl
+    )
+    labeled_df.to_csv(args.output)
+    print(f"TargetLabelingService: Labeled {len(labeled_df)} rows -> {args.output}")
+    print(labeled_df['target'].value_counts().to_string())
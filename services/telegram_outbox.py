@@ -0,0 +1,196 @@
+import json
+import os
+import threading
+import time
+
+# Telegram rejects messages longer than this.
+MAX_MESSAGE_LENGTH = 4096
+SEPARATOR = "\n\n➖➖➖➖➖\n\n"
+
+# Errors worth retrying, matched by class name so any bot library (or a stub) works; python-telegram-bot's
+# BadRequest derives from NetworkError but is permanent, so it is checked first.
+TRANSIENT_ERRORS = {'NetworkError', 'TimedOut', 'RetryAfter'}
+PERMANENT_ERRORS = {'BadRequest', 'Unauthorized', 'InvalidToken', 'ChatMigrated'}
+
+
+def is_transient(error: Exception) -> bool:
+    """Network trouble, timeouts and flood control pass; bad markdown, a too long text, a revoked token or an unknown chat do not."""
+    names = {cls.__name__ for cls in type(error).__mro__}
+    if names & PERMANENT_ERRORS:
+        return False
+    return bool(names & TRANSIENT_ERRORS) or isinstance(error, (ConnectionError, TimeoutError))
+
+
+class TelegramOutbox:
+    """
+    Background outbox for Telegram alerts. Messages are queued instead of being sent on
+    the trading loop; a worker thread coalesces everything queued within one cycle into
+    a single message per channel, backs off on rate limits and network errors, and keeps
+    undelivered messages in `outbox_file` so they survive a restart.
+
+    A message Telegram rejects for good (see is_transient) is logged and moved to
+    `dead_letter_file` instead of blocking the outbox; when it was sent joined with others,
+    they are re-sent one by one so only the rejected one is set aside.
+
+    `bot` only needs a send_message(chat_id=..., text=..., parse_mode=...) method.
+    """
+    def __init__(self, bot, outbox_file: str = 'telegram_outbox.json', coalesce_seconds: float = 2.0,
+                 max_backoff: float = 60.0, dead_letter_file: str | None = None):
+        self.bot = bot
+        self.outbox_file = outbox_file
+        self.dead_letter_file = dead_letter_file or f"{os.path.splitext(outbox_file)[0]}_dead_letter.json"
+        self.coalesce_seconds = coalesce_seconds
+        self.max_backoff = max_backoff
+
+        self.pending = self._load()
+        self.condition = threading.Condition()
+        self.flush_requested = False
+        self.stopped = False
+        if self.pending:
+            print(f"TelegramOutbox: Restored {len(self.pending)} undelivered message(s) from '{self.outbox_file}'.")
+
+        self.worker = threading.Thread(target=self._run, name="telegram-outbox", daemon=True)
+        self.worker.start()
+
+    def enqueue(self, channel_id: str, text: str):
+        with self.condition:
+            self.pending.append({"channel_id": channel_id, "text": text, "queued_at": time.time()})
+            self._persist()
+            self.condition.notify()
+
+    def flush(self):
+        """Sends whatever is queued now instead of waiting for the coalescing window."""
+        with self.condition:
+            self.flush_requested = True
+            self.condition.notify()
+
+    def close(self, timeout: float = 10.0):
+        """Delivers what it can within `timeout`; anything left stays on disk for the next start."""
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        self.worker.join(timeout)
+
+    # --- Worker ---
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.stopped:
+                    self.flush_requested = False
+                    self.condition.wait()
+                if not self.pending:
+                    return
+                # Let the rest of the cycle's alerts arrive so they go out together.
+                deadline = self.pending[0]["queued_at"] + self.coalesce_seconds
+                while not (self.flush_requested or self.stopped) and time.time() < deadline:
+                    self.condition.wait(max(deadline - time.time(), 0))
+                self.flush_requested = False
+                batch = list(self.pending)
+                stopping = self.stopped
+
+            self._deliver(batch, give_up=stopping)
+            if stopping:
+                return
+
+    def _deliver(self, batch: list, give_up: bool = False):
+        by_channel = {}
+        for message in batch:
+            by_channel.setdefault(message["channel_id"], []).append(message)
+
+        for channel_id, messages in by_channel.items():
+            for chunk, sent in self._coalesce(messages):
+                outcome = self._send_with_retry(channel_id, chunk, give_up)
+                if outcome is False:
+                    return
+                if outcome is not True and len(sent) > 1:
+                    # Find the rejected message(s) among the joined ones.
+                    for message in sent:
+                        outcome = self._send_with_retry(channel_id, message["text"], give_up)
+                        if outcome is False:
+                            return
+                        if outcome is not True:
+                            self._dead_letter([message], outcome)
+                        self._remove([message])
+                    continue
+                if outcome is not True:
+                    self._dead_letter(sent, outcome)
+                self._remove(sent)
+
+    def _remove(self, messages: list):
+        done = {id(m) for m in messages}
+        with self.condition:
+            self.pending = [m for m in self.pending if id(m) not in done]
+            self._persist()
+
+    @staticmethod
+    def _coalesce(messages: list):
+        """Joins messages into as few texts as fit Telegram's length limit."""
+        chunk, sent = "", []
+        for message in messages:
+            candidate = f"{chunk}{SEPARATOR}{message['text']}" if chunk else message["text"]
+            if chunk and len(candidate) > MAX_MESSAGE_LENGTH:
+                yield chunk, sent
+                chunk, sent = message["text"], [message]
+            else:
+                chunk, sent = candidate, sent + [message]
+        if sent:
+            yield chunk, sent
+
+    def _send_with_retry(self, channel_id: str, text: str, give_up: bool):
+        """
+        True once sent, False if it stays queued (shutting down), or the error when Telegram
+        rejected it for good.
+        """
+        backoff = 1.0
+        while True:
+            try:
+                self.bot.send_message(chat_id=channel_id, text=text, parse_mode='Markdown')
+                return True
+            except Exception as e:
+                if not is_transient(e):
+                    print(f"TelegramOutbox: Telegram rejected a message ({type(e).__name__}: {e}). Not retrying.")
+                    return e
+                if give_up:
+                    print(f"TelegramOutbox: Could not deliver during shutdown ({e}). Kept on disk for next start.")
+                    return False
+                # Telegram's flood control tells us exactly how long to wait.
+                retry_after = getattr(e, 'retry_after', None)
+                delay = float(retry_after) if retry_after else backoff
+                print(f"TelegramOutbox: Send failed ({e}). Retrying in {delay:.0f}s...")
+                with self.condition:
+                    if self.condition.wait_for(lambda: self.stopped, timeout=delay):
+                        give_up = True
+                backoff = min(backoff * 2, self.max_backoff)
+
+    # --- Persistence ---
+
+    def _dead_letter(self, messages: list, error: Exception):
+        try:
+            with open(self.dead_letter_file, 'r') as f:
+                dead = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            dead = []
+        failed_at = time.time()
+        dead.extend({**m, "error": f"{type(error).__name__}: {error}", "failed_at": failed_at} for m in messages)
+        tmp_file = f"{self.dead_letter_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(dead, f, indent=2)
+        os.replace(tmp_file, self.dead_letter_file)
+        print(f"TelegramOutbox: Moved {len(messages)} message(s) to '{self.dead_letter_file}'.")
+
+    def _load(self) -> list:
+        try:
+            with open(self.outbox_file, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"TelegramOutbox: Could not read '{self.outbox_file}': {e}. Starting with an empty outbox.")
+            return []
+
+    def _persist(self):
+        tmp_file = f"{self.outbox_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(self.pending, f, indent=2)
+        os.replace(tmp_file, self.outbox_file)
@@ -1,23 +1,42 @@
-import telegram
 import pandas as pd
 from datetime import datetime
 
+from services.telegram_outbox import TelegramOutbox
+
 class TelegramService:
-    def __init__(self, bot_token: str, channel_id: str):
+    def __init__(self, bot_token: str, channel_id: str, outbox_file: str | None = None):
+        self.outbox = None
         try:
+            import telegram
             self.bot = telegram.Bot(token=bot_token)
             self.channel_id = channel_id
             print("TelegramService: Bot initialized successfully.")
         except Exception as e:
             self.bot = None
+            return
+        # With an outbox file, alerts are queued and delivered by a background worker.
+        if outbox_file:
+            self.outbox = TelegramOutbox(self.bot, outbox_file)
 
     def send_text_message(self, message: str):
         if not self.bot: return
+        if self.outbox is not None:
+            self.outbox.enqueue(self.channel_id, message)
+            return
         try:
             self.bot.send_message(chat_id=self.channel_id, text=message, parse_mode='Markdown')
         except Exception as e:
             print(f"TelegramService: An error occurred while sending message: {e}")
 
+    def flush(self):
+        """Ends the current cycle: queued alerts are sent now, coalesced per channel."""
+        if self.outbox is not None:
+            self.outbox.flush()
+
+    def close(self):
+        if self.outbox is not None:
+            self.outbox.close()
+
     def send_bias_alert(self, bias_details: dict, symbol: str):
         bias = bias_details['bias']
         pullback_level = bias_details['pullback_level']
@@ -54,4 +73,25 @@ class TelegramService:
             f"🔴 **Stop Loss:** `{sl}`"
         )
         self.send_text_message(message)
-        print(f"TelegramService: Successfully sent final execution alert for {symbol}.")
\ No newline at end of file
+        print(f"TelegramService: Successfully sent final execution alert for {symbol}.")
+
+    def send_outcome_alert(self, event: dict, trade_details: dict):
+        level = event['level']
+        symbol = event['symbol']
+        if level == "SL":
+            header = "🔴 **Stop Loss Hit** 🔴"
+        else:
+            header = f"🟢 **Take Profit {level[-1]} Hit** 🟢"
+        status_line = "_The trade is now closed._" if event['closed'] else "_The trade remains open for the next target._"
+
+        message = (
+            f"{header}\n\n"
+            f"**Pair:** {symbol}\n"
+            f"**Decision:** {trade_details['bias']}\n"
+            f"**Entry Price:** `{trade_details['entry']}`\n"
+            f"**{level} Level:** `{event['price']}`\n"
+            f"**Time:** {event['time'].strftime('%Y-%m-%d %H:%M:%S')} UTC\n\n"
+            f"{status_line}"
+        )
+        self.send_text_message(message)
+        print(f"TelegramService: Successfully sent {level} alert for {symbol}.")
@@ -0,0 +1,157 @@
+import csv
+import glob
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from services.trade_logger import LOG_COLUMNS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    signal_time TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    decision TEXT NOT NULL,
+    entry_price REAL,
+    take_profit_1 REAL,
+    take_profit_2 REAL,
+    take_profit_3 REAL,
+    stop_loss REAL,
+    state TEXT NOT NULL DEFAULT 'OPEN',
+    outcome TEXT NOT NULL DEFAULT 'OPEN',
+    exit_time TEXT,
+    exit_price REAL,
+    profit_pips REAL
+);
+CREATE INDEX IF NOT EXISTS idx_trades_state_symbol ON trades (state, symbol);
+CREATE INDEX IF NOT EXISTS idx_trades_symbol_signal_time ON trades (symbol, signal_time);
+CREATE INDEX IF NOT EXISTS idx_trades_signal_time ON trades (signal_time);
+CREATE TABLE IF NOT EXISTS migrations (
+    source TEXT PRIMARY KEY,
+    imported_at TEXT NOT NULL,
+    rows INTEGER NOT NULL
+);
+"""
+
+# Journal column for each column of the CSV trade log.
+CSV_TO_COLUMN = dict(zip(LOG_COLUMNS, [
+    "signal_time", "symbol", "decision", "entry_price",
+    "take_profit_1", "take_profit_2", "take_profit_3", "stop_loss",
+    "outcome", "exit_time", "exit_price", "profit_pips",
+]))
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class TradeJournal:
+    """
+    SQLite (WAL mode) trade journal replacing the append-only CSV log. Open trades are
+    found through the (state, symbol) index instead of scanning the file, closing trades
+    is a single batched transaction, and the CSV layout is still available as an export.
+    Exposes log_new_signal() so it can stand in for TradeLogger.
+    """
+    def __init__(self, db_path: str = 'trade_journal.db'):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        print(f"TradeJournal: Using journal '{self.db_path}'.")
+
+    def log_new_signal(self, symbol: str, signal: dict) -> int:
+        """Records a new OPEN trade and returns its id."""
+        decision = signal.get('decision', signal.get('bias'))
+        with self.lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO trades (signal_time, symbol, decision, entry_price, take_profit_1, take_profit_2,"
+                " take_profit_3, stop_loss) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (datetime.now().strftime(TIME_FORMAT), symbol, decision, signal['entry'],
+                 signal['tp1'], signal['tp2'], signal['tp3'], signal['sl'])
+            )
+        print(f"TradeJournal: Logged new {decision} signal for {symbol}.")
+        return cursor.lastrowid
+
+    def open_trades(self, symbol: str | None = None) -> list[dict]:
+        query = "SELECT * FROM trades WHERE state = 'OPEN'"
+        params = ()
+        if symbol is not None:
+            query += " AND symbol = ?"
+            params = (symbol,)
+        with self.lock:
+            rows = self.conn.execute(query + " ORDER BY signal_time", params).fetchall()
+        return [dict(row) for row in rows]
+
+    def close_trades(self, outcomes: list[dict]) -> int:
+        """
+        Bulk-closes trades in one transaction. Each item needs 'id', 'outcome', 'exit_price'
+        and 'profit_pips'; 'exit_time' defaults to now. Returns the number of trades closed.
+        """
+        now = datetime.now().strftime(TIME_FORMAT)
+        params = [(o['outcome'], o.get('exit_time') or now, o['exit_price'], o['profit_pips'], o['id']) for o in outcomes]
+        with self.lock, self.conn:
+            cursor = self.conn.executemany(
+                "UPDATE trades SET state = 'CLOSED', outcome = ?, exit_time = ?, exit_price = ?, profit_pips = ?"
+                " WHERE id = ? AND state = 'OPEN'",
+                params
+            )
+        return cursor.rowcount
+
+    def export_csv(self, filename: str, symbol: str | None = None):
+        """Writes the journal in the TradeLogger CSV layout."""
+        columns = ", ".join(CSV_TO_COLUMN.values())
+        query = f"SELECT {columns} FROM trades"
+        params = ()
+        if symbol is not None:
+            query += " WHERE symbol = ?"
+            params = (symbol,)
+        with self.lock:
+            rows = self.conn.execute(query + " ORDER BY signal_time, id", params).fetchall()
+        with open(filename, 'w', newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(LOG_COLUMNS)
+            writer.writerows(["" if value is None else value for value in row] for row in rows)
+        print(f"TradeJournal: Exported {len(rows)} trades to '{filename}'.")
+
+    def import_csv(self, filename: str) -> int:
+        """
+        One-time migration of a TradeLogger CSV. Files already imported are skipped, so it is
+        safe to run on every start. Returns the number of trades imported.
+        """
+        source = os.path.abspath(filename)
+        with self.lock:
+            if self.conn.execute("SELECT 1 FROM migrations WHERE source = ?", (source,)).fetchone():
+                return 0
+        try:
+            with open(filename, 'r', newline='') as csvfile:
+                records = list(csv.DictReader(csvfile))
+        except FileNotFoundError:
+            return 0
+
+        rows = []
+        for record in records:
+            row = {column: (record.get(header) or None) for header, column in CSV_TO_COLUMN.items()}
+            # Rows written with the old "%Y-m-d" format have lost their month and day; they are kept verbatim.
+            row['outcome'] = row['outcome'] or 'OPEN'
+            row['state'] = 'OPEN' if row['outcome'] == 'OPEN' else 'CLOSED'
+            rows.append(row)
+
+        columns = list(CSV_TO_COLUMN.values()) + ['state']
+        with self.lock, self.conn:
+            self.conn.executemany(
+                f"INSERT INTO trades ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                [tuple(row[column] for column in columns) for row in rows]
+            )
+            self.conn.execute("INSERT INTO migrations (source, imported_at, rows) VALUES (?, ?, ?)",
+                              (source, datetime.now().strftime(TIME_FORMAT), len(rows)))
+        print(f"TradeJournal: Imported {len(rows)} trades from '{filename}'.")
+        return len(rows)
+
+    def migrate_csv_logs(self, pattern: str = '*_log.csv') -> int:
+        return sum(self.import_csv(filename) for filename in sorted(glob.glob(pattern)))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
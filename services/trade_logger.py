@@ -2,6 +2,12 @@ import csv
 from datetime import datetime
 import os
 
+LOG_COLUMNS = [
+    "Signal_Time", "Symbol", "Decision", "Entry_Price",
+    "Take_Profit_1", "Take_Profit_2", "Take_Profit_3", "Stop_Loss",
+    "Outcome", "Exit_Time", "Exit_Price", "Profit_Pips"
+]
+
 class TradeLogger:
     def __init__(self, filename: str):
         self.filename = filename
@@ -14,11 +20,7 @@ class TradeLogger:
             with open(self.filename, 'w', newline='') as csvfile:
                 writer = csv.writer(csvfile)
                 # --- NEW HEADERS ---
-                writer.writerow([
-                    "Signal_Time", "Symbol", "Decision", "Entry_Price", 
-                    "Take_Profit_1", "Take_Profit_2", "Take_Profit_3", "Stop_Loss", 
-                    "Outcome", "Exit_Time", "Exit_Price", "Profit_Pips"
-                ])
+                writer.writerow(LOG_COLUMNS)
                 # -----------------
             print(f"TradeLogger: Created new log file '{self.filename}' with updated columns.")
 
@@ -28,7 +30,7 @@ class TradeLogger:
             writer = csv.writer(csvfile)
             # --- NEW LOGGING LOGIC ---
             writer.writerow([
-                datetime.now().strftime("%Y-m-d %H:%M:%S"),
+                datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                 symbol,
                 signal['decision'],
                 signal['entry'],
@@ -0,0 +1,200 @@
+import argparse
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytz
+
+from services.state_store import StrategyStateStore
+
+TICK_DTYPE = np.dtype([('time_msc', '<i8'), ('bid', '<f8'), ('ask', '<f8')])
+
+
+class RecordedTickSource:
+    """
+    Serves ticks from a recorded CSV (columns: symbol, time_msc, bid, ask) through the same
+    get_ticks() call as MT5DataService, so the monitor can be driven offline.
+    """
+    def __init__(self, tick_file: str, batch_size: int = 1000):
+        df = pd.read_csv(tick_file).sort_values('time_msc', kind='stable')
+        self.batch_size = batch_size
+        self.ticks = {}
+        for symbol, group in df.groupby('symbol'):
+            ticks = np.empty(len(group), TICK_DTYPE)
+            for name in TICK_DTYPE.names:
+                ticks[name] = group[name].to_numpy()
+            self.ticks[symbol] = ticks
+
+    def get_ticks(self, symbol: str, after_msc: int, count: int | None = None):
+        ticks = self.ticks.get(symbol, np.empty(0, TICK_DTYPE))
+        start = int(np.searchsorted(ticks['time_msc'], after_msc, side='right'))
+        return ticks[start:start + (count or self.batch_size)]
+
+    def latest_tick_msc(self, symbol: str) -> int | None:
+        # Offline there is no "now": a newly watched trade starts at the beginning of the recording.
+        ticks = self.ticks.get(symbol)
+        return int(ticks['time_msc'][0]) - 1 if ticks is not None and len(ticks) else None
+
+    def first_time_msc(self) -> int:
+        return min((int(t['time_msc'][0]) for t in self.ticks.values() if len(t)), default=0)
+
+
+class TradeMonitorService:
+    """
+    Watches the ticks of every IN_TRADE symbol and reports SL / TP1-3 hits as they happen,
+    in the order they happened, instead of once per scheduler cycle.
+
+    A BUY is exited at the bid and a SELL at the ask. Each take profit reached fires a 'TP'
+    event; the position is closed in full by the stop loss or TP3 (there are no partial closes),
+    and a stop after a take profit is recorded as e.g. "SL after TP1" at the stop price, the same
+    rule the backtester uses. Closing a trade updates the journal, alerts Telegram and puts the symbol
+    back to HUNTING. Extra listeners can be added with subscribe().
+    """
+    def __init__(self, tick_source, state_store: StrategyStateStore, trade_journal=None, telegram_svc=None,
+                 poll_interval: float = 0.25):
+        # tick_source is an MT5DataService or a RecordedTickSource.
+        self.tick_source = tick_source
+        self.state_store = state_store
+        self.trade_journal = trade_journal
+        self.telegram_svc = telegram_svc
+        self.poll_interval = poll_interval
+        self.last_tick_msc = {}
+        self.listeners = []
+        self.stop_event = threading.Event()
+        self.worker = None
+
+    def subscribe(self, listener):
+        """listener(event) is called for every hit; event has symbol, level, price, time_msc and closed."""
+        self.listeners.append(listener)
+
+    def start(self):
+        self.worker = threading.Thread(target=self._run, name="trade-monitor", daemon=True)
+        self.worker.start()
+        print(f"TradeMonitorService: Watching ticks every {self.poll_interval:g}s.")
+
+    def stop(self, timeout: float = 5.0):
+        self.stop_event.set()
+        if self.worker is not None:
+            self.worker.join(timeout)
+
+    def poll_once(self) -> list:
+        """Fetches and evaluates the new ticks of every IN_TRADE symbol; returns the events fired."""
+        events = []
+        for symbol in self.state_store.symbols_in("IN_TRADE"):
+            after_msc = self.last_tick_msc.get(symbol)
+            if after_msc is None:
+                # Start from the terminal's latest tick: hits before the trade was watched are the trade
+                # manager's job. Tick times are broker server time, not the local UTC clock.
+                after_msc = self.tick_source.latest_tick_msc(symbol)
+                if after_msc is None:
+                    continue
+            ticks = self.tick_source.get_ticks(symbol, after_msc)
+            if ticks is None or len(ticks) == 0:
+                self.last_tick_msc[symbol] = after_msc
+                continue
+            self.last_tick_msc[symbol] = int(ticks['time_msc'][-1])
+            events.extend(self.process_ticks(symbol, ticks))
+        return events
+
+    def process_ticks(self, symbol: str, ticks: np.ndarray) -> list:
+        """Evaluates one batch of ticks (oldest first) against the symbol's open trade."""
+        status = self.state_store.get(symbol)
+        if status.get('state') != "IN_TRADE":
+            return []
+        trade = status['trade_details']
+        is_buy = trade['bias'] == "BUY"
+        prices = ticks['bid'] if is_buy else ticks['ask']
+        levels_hit = trade.get('levels_hit', [])
+
+        def first(mask: np.ndarray) -> int:
+            return int(mask.argmax()) if mask.any() else len(mask)
+
+        sl_at = first(prices <= trade['sl']) if is_buy else first(prices >= trade['sl'])
+        tp_at = [first(prices >= trade[f'tp{n}']) if is_buy else first(prices <= trade[f'tp{n}']) for n in (1, 2, 3)]
+        close_at = min(sl_at, tp_at[2])
+
+        events = []
+        for n in (1, 2, 3):
+            if f"TP{n}" not in levels_hit and tp_at[n - 1] < sl_at:
+                levels_hit.append(f"TP{n}")
+                events.append(self._event(symbol, f"TP{n}", trade[f'tp{n}'], ticks['time_msc'][tp_at[n - 1]], closed=(n == 3)))
+        if sl_at < len(prices) and sl_at <= tp_at[2]:
+            events.append(self._event(symbol, "SL", trade['sl'], ticks['time_msc'][sl_at], closed=True))
+        if not events:
+            return []
+        for event in events:
+            print(f"TradeMonitorService: {symbol} hit {event['level']} at {event['price']} ({event['time']}).")
+
+        # Persist first so a crash while alerting cannot report the same hit twice.
+        if close_at < len(prices):
+            self._close_trade(symbol, trade, levels_hit, ticks['time_msc'][close_at], stopped=sl_at <= tp_at[2])
+        else:
+            trade['levels_hit'] = levels_hit
+            self.state_store.set(symbol, {"state": "IN_TRADE", "trade_details": trade}, flush=True)
+
+        for event in events:
+            if self.telegram_svc is not None:
+                self.telegram_svc.send_outcome_alert(event, trade)
+            for listener in self.listeners:
+                try:
+                    listener(event)
+                except Exception as e:
+                    print(f"TradeMonitorService: A listener failed for {symbol}: {e}")
+        return events
+
+    def _close_trade(self, symbol: str, trade: dict, levels_hit: list, close_msc: int, stopped: bool):
+        pip_size = 0.01 if 'JPY' in symbol.upper() else 0.0001
+        direction = 1 if trade['bias'] == "BUY" else -1
+        if stopped:
+            outcome = f"SL after {levels_hit[-1]}" if levels_hit else "SL"
+            exit_price = trade['sl']
+        else:
+            outcome, exit_price = "TP3", trade['tp3']
+        profit_pips = round(direction * (exit_price - trade['entry']) / pip_size, 1)
+
+        if self.trade_journal is not None:
+            open_trades = self.trade_journal.open_trades(symbol)
+            if open_trades:
+                self.trade_journal.close_trades([{
+                    "id": open_trades[-1]['id'], "outcome": outcome, "exit_price": exit_price,
+                    "profit_pips": profit_pips, "exit_time": self._time(close_msc).strftime("%Y-%m-%d %H:%M:%S"),
+                }])
+        self.state_store.set(symbol, {"state": "HUNTING"}, flush=True)
+        self.last_tick_msc.pop(symbol, None)
+        print(f"TradeMonitorService: Closed {symbol} {trade['bias']} with {outcome} ({profit_pips} pips).")
+
+    def _event(self, symbol: str, level: str, price: float, time_msc: int, closed: bool) -> dict:
+        return {"symbol": symbol, "level": level, "price": price, "time_msc": int(time_msc),
+                "time": self._time(time_msc), "closed": closed}
+
+    @staticmethod
+    def _time(time_msc: int) -> datetime:
+        return datetime.fromtimestamp(int(time_msc) / 1000, tz=pytz.utc)
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"TradeMonitorService: An error occurred while polling ticks: {e}")
+            self.stop_event.wait(self.poll_interval)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replay a recorded tick file against the open trades in the status files.")
+    parser.add_argument('tick_file', help="CSV with symbol, time_msc, bid, ask columns.")
+    parser.add_argument('symbols', nargs='+')
+    parser.add_argument('--status-dir', default='.')
+    args = parser.parse_args()
+
+    tick_source = RecordedTickSource(args.tick_file)
+    monitor = TradeMonitorService(tick_source, StrategyStateStore(args.symbols, status_dir=args.status_dir))
+    for symbol in args.symbols:
+        monitor.last_tick_msc[symbol] = tick_source.first_time_msc() - 1
+    # Poll until no open trade has ticks left in the file.
+    while True:
+        last_seen = dict(monitor.last_tick_msc)
+        monitor.poll_once()
+        if monitor.last_tick_msc == last_seen:
+            break
@@ -0,0 +1,91 @@
+import importlib
+import os
+import pickle
+import threading
+import time
+
+# Libraries the services import on first use; loading them up front on a thread hides their import time.
+HEAVY_MODULES = ('pandas_ta', 'xgboost', 'sklearn', 'joblib', 'telegram')
+
+# Bump when the pickled indicator state changes shape, so old snapshots are ignored.
+SNAPSHOT_VERSION = 1
+
+
+class WarmStartService:
+    """
+    Fast start for the scheduler. Heavy libraries are imported on a background thread while
+    the terminal connection and the stores are set up, and the incremental indicator state
+    and the models in use are restored from a snapshot (a pickle written atomically after each
+    H1 stage and on shutdown). Candles need no snapshot: they persist in the bar store.
+
+    A restored indicator state is only a head start: IncrementalIndicatorService.update()
+    appends the candles that closed while the bot was down, or re-seeds if they no longer
+    overlap the fetched window.
+    """
+    def __init__(self, snapshot_file: str = 'data/warm_start.pkl'):
+        self.snapshot_file = snapshot_file
+        self.threads = []
+
+    def preload_modules(self, modules: tuple = HEAVY_MODULES):
+        def load():
+            started = time.perf_counter()
+            for name in modules:
+                try:
+                    importlib.import_module(name)
+                except ImportError as e:
+                    print(f"WarmStartService: Could not preload {name}: {e}")
+            print(f"WarmStartService: Preloaded {len(modules)} modules in {time.perf_counter() - started:.2f}s.")
+        self._start("warm-start-imports", load)
+
+    def restore(self, incremental_svc, model_registry=None) -> bool:
+        """Restores the indicator state and starts loading the snapshot's models in the background."""
+        try:
+            with open(self.snapshot_file, 'rb') as f:
+                snapshot = pickle.load(f)
+        except FileNotFoundError:
+            print("WarmStartService: No snapshot found. Starting cold.")
+            return False
+        except Exception as e:
+            print(f"WarmStartService: Could not read snapshot: {e}. Starting cold.")
+            return False
+        if snapshot.get('version') != SNAPSHOT_VERSION:
+            print("WarmStartService: Snapshot is from another version. Starting cold.")
+            return False
+
+        incremental_svc.states.update(snapshot['indicator_states'])
+        if model_registry is not None:
+            # ModelRegistry.get() holds its lock while loading, so an early check just waits for the model.
+            self._start("warm-start-models", lambda: [model_registry.get(path) for path in snapshot['models']])
+        print(f"WarmStartService: Restored {len(snapshot['indicator_states'])} indicator states "
+              f"and {len(snapshot['models'])} models from '{self.snapshot_file}' (saved {snapshot['saved_at']}).")
+        return True
+
+    def save(self, incremental_svc, model_registry=None) -> bool:
+        snapshot = {
+            "version": SNAPSHOT_VERSION,
+            "saved_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "indicator_states": dict(incremental_svc.states),
+            "models": list(model_registry.models) if model_registry is not None else [],
+        }
+        tmp_file = f"{self.snapshot_file}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_file) or '.', exist_ok=True)
+            with open(tmp_file, 'wb') as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.snapshot_file)
+            return True
+        except Exception as e:
+            print(f"WarmStartService: Could not write snapshot: {e}")
+            return False
+
+    def wait(self, timeout: float | None = None):
+        """Waits for the background imports and model loads to finish."""
+        for thread in self.threads:
+            thread.join(timeout)
+
+    def _start(self, name: str, target):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self.threads.append(thread)
@@ -0,0 +1,135 @@
+import types
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytz
+
+from services.trade_monitor_service import TICK_DTYPE
+
+# Shared by the tests and benchmark.py: synthetic candles and stand-ins for the MetaTrader5 module.
+
+
+class StubTerminal(types.SimpleNamespace):
+    """
+    A stand-in for the MetaTrader5 module: `up` switches the terminal on and off, and every
+    call is counted in `calls`. Data functions are attached by the tests that need them.
+    """
+    TIMEFRAME_M1, TIMEFRAME_M15, TIMEFRAME_H1, TIMEFRAME_H4 = 1, 15, 16385, 16388
+    COPY_TICKS_INFO = 2
+
+    def __init__(self, up: bool = True, **functions):
+        super().__init__(up=up, calls={}, **functions)
+
+    def _count(self, name: str):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def initialize(self, **kwargs):
+        self._count('initialize')
+        return self.up
+
+    def shutdown(self):
+        self._count('shutdown')
+
+    def terminal_info(self):
+        return types.SimpleNamespace(connected=True) if self.up else None
+
+    def last_error(self):
+        return (1, 'Success') if self.up else (-10004, 'No IPC connection')
+
+
+def tick_terminal(ticks_by_symbol: dict, now_msc: int) -> StubTerminal:
+    """A stub serving recorded ticks (time_msc in server time); ticks after `terminal.now_msc` are not visible yet."""
+    terminal = StubTerminal(now_msc=now_msc)
+    ticks_by_symbol = {symbol: np.asarray(ticks, dtype=TICK_DTYPE) for symbol, ticks in ticks_by_symbol.items()}
+
+    def visible(symbol):
+        ticks = ticks_by_symbol[symbol]
+        return ticks[ticks['time_msc'] <= terminal.now_msc]
+
+    def copy_ticks_from(symbol, date_from, count, flags):
+        ticks = visible(symbol)
+        return ticks[ticks['time_msc'] >= int(date_from.timestamp()) * 1000][:count]
+
+    def symbol_info_tick(symbol):
+        ticks = visible(symbol)
+        return types.SimpleNamespace(time_msc=int(ticks['time_msc'][-1]), bid=float(ticks['bid'][-1]),
+                                     ask=float(ticks['ask'][-1])) if len(ticks) else None
+
+    terminal.copy_ticks_from = copy_ticks_from
+    terminal.symbol_info_tick = symbol_info_tick
+    return terminal
+
+
+BAR_MINUTES = {'M1': 1, 'M15': 15, 'H1': 60, 'H4': 240}
+
+
+def synthetic_ohlcv(n_bars: int, timeframe_str: str = 'H1', seed: int = 0, end: str = '2025-01-03') -> pd.DataFrame:
+    """
+    Random-walk OHLCV candles with persistent volatility regimes (a two-state Markov chain
+    switching between calm and volatile markets), noisy opens and no weekend candles, in the
+    UTC-indexed layout MT5DataService returns.
+    """
+    rng = np.random.default_rng(seed)
+    minutes = BAR_MINUTES[timeframe_str]
+
+    # Enough weekday slots ending at `end`, with room for a partial week at either end.
+    periods = int(n_bars * 7 / 5) + 3 * 1440 // minutes + 10
+    slots = pd.date_range(end=pd.Timestamp(end, tz='UTC'), periods=periods, freq=f'{minutes}min', name='time')
+    index = slots[slots.dayofweek < 5][-n_bars:]
+
+    # Regime flips with probability 1/500 per candle; volatile candles move 3x as much.
+    flips = rng.random(n_bars) < 1 / 500
+    regime = np.cumsum(flips) % 2
+    volatility = 0.0004 * np.sqrt(minutes / 60) * np.where(regime == 1, 3.0, 1.0)
+    close = 1.1 * np.exp(np.cumsum(rng.standard_t(5, n_bars) * volatility / np.sqrt(5 / 3)))
+    open_ = np.r_[close[0], close[:-1]] * (1 + rng.normal(0, volatility / 10))
+    wick = np.abs(rng.normal(0, volatility, (2, n_bars))) * close
+    high = np.maximum(open_, close) + wick[0]
+    low = np.minimum(open_, close) - wick[1]
+    volume = (rng.gamma(2.0, 250, n_bars) * np.where(regime == 1, 2, 1)).astype('uint64') + 1
+
+    return pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume}, index=index)
+
+
+def fake_terminal(m1_by_symbol: dict, now: int):
+    """
+    A StubTerminal serving the given M1 candles; higher timeframes are resampled from them.
+    Candles after `terminal.NOW` (epoch seconds) are not visible yet; terminal.clock() is NOW
+    as a datetime, the clock to give MT5DataService.
+    """
+    from services.bar_store import BAR_DTYPE, resample_bars
+    rates_dtype = np.dtype([('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+                            ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8')])
+    terminal = StubTerminal(NOW=now)
+    terminal.clock = lambda: datetime.fromtimestamp(terminal.NOW, pytz.utc)
+    names = {terminal.TIMEFRAME_M1: 'M1', terminal.TIMEFRAME_M15: 'M15', terminal.TIMEFRAME_H1: 'H1', terminal.TIMEFRAME_H4: 'H4'}
+
+    bars = {}
+    for symbol, df in m1_by_symbol.items():
+        m1 = np.empty(len(df), dtype=BAR_DTYPE)
+        m1['time'] = df.index.asi8 // 10**9
+        for col in ('open', 'high', 'low', 'close', 'volume'):
+            m1[col] = df[col].to_numpy()
+        bars[symbol] = {tf: m1 if tf == 'M1' else resample_bars(m1, tf) for tf in names.values()}
+
+    def visible(symbol, timeframe):
+        series = bars[symbol][names[timeframe]]
+        series = series[:np.searchsorted(series['time'], terminal.NOW, side='right')]
+        rates = np.zeros(len(series), dtype=rates_dtype)
+        for col in ('time', 'open', 'high', 'low', 'close'):
+            rates[col] = series[col]
+        rates['tick_volume'] = series['volume']
+        return rates
+
+    def copy_rates_from_pos(symbol, timeframe, start_pos, count):
+        rates = visible(symbol, timeframe)
+        return rates[max(len(rates) - start_pos - count, 0):len(rates) - start_pos]
+
+    def copy_rates_range(symbol, timeframe, date_from, date_to):
+        rates = visible(symbol, timeframe)
+        return rates[(rates['time'] >= int(date_from.timestamp())) & (rates['time'] <= int(date_to.timestamp()))]
+
+    terminal.copy_rates_from_pos = copy_rates_from_pos
+    terminal.copy_rates_range = copy_rates_range
+    return terminal
@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+
+from services.backtest_service import BacktestService
+from services.feature_cache import FeatureCache
+from services.heuristic_service import HeuristicService
+from services.ml_service import MLService
+from stubs import synthetic_ohlcv
+
+
+class StubIndicators:
+    """The heuristics' columns plus two model features, with warm-up NaN and a chikou-like trailing NaN."""
+    def __init__(self):
+        self.calls = 0
+
+    def add_all_indicators(self, df: pd.DataFrame, dropna: bool = True) -> pd.DataFrame:
+        self.calls += 1
+        df = df.copy()
+        df['EMA_21'] = df['close'].ewm(span=21, adjust=False).mean()
+        df['EMA_50'] = df['close'].ewm(span=50, adjust=False).mean()
+        df['ATRr_14'] = (df['high'] - df['low']).rolling(14).mean()
+        df['momentum_10'] = df['close'].diff(10)
+        df['SMA_200'] = df['close'].rolling(200).mean()
+        df['ichimoku_chikou_span'] = df['close'].shift(-26)
+        return df.dropna() if dropna else df
+
+
+class StubModel:
+    """BUY above the 200 SMA, SELL below it, with a confidence that follows the momentum."""
+    signals_from_probabilities = MLService.signals_from_probabilities
+
+    def __init__(self, feature_names: list):
+        self.feature_names = feature_names
+
+    def get_probabilities(self, df: pd.DataFrame) -> np.ndarray:
+        momentum = df['momentum_10'].to_numpy()
+        confidence = 0.3 + 0.4 * (np.abs(momentum) > np.nanmedian(np.abs(momentum)))
+        buy = momentum > 0
+        return np.column_stack([1 - confidence, np.where(buy, confidence, 0.0), np.where(buy, 0.0, confidence)])
+
+
+def history(bars: int = 1500):
+    m15 = synthetic_ohlcv(bars * 4, 'M15', seed=21)
+    h1 = m15.resample('1h').agg({'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}).dropna()
+    return h1, m15
+
+
+def test_models_on_the_same_candles_share_one_indicator_frame():
+    h1, m15 = history()
+    indicators = StubIndicators()
+    cache = FeatureCache(indicator_svc=indicators)
+    for feature_names in (['momentum_10', 'SMA_200', 'ichimoku_chikou_span'], ['momentum_10']):
+        BacktestService(StubModel(feature_names), HeuristicService(), feature_cache=cache).run('EURUSD', h1, m15)
+    assert indicators.calls == 1
+    assert (cache.misses, cache.hits) == (1, 1)
+
+
+def test_shared_frame_gives_the_same_trades_as_a_private_one():
+    h1, m15 = history()
+    model = StubModel(['momentum_10', 'SMA_200', 'ichimoku_chikou_span'])
+    private = BacktestService(model, HeuristicService(), indicator_svc=StubIndicators()).run('EURUSD', h1, m15)
+    shared = BacktestService(model, HeuristicService(), feature_cache=FeatureCache(indicator_svc=StubIndicators())).run('EURUSD', h1, m15)
+    assert len(private) > 0
+    pd.testing.assert_frame_equal(shared, private)
+
+
+def test_a_model_reading_fewer_columns_starts_after_its_own_warm_up():
+    h1, _ = history()
+    cache = FeatureCache(indicator_svc=StubIndicators())
+    full, _, _ = BacktestService(StubModel(['momentum_10', 'SMA_200']), HeuristicService(), feature_cache=cache).precompute(h1, 'EURUSD')
+    short, _, _ = BacktestService(StubModel(['momentum_10']), HeuristicService(), feature_cache=cache).precompute(h1, 'EURUSD')
+    assert short.index[0] < full.index[0] == h1.index[199]
+    assert short.index[-1] == full.index[-1]
+
+
+def one_decision(decision_time: pd.Timestamp):
+    """A single accepted BUY bias (close above the EMA 50) decided at `decision_time`."""
+    features = pd.DataFrame({'close': [1.1000], 'EMA_21': [1.0990], 'EMA_50': [1.0950], 'ATRr_14': [0.0010]},
+                            index=[decision_time - pd.Timedelta(hours=1)])
+    return features, np.array([1]), pd.DatetimeIndex([decision_time])
+
+
+def m15_candles(start: pd.Timestamp, candles: list) -> pd.DataFrame:
+    """(open, close) pairs as M15 candles from `start`, with the high/low at the body."""
+    opens, closes = np.array(candles).T
+    return pd.DataFrame({'open': opens, 'high': np.maximum(opens, closes), 'low': np.minimum(opens, closes), 'close': closes},
+                        index=pd.date_range(start, periods=len(candles), freq='15min', tz='UTC'))
+
+
+def test_entry_candle_closing_at_the_decision_time_is_taken():
+    decision_time = pd.Timestamp('2024-06-03 10:00', tz='UTC')
+    features, predictions, decision_times = one_decision(decision_time)
+    # The 09:45 candle (closing at 10:00) engulfs the one before it, and so does the 10:15 candle.
+    entry_df = m15_candles(decision_time - pd.Timedelta(minutes=30),
+                           [(1.0995, 1.0990), (1.0989, 1.0997), (1.0997, 1.0993), (1.0992, 1.0999), (1.0999, 1.0998)])
+    trade_log = BacktestService(None, HeuristicService()).replay('EURUSD', features, predictions, decision_times, entry_df)
+
+    assert len(trade_log) == 1
+    assert trade_log['Signal_Time'].iat[0] == decision_time
+    assert trade_log['Entry_Price'].iat[0] == 1.0997
+
+
+def fill(trade: dict, candles: list):
+    """_fill_trade over (high, low) candles, one per minute from 10:00."""
+    highs, lows = np.array(candles).T
+    close_times = pd.date_range('2024-06-03 10:00', periods=len(candles), freq='1min', tz='UTC')
+    return BacktestService._fill_trade('EURUSD', trade, close_times[0], highs, lows, close_times, 0.0001)
+
+
+BUY = {'bias': "BUY", 'entry': 1.1000, 'sl': 1.0980, 'tp1': 1.1020, 'tp2': 1.1040, 'tp3': 1.1060}
+
+
+def test_stop_after_tp1_exits_at_the_stop():
+    row, closed_at = fill(BUY, [(1.1010, 1.0995), (1.1025, 1.1005), (1.1015, 1.0975), (1.1070, 1.1000)])
+    assert row['Outcome'] == "SL after TP1"
+    assert row['Exit_Price'] == BUY['sl'] and row['Profit_Pips'] == -20.0
+    assert closed_at == pd.Timestamp('2024-06-03 10:02', tz='UTC') == row['Exit_Time']
+
+
+def test_tp3_exits_at_tp3_and_a_same_candle_touch_is_a_stop():
+    row, _ = fill(BUY, [(1.1025, 1.1005), (1.1045, 1.1030), (1.1065, 1.1040)])
+    assert (row['Outcome'], row['Exit_Price'], row['Profit_Pips']) == ("TP3", BUY['tp3'], 60.0)
+    row, _ = fill(BUY, [(1.1065, 1.0975)])
+    assert (row['Outcome'], row['Exit_Price']) == ("SL", BUY['sl'])
+
+
+def test_targets_without_a_close_leave_the_trade_open():
+    row, closed_at = fill(BUY, [(1.1025, 1.1005), (1.1045, 1.1030)])
+    assert row['Outcome'] == "OPEN" and closed_at is None
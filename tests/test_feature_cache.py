@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.feature_cache import FeatureCache
+from stubs import synthetic_ohlcv
+
+
+def rolling_features(df: pd.DataFrame) -> pd.DataFrame:
+    """A stand-in for add_all_indicators(dropna=False): leading warm-up NaN and a trailing lookahead NaN."""
+    frame = df.copy()
+    frame['sma_5'] = frame['close'].rolling(5).mean()
+    frame['sma_20'] = frame['close'].rolling(20).mean()
+    frame['lead_2'] = frame['close'].shift(-2)
+    return frame
+
+
+def counting(compute):
+    def wrapped(df):
+        wrapped.calls += 1
+        return compute(df)
+    wrapped.calls = 0
+    return wrapped
+
+
+def test_consumers_of_one_candle_share_one_computation():
+    cache = FeatureCache()
+    market_df = synthetic_ohlcv(200, seed=5)
+    compute = counting(rolling_features)
+    first = cache.get('EURUSD', 'H1', market_df, compute=compute)
+    second = cache.get('EURUSD', 'H1', market_df, compute=compute)
+    assert compute.calls == 1 and first is second
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # A new candle is a new key.
+    cache.get('EURUSD', 'H1', synthetic_ohlcv(201, seed=5), compute=compute)
+    assert compute.calls == 2
+
+
+def test_view_keeps_only_the_rows_the_consumer_reads():
+    cache = FeatureCache()
+    market_df = synthetic_ohlcv(200, seed=5)
+    expected = rolling_features(market_df)
+
+    short = cache.view('EURUSD', 'H1', market_df, columns=['close', 'sma_5'], compute=rolling_features)
+    pd.testing.assert_frame_equal(short, expected.dropna(subset=['close', 'sma_5']))
+    both = cache.view('EURUSD', 'H1', market_df, columns=['sma_20', 'lead_2'], compute=rolling_features)
+    pd.testing.assert_frame_equal(both, expected.dropna(subset=['sma_20', 'lead_2']))
+    assert np.shares_memory(short['sma_5'].to_numpy(), both['sma_5'].to_numpy())
+
+
+def test_shared_frame_is_read_only():
+    cache = FeatureCache()
+    frame = cache.get('EURUSD', 'H1', synthetic_ohlcv(50, seed=5), compute=rolling_features)
+    with pytest.raises(ValueError):
+        frame['close'].to_numpy()[0] = 0.0
+
+
+def test_lru_entries_are_evicted_past_the_budget():
+    market_df = synthetic_ohlcv(500, seed=5)
+    cache = FeatureCache(max_bytes=1)
+    for symbol in ('EURUSD', 'GBPUSD', 'USDJPY'):
+        cache.get(symbol, 'H1', market_df, compute=rolling_features)
+    assert [key[0] for key in cache.entries] == ['USDJPY']
@@ -0,0 +1,92 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from services.hyperparameter_search_service import HyperparameterSearchService
+
+
+def make_cache(tmp_path, rows: int = 1000, seed: int = 3):
+    rng = np.random.default_rng(seed)
+    np.save(os.path.join(tmp_path, 'features.npy'), rng.normal(size=(rows, 4)).astype(np.float32))
+    np.save(os.path.join(tmp_path, 'target.npy'), rng.integers(0, 3, size=rows))
+
+
+def resume(tmp_path, rows: int = 1000, **kwargs) -> dict:
+    """Loads the checkpoint as search() would and records one fold score in it."""
+    search_svc = HyperparameterSearchService(str(tmp_path), **kwargs)
+    scores = search_svc._load_checkpoint(search_svc._checkpoint_meta(search_svc.walk_forward_splits(rows)))
+    with open(search_svc.checkpoint_file, 'a') as f:
+        f.write(json.dumps({"params": {"max_depth": 3}, "fold": len(scores), "score": 0.5}) + "\n")
+    return scores
+
+
+def test_checkpoint_is_reused_for_the_same_folds_and_matrix(tmp_path):
+    make_cache(tmp_path)
+    assert resume(tmp_path) == {}
+    assert len(resume(tmp_path)) == 1
+    assert len(resume(tmp_path)) == 2
+
+
+def test_checkpoint_is_discarded_when_the_folds_change(tmp_path):
+    make_cache(tmp_path)
+    resume(tmp_path)
+    assert len(resume(tmp_path)) == 1
+    assert resume(tmp_path, n_splits=4) == {}
+    assert resume(tmp_path, n_splits=4, gap=20) == {}
+    assert resume(tmp_path, rows=900, n_splits=4, gap=20) == {}
+
+
+def test_checkpoint_is_discarded_when_the_matrix_changes(tmp_path):
+    make_cache(tmp_path)
+    resume(tmp_path)
+    make_cache(tmp_path, seed=4)
+    assert resume(tmp_path) == {}
+
+
+def test_checkpoint_without_metadata_is_discarded(tmp_path):
+    make_cache(tmp_path)
+    with open(os.path.join(tmp_path, 'search_checkpoint.jsonl'), 'w') as f:
+        f.write(json.dumps({"params": {"max_depth": 3}, "fold": 0, "score": 0.9}) + "\n")
+    assert resume(tmp_path) == {}
+
+
+def labeled_csv(tmp_path, rows: int = 200) -> str:
+    rng = np.random.default_rng(5)
+    df = pd.DataFrame({'close': rng.normal(1.1, 0.01, rows), 'RSI_14': rng.uniform(0, 100, rows),
+                       'ADX_14': rng.uniform(0, 60, rows), 'target': rng.integers(-1, 2, rows)},
+                      index=pd.date_range('2024-01-01', periods=rows, freq='h', name='time'))
+    path = os.path.join(tmp_path, 'labeled.csv')
+    df.to_csv(path)
+    return path
+
+
+def test_holdout_is_served_from_the_cached_matrix(tmp_path, monkeypatch):
+    data_path = labeled_csv(tmp_path)
+    expected = pd.read_csv(data_path, index_col='time', parse_dates=True)
+    search_svc = HyperparameterSearchService(str(tmp_path / 'search'))
+    assert search_svc.build_matrix(data_path, holdout_fraction=0.3) == ['RSI_14', 'ADX_14']
+
+    # A second session reuses the matrices without parsing the CSV.
+    def no_csv(*args, **kwargs):
+        raise AssertionError("read the CSV again")
+    monkeypatch.setattr(pd, 'read_csv', no_csv)
+    assert HyperparameterSearchService(str(tmp_path / 'search')).build_matrix(data_path, holdout_fraction=0.3) == ['RSI_14', 'ADX_14']
+
+    X, y = search_svc.load_matrix()
+    X_holdout, y_holdout = search_svc.load_matrix(holdout=True)
+    assert len(X) == 140 and len(X_holdout) == 60
+    np.testing.assert_array_equal(X_holdout, expected[['RSI_14', 'ADX_14']].iloc[140:].to_numpy(dtype=np.float32))
+    np.testing.assert_array_equal(y_holdout, expected['target'].iloc[140:].replace({-1: 2}).to_numpy())
+
+
+def test_rungs_grow_from_the_smallest_folds():
+    search_svc = HyperparameterSearchService('unused', n_splits=5, eta=3)
+    splits = search_svc.walk_forward_splits(1200)
+    train_rows = [train_end for train_end, _, _ in splits]
+    assert train_rows == sorted(train_rows)
+
+    assert search_svc.rung_folds(0, len(splits)) == [0]
+    assert search_svc.rung_folds(1, len(splits)) == [0, 1, 2]
+    assert search_svc.rung_folds(2, len(splits)) == [0, 1, 2, 3, 4]
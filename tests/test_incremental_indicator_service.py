@@ -0,0 +1,97 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.incremental_indicator_service import IncrementalIndicatorService
+
+# IndicatorService.add_all_indicators(dropna=False) on 700 seeded H1 candles (synthetic_ohlcv(700, 'H1', seed=5)),
+# the batch path the incremental engine has to reproduce. Regenerate from the repository root
+# with `PYTHONPATH=. python tests/test_incremental_indicator_service.py` (needs pandas_ta).
+REFERENCE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'indicators_h1_seed5.csv.gz')
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+# The chikou span is the close shifted back 26 candles, so the latest complete row is 26 candles old.
+CHIKOU_LAG = 26
+
+
+@pytest.fixture(scope='module')
+def reference() -> pd.DataFrame:
+    return pd.read_csv(REFERENCE_FILE, index_col='time', parse_dates=True)
+
+
+@pytest.fixture(scope='module')
+def candles(reference) -> pd.DataFrame:
+    return reference[OHLCV_COLUMNS]
+
+
+def batch(reference: pd.DataFrame, end: int) -> pd.DataFrame:
+    """
+    add_all_indicators on the first `end` candles, read from the reference: every indicator
+    but the chikou span only looks back, so only the chikou of the last 26 rows changes.
+    """
+    frame = reference.iloc[:end].copy()
+    frame.iloc[-CHIKOU_LAG:, frame.columns.get_loc('ichimoku_chikou_span')] = np.nan
+    return frame.dropna()
+
+
+def assert_parity(actual: pd.DataFrame, expected: pd.DataFrame):
+    pd.testing.assert_index_equal(actual.index, expected.index)
+    assert list(actual.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(actual.astype(float), expected.astype(float), check_exact=False, rtol=0, atol=1e-8)
+
+
+def test_appending_candles_matches_the_batch_recompute(reference, candles):
+    incremental_svc = IncrementalIndicatorService(max_rows=len(candles))
+    incremental_svc.seed('EURUSD', 'H1', candles.iloc[:400])
+    for end in range(401, len(candles) + 1):
+        frame = incremental_svc.update('EURUSD', 'H1', candles.iloc[:end])
+        if end in (401, 450, 555, len(candles)):
+            assert_parity(frame, batch(reference, end))
+
+
+def test_warm_up_rows_appear_when_the_batch_path_has_them(reference, candles):
+    incremental_svc = IncrementalIndicatorService(max_rows=len(candles))
+    # SMA 200 and the chikou span leave no complete row yet.
+    assert incremental_svc.seed('EURUSD', 'H1', candles.iloc[:220]).empty
+    assert batch(reference, 220).empty
+
+    for end in range(221, 260):
+        frame = incremental_svc.update('EURUSD', 'H1', candles.iloc[:end])
+        expected = batch(reference, end)
+        assert len(frame) == len(expected)
+        if not expected.empty:
+            assert_parity(frame, expected)
+            break
+    else:
+        pytest.fail("No complete feature row within 260 candles.")
+
+
+def test_latest_row_lags_by_the_chikou_span(candles):
+    frame = IncrementalIndicatorService(max_rows=len(candles)).seed('EURUSD', 'H1', candles)
+
+    assert frame.index[-1] == candles.index[-1 - CHIKOU_LAG]
+    assert frame['ichimoku_chikou_span'].iloc[-1] == candles['close'].iloc[-1]
+
+
+# --- Against pandas_ta itself, where it is installed ---
+
+def test_reference_matches_the_indicator_service(reference, candles):
+    pytest.importorskip('pandas_ta')
+    from services.indicator_service import IndicatorService
+    expected = IndicatorService().add_all_indicators(candles.copy(), dropna=False)
+    assert_parity(reference, expected)
+
+
+def test_verify_parity(candles):
+    pytest.importorskip('pandas_ta')
+    assert IncrementalIndicatorService().verify_parity(candles.iloc[:500])
+
+
+if __name__ == '__main__':
+    from stubs import synthetic_ohlcv
+    from services.indicator_service import IndicatorService
+    frame = IndicatorService().add_all_indicators(synthetic_ohlcv(700, 'H1', seed=5), dropna=False)
+    frame.to_csv(REFERENCE_FILE, float_format='%.17g')
+    print(f"Wrote {len(frame)} reference rows to {REFERENCE_FILE}.")
@@ -0,0 +1,112 @@
+import pandas as pd
+import pytest
+
+from main_scheduler import run_h1_bias_checks, run_m15_entry_hunt
+from services.heuristic_service import HeuristicService
+from services.incremental_indicator_service import IncrementalIndicatorService
+from services.mt5_connection import MT5Connection
+from services.mt5_data_service import MT5DataService
+from services.state_store import StrategyStateStore
+from stubs import fake_terminal, synthetic_ohlcv
+
+SYMBOL = "EURUSDm"
+
+
+class StubTelegram:
+    def __init__(self):
+        self.alerts = []
+
+    def send_bias_alert(self, bias_details, symbol):
+        self.alerts.append(("bias", symbol, bias_details))
+
+    def send_execution_alert(self, trade_details, symbol):
+        self.alerts.append(("execution", symbol, trade_details))
+
+
+class StubJournal:
+    def __init__(self):
+        self.signals = []
+
+    def log_new_signal(self, symbol, trade_details):
+        self.signals.append((symbol, trade_details))
+
+
+class FixedPredictions:
+    """A model registry that always predicts `prediction`."""
+    def __init__(self, prediction: int):
+        self.prediction = prediction
+
+    def get_latest_predictions(self, frames_by_model):
+        return {symbol: self.prediction for frames in frames_by_model.values() for symbol in frames}
+
+
+def data_service(cache_dir: str | None = None, m1_bars: int = 1100 * 60, delay: int = 0):
+    """A data service on the seeded series, at `delay` seconds after its last M1 candle opened."""
+    m1 = synthetic_ohlcv(1100 * 60, 'M1', seed=11).iloc[:m1_bars]
+    terminal = fake_terminal({SYMBOL: m1}, int(m1.index[-1].timestamp()) + delay)
+    connection = MT5Connection(terminal)
+    assert connection.connect()
+    return MT5DataService(cache_dir=cache_dir, aggregate_from_m1=cache_dir is not None, connection=connection, clock=terminal.clock)
+
+
+
+def test_h1_bias_check_applies_the_heuristics_in_process(tmp_path):
+    data_svc = data_service()
+    heuristic_svc = HeuristicService()
+    state_store = StrategyStateStore([SYMBOL], status_dir=str(tmp_path))
+    telegram_svc = StubTelegram()
+
+    run_h1_bias_checks(None, [SYMBOL], data_svc, telegram_svc, heuristic_svc, IncrementalIndicatorService(),
+                       FixedPredictions(1), state_store=state_store)
+
+    features = IncrementalIndicatorService().update(SYMBOL, 'H1', data_svc.get_market_data(SYMBOL, 'H1', limit=1000))
+    expected = heuristic_svc.generate_bias(1, features, 'H1')
+    # The seeded series is above its EMA 50 at the end, so a BUY prediction is not vetoed.
+    assert expected['status'] == 'success'
+    assert state_store.get(SYMBOL) == {"state": "WATCHING_FOR_ENTRY", "bias_details": expected['bias_details']}
+    assert telegram_svc.alerts == [("bias", SYMBOL, expected['bias_details'])]
+
+
+def test_m15_entry_hunt_confirms_with_the_heuristics(tmp_path):
+    data_svc = data_service()
+    heuristic_svc = HeuristicService()
+    state_store = StrategyStateStore([SYMBOL], status_dir=str(tmp_path))
+    market_df_m15 = data_svc.get_market_data(SYMBOL, 'M15', limit=5)
+    # The seeded series ends on a bearish engulfing M15 candle.
+    bias = "SELL"
+    assert heuristic_svc.confirm_entry(market_df_m15, bias)
+    bias_details = {"bias": bias, "pullback_level": 1.1, "sl": 1.09, "tp1": 1.11, "tp2": 1.12, "tp3": 1.13}
+    state_store.set(SYMBOL, {"state": "WATCHING_FOR_ENTRY", "bias_details": bias_details})
+    journal = StubJournal()
+
+    data_svc.mt5.begin_cycle()
+    run_m15_entry_hunt(None, SYMBOL, data_svc, StubTelegram(), heuristic_svc, journal, state_store)
+
+    assert state_store.get(SYMBOL)['state'] == "IN_TRADE"
+    assert state_store.get(SYMBOL)['trade_details']['entry'] == market_df_m15['close'].iloc[-1]
+    assert len(journal.signals) == 1
+
+
+def h1_check_candles(tmp_path, data_svc) -> list:
+    """Runs the scheduled H1 check and returns the last candle of each H1 frame it fetched."""
+    fetch = data_svc.get_market_data
+    candles = []
+    def recording_fetch(*args, **kwargs):
+        df = fetch(*args, **kwargs)
+        candles.append(df.index[-1])
+        return df
+    data_svc.get_market_data = recording_fetch
+    run_h1_bias_checks(None, [SYMBOL], data_svc, StubTelegram(), HeuristicService(), IncrementalIndicatorService(),
+                       FixedPredictions(0), state_store=StrategyStateStore([SYMBOL], status_dir=str(tmp_path)))
+    return candles
+
+
+@pytest.mark.parametrize("cache", [False, True], ids=["rates", "m1_resampled"])
+def test_h1_check_right_after_the_close_scores_the_candle_that_just_closed(tmp_path, cache):
+    just_closed = pd.Timestamp('2025-01-02 23:00', tz='UTC')
+    # 00:00:03 and the new hour has no tick yet: the final candle is the one that just closed and is kept.
+    no_tick_yet = data_service(str(tmp_path / 'a') if cache else None, m1_bars=1100 * 60 - 1, delay=64)
+    assert h1_check_candles(tmp_path, no_tick_yet) == [just_closed]
+    # 00:00:03 after the first tick of the new hour: the forming 00:00 candle is left out.
+    forming = data_service(str(tmp_path / 'b') if cache else None, delay=3)
+    assert h1_check_candles(tmp_path, forming) == [just_closed]
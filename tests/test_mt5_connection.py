@@ -0,0 +1,145 @@
+import threading
+import time
+
+import pytest
+
+from services.mt5_connection import MT5Connection, MT5ConnectionError
+from stubs import StubTerminal
+
+
+def slow_rates(terminal: StubTerminal, seconds: float = 0.2):
+    def copy_rates_from_pos(*args):
+        terminal._count('copy_rates_from_pos')
+        time.sleep(seconds)
+        return [1, 2, 3] if terminal.up else None
+    return copy_rates_from_pos
+
+
+def test_calls_and_constants_are_forwarded():
+    terminal = StubTerminal()
+    terminal.copy_rates_from_pos = slow_rates(terminal, 0)
+    connection = MT5Connection(terminal)
+
+    assert connection.connect()
+    assert connection.TIMEFRAME_H1 == StubTerminal.TIMEFRAME_H1
+    assert connection.copy_rates_from_pos('EURUSD', connection.TIMEFRAME_H1, 0, 3) == [1, 2, 3]
+
+
+def test_outage_raises_and_backs_off_then_reconnects():
+    terminal = StubTerminal()
+    terminal.copy_rates_from_pos = slow_rates(terminal, 0)
+    connection = MT5Connection(terminal, health_interval=0.0, initial_backoff=0.2, max_backoff=1.0)
+    assert connection.connect()
+    connection.begin_cycle()
+
+    terminal.up = False
+    with pytest.raises(MT5ConnectionError):
+        connection.copy_rates_from_pos('EURUSD', 1, 0, 3)
+    initialize_calls = terminal.calls['initialize']
+    # Still backing off: fails at once without another initialize().
+    with pytest.raises(MT5ConnectionError):
+        connection.copy_rates_from_pos('EURUSD', 1, 0, 3)
+    assert terminal.calls['initialize'] == initialize_calls
+    assert not connection.cycle_healthy()
+
+    terminal.up = True
+    time.sleep(0.25)
+    assert connection.copy_rates_from_pos('EURUSD', 1, 0, 3) == [1, 2, 3]
+    assert connection.connected and connection.failures == 0
+    # The cycle that saw the outage stays unhealthy; the next one is clean.
+    assert not connection.cycle_healthy()
+    connection.begin_cycle()
+    assert connection.cycle_healthy()
+
+
+def test_backoff_grows_up_to_the_maximum():
+    terminal = StubTerminal(up=False)
+    connection = MT5Connection(terminal, initial_backoff=1.0, max_backoff=4.0)
+    delays = []
+    for _ in range(5):
+        assert not connection.connect()
+        delays.append(round(connection.retry_at - time.monotonic()))
+    assert delays == [1, 2, 4, 4, 4]
+
+
+def test_concurrent_identical_requests_share_one_call():
+    terminal = StubTerminal()
+    terminal.copy_rates_from_pos = slow_rates(terminal)
+    connection = MT5Connection(terminal)
+    connection.connect()
+    connection.begin_cycle()
+
+    results = []
+    fetch = lambda: connection.coalesce(('rates', 'EURUSD'), lambda: connection.copy_rates_from_pos('EURUSD', 1, 0, 3))
+    threads = [threading.Thread(target=lambda: results.append(fetch())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [[1, 2, 3]] * 8
+    assert terminal.calls['copy_rates_from_pos'] == 1
+    # The result is kept for the rest of the cycle ...
+    assert fetch() == [1, 2, 3] and terminal.calls['copy_rates_from_pos'] == 1
+    # ... and not after it.
+    connection.end_cycle()
+    fetch()
+    assert terminal.calls['copy_rates_from_pos'] == 2
+
+
+def test_calls_outside_a_cycle_all_reach_the_terminal():
+    terminal = StubTerminal()
+    terminal.copy_rates_from_pos = slow_rates(terminal, 0)
+    connection = MT5Connection(terminal)
+    connection.connect()
+
+    fetch = lambda: connection.coalesce(('rates', 'EURUSD'), lambda: connection.copy_rates_from_pos('EURUSD', 1, 0, 3))
+    assert fetch() == [1, 2, 3]
+    assert fetch() == [1, 2, 3]
+    assert terminal.calls['copy_rates_from_pos'] == 2
+
+
+def test_concurrent_requests_outside_a_cycle_share_the_call_in_flight():
+    terminal = StubTerminal()
+    terminal.copy_rates_from_pos = slow_rates(terminal)
+    connection = MT5Connection(terminal)
+    connection.connect()
+
+    fetch = lambda: connection.coalesce(('rates', 'EURUSD'), lambda: connection.copy_rates_from_pos('EURUSD', 1, 0, 3))
+    threads = [threading.Thread(target=fetch) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert terminal.calls['copy_rates_from_pos'] == 1
+    fetch()
+    assert terminal.calls['copy_rates_from_pos'] == 2
+
+
+def test_failures_are_shared_with_waiters_but_not_kept():
+    terminal = StubTerminal()
+    connection = MT5Connection(terminal)
+    started = threading.Event()
+
+    def failing():
+        started.set()
+        time.sleep(0.2)
+        raise MT5ConnectionError("down")
+
+    errors = []
+    def waiter():
+        started.wait()
+        try:
+            connection.coalesce('key', lambda: 'unused')
+        except MT5ConnectionError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    with pytest.raises(MT5ConnectionError):
+        connection.coalesce('key', failing)
+    thread.join()
+
+    assert len(errors) == 1
+    assert connection.coalesce('key', lambda: None) is None
+    assert connection.coalesce('key', lambda: 'fresh') == 'fresh'
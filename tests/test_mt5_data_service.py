@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+from services.mt5_connection import MT5Connection
+from services.mt5_data_service import MT5DataService
+from stubs import fake_terminal, synthetic_ohlcv
+
+
+def make_service(tmp_path, hours: int = 300):
+    m1 = synthetic_ohlcv(hours * 60, 'M1', seed=7)
+    # Start with all but the last two hours visible.
+    terminal = fake_terminal({'EURUSD': m1}, int(m1.index[-120].timestamp()))
+    connection = MT5Connection(terminal)
+    assert connection.connect()
+    return terminal, MT5DataService(cache_dir=str(tmp_path), connection=connection, clock=terminal.clock)
+
+
+def test_delta_fetch_appends_only_the_new_candles(tmp_path):
+    terminal, data_svc = make_service(tmp_path)
+    first = data_svc.get_market_data('EURUSD', 'H1', limit=100)
+    stored = data_svc.bar_store.count('EURUSD', 'H1')
+
+    terminal.NOW += 3600
+    data_svc.mt5.begin_cycle()
+    second = data_svc.get_market_data('EURUSD', 'H1', limit=100)
+
+    assert second.index[-1] == first.index[-1] + pd.Timedelta(hours=1)
+    assert data_svc.bar_store.count('EURUSD', 'H1') == stored + 1
+    pd.testing.assert_frame_equal(second.iloc[:-1], first.iloc[1:], check_dtype=False)
+
+
+def test_terminal_error_on_delta_fetch_is_not_served_as_current(tmp_path):
+    terminal, data_svc = make_service(tmp_path)
+    assert data_svc.get_market_data('EURUSD', 'H1', limit=100) is not None
+
+    terminal.copy_rates_range = lambda *args: None
+    terminal.NOW += 3600
+    data_svc.mt5.begin_cycle()
+
+    assert data_svc.get_market_data('EURUSD', 'H1', limit=100) is None
+
+
+def test_no_new_candles_is_still_a_successful_sync(tmp_path):
+    terminal, data_svc = make_service(tmp_path)
+    first = data_svc.get_market_data('EURUSD', 'H1', limit=100)
+    terminal.copy_rates_range = lambda *args: np.empty(0, dtype=terminal.copy_rates_from_pos('EURUSD', 16385, 0, 1).dtype)
+    data_svc.mt5.begin_cycle()
+
+    pd.testing.assert_frame_equal(data_svc.get_market_data('EURUSD', 'H1', limit=100), first)
+
+
+def test_calls_outside_a_cycle_see_new_candles(tmp_path):
+    terminal, data_svc = make_service(tmp_path)
+    first = data_svc.get_market_data('EURUSD', 'H1', limit=100)
+    terminal.NOW += 3600
+
+    assert data_svc.get_market_data('EURUSD', 'H1', limit=100).index[-1] == first.index[-1] + pd.Timedelta(hours=1)
@@ -0,0 +1,33 @@
+import pandas as pd
+
+from services.backtest_service import BacktestService
+from services.parameter_sweep_service import summarize
+from services.trade_logger import LOG_COLUMNS
+
+BUY = {'bias': "BUY", 'entry': 1.1000, 'sl': 1.0980, 'tp1': 1.1020, 'tp2': 1.1040, 'tp3': 1.1060}
+
+
+def trade(candles: list) -> dict:
+    """The backtester's log row for a BUY filled against (high, low) candles."""
+    highs, lows = zip(*candles)
+    close_times = pd.date_range('2024-06-03 10:00', periods=len(candles), freq='15min', tz='UTC')
+    row, _ = BacktestService._fill_trade('EURUSD', BUY, close_times[0], pd.Series(highs).to_numpy(),
+                                         pd.Series(lows).to_numpy(), close_times, 0.0001)
+    return row
+
+
+def test_a_stop_after_tp1_counts_as_a_loss():
+    trade_log = pd.DataFrame([
+        trade([(1.1065, 1.1005)]),                        # TP3: +60
+        trade([(1.1025, 1.1005), (1.1010, 1.0975)]),      # TP1, then the stop: -20
+        trade([(1.1010, 1.0975)]),                        # SL: -20
+        trade([(1.1025, 1.1005)]),                        # still open
+    ], columns=LOG_COLUMNS)
+
+    summary = summarize(trade_log)
+    assert summary['trades'] == 3
+    assert summary['win_rate'] == 1 / 3
+    assert summary['expectancy_pips'] == 20 / 3
+    assert summary['total_pips'] == 20.0
+    assert summary['max_drawdown_pips'] == 40.0
+    assert summary['stopped_after_tp'] == 1
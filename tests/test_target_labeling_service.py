@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.target_labeling_service import TargetLabelingService
+
+
+def reference_define_target(df, atr_multiplier_tp=3.0, atr_multiplier_sl=1.5, lookahead_candles=30):
+    """The per-row loop of the Target Labeling notebook, kept verbatim as the reference."""
+    df['target'] = 0
+
+    atr_column_name = next((col for col in df.columns if 'ATRr_' in col), None)
+
+    for i in range(len(df) - lookahead_candles):
+        entry_price = df['close'].iloc[i]
+        atr_value = df[atr_column_name].iloc[i]
+
+        future_window_high = df['high'].iloc[i+1 : i+1+lookahead_candles]
+        future_window_low = df['low'].iloc[i+1 : i+1+lookahead_candles]
+
+        take_profit_buy = entry_price + (atr_value * atr_multiplier_tp)
+        stop_loss_buy = entry_price - (atr_value * atr_multiplier_sl)
+
+        take_profit_sell = entry_price - (atr_value * atr_multiplier_tp)
+        stop_loss_sell = entry_price + (atr_value * atr_multiplier_sl)
+
+        buy_profit_hit_time = future_window_high[future_window_high >= take_profit_buy].first_valid_index()
+        buy_loss_hit_time = future_window_low[future_window_low <= stop_loss_buy].first_valid_index()
+
+        if buy_profit_hit_time is not None and (buy_loss_hit_time is None or buy_profit_hit_time < buy_loss_hit_time):
+            df.loc[df.index[i], 'target'] = 1
+            continue
+
+        sell_profit_hit_time = future_window_low[future_window_low <= take_profit_sell].first_valid_index()
+        sell_loss_hit_time = future_window_high[future_window_high >= stop_loss_sell].first_valid_index()
+
+        if sell_profit_hit_time is not None and (sell_loss_hit_time is None or sell_profit_hit_time < sell_loss_hit_time):
+            df.loc[df.index[i], 'target'] = -1
+            continue
+
+    return df
+
+
+def seeded_ohlc(rows: int = 3000, seed: int = 17) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 1.1 * np.exp(np.cumsum(rng.normal(0, 0.0015, rows)))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.001, rows)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.001, rows)))
+    atr = pd.Series(high - low).rolling(14, min_periods=1).mean().to_numpy()
+    return pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close, 'ATRr_14': atr},
+                        index=pd.date_range('2023-01-02', periods=rows, freq='h', name='time'))
+
+
+def candles(rows: list) -> pd.DataFrame:
+    """(high, low, close) rows with a constant ATR of 0.0010."""
+    high, low, close = np.array(rows, dtype=float).T
+    return pd.DataFrame({'open': close, 'high': high, 'low': low, 'close': close, 'ATRr_14': 0.0010},
+                        index=pd.date_range('2023-01-02', periods=len(rows), freq='h', name='time'))
+
+
+@pytest.mark.parametrize("tp, sl, lookahead", [(2.25, 1.5, 40), (1.0, 1.0, 5)])
+def test_labels_match_the_notebook_loop_on_a_seeded_series(tp, sl, lookahead):
+    df = seeded_ohlc()
+    expected = reference_define_target(df.copy(), tp, sl, lookahead)['target']
+    # A small chunk size also covers the chunk boundaries.
+    labeled = TargetLabelingService(chunk_size=257).define_target(df.copy(), tp, sl, lookahead)['target']
+
+    assert set(expected.unique()) == {-1, 0, 1}
+    pd.testing.assert_series_equal(labeled, expected)
+
+
+def test_first_level_touched_decides():
+    # Entry 1.1000 with TP 2 x ATR (1.1020) and SL 1 x ATR (1.0990), 3 candles ahead.
+    df = candles([
+        (1.1000, 1.1000, 1.1000), (1.1025, 1.0995, 1.1010), (1.1000, 1.0980, 1.0990), (1.1000, 1.1000, 1.1000),  # row 0: TP first -> BUY
+        (1.1000, 1.1000, 1.1000), (1.1005, 1.0985, 1.1000), (1.1025, 1.1000, 1.1020), (1.1000, 1.1000, 1.1000),  # row 4: BUY SL first, SELL TP not reached -> 0
+        (1.1000, 1.1000, 1.1000), (1.1005, 1.0975, 1.0980), (1.1000, 1.0990, 1.1000), (1.1000, 1.1000, 1.1000),  # row 8: SELL TP first -> SELL
+        (1.1000, 1.1000, 1.1000), (1.1025, 1.0975, 1.1000), (1.1000, 1.1000, 1.1000), (1.1000, 1.1000, 1.1000),  # row 12: every level in one candle -> 0
+        (1.1000, 1.1000, 1.1000), (1.1000, 1.1000, 1.1000), (1.1000, 1.1000, 1.1000), (1.1025, 1.1000, 1.1000),  # row 16: TP in the last candle of the window
+        (1.1000, 1.1000, 1.1000), (1.1025, 1.0975, 1.1000), (1.1000, 1.1000, 1.1000),                            # rows 20-22: no full window -> 0
+    ])
+    expected = reference_define_target(df.copy(), 2.0, 1.0, 3)['target']
+    labeled = TargetLabelingService().define_target(df.copy(), 2.0, 1.0, 3)['target']
+
+    pd.testing.assert_series_equal(labeled, expected)
+    assert labeled.iloc[[0, 4, 8, 12, 16]].tolist() == [1, 0, -1, 0, 1]
+    assert (labeled.iloc[-3:] == 0).all()
+
+
+def test_hits_beyond_the_lookahead_are_ignored():
+    df = candles([(1.1000, 1.1000, 1.1000)] * 4 + [(1.1030, 1.1000, 1.1000)])
+    hits = TargetLabelingService().first_hits(df, 2.0, 1.0, lookahead_candles=3)
+
+    assert np.isnan(hits['buy_tp'].iloc[0])
+    assert hits['buy_tp'].iloc[1] == 3
+    assert hits.iloc[-3:].isna().all().all()
+    assert TargetLabelingService().define_target(df.copy(), 2.0, 1.0, 3)['target'].tolist() == [0, 1, 0, 0, 0]
@@ -0,0 +1,96 @@
+import json
+import os
+import time
+
+from services.telegram_outbox import TelegramOutbox, is_transient
+
+
+# Named like python-telegram-bot's errors, which the outbox matches by class name.
+class NetworkError(Exception):
+    pass
+
+
+class BadRequest(NetworkError):
+    pass
+
+
+class Unauthorized(Exception):
+    pass
+
+
+class RetryAfter(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__(f"Flood control exceeded. Retry in {retry_after} seconds")
+        self.retry_after = retry_after
+
+
+class StubBot:
+    """Fails with the queued errors first, then rejects any text containing 'BAD', then accepts."""
+    def __init__(self, errors=()):
+        self.errors = list(errors)
+        self.attempts = []
+        self.sent = []
+
+    def send_message(self, chat_id, text, parse_mode=None):
+        self.attempts.append(text)
+        if self.errors:
+            raise self.errors.pop(0)
+        if 'BAD' in text:
+            raise BadRequest("Can't parse entities")
+        self.sent.append(text)
+
+
+def run_outbox(tmp_path, bot, texts):
+    outbox = TelegramOutbox(bot, outbox_file=str(tmp_path / 'outbox.json'), coalesce_seconds=0.0)
+    for text in texts:
+        outbox.enqueue('@channel', text)
+    outbox.flush()
+    deadline = time.time() + 10
+    while outbox.pending and time.time() < deadline:
+        time.sleep(0.01)
+    outbox.close()
+    return outbox
+
+
+def dead_letters(outbox) -> list:
+    if not os.path.exists(outbox.dead_letter_file):
+        return []
+    with open(outbox.dead_letter_file) as f:
+        return json.load(f)
+
+
+def test_error_classification():
+    assert is_transient(NetworkError("reset")) and is_transient(RetryAfter(1)) and is_transient(ConnectionError())
+    assert not is_transient(BadRequest("Message is too long"))
+    assert not is_transient(Unauthorized("Forbidden"))
+    assert not is_transient(ValueError())
+
+
+def test_transient_errors_are_retried(tmp_path):
+    bot = StubBot(errors=[RetryAfter(0.01), RetryAfter(0.01)])
+    outbox = run_outbox(tmp_path, bot, ["bias alert"])
+
+    assert bot.sent == ["bias alert"]
+    assert len(bot.attempts) == 3
+    assert outbox.pending == [] and dead_letters(outbox) == []
+
+
+def test_rejected_message_is_dead_lettered_without_blocking_the_rest(tmp_path):
+    bot = StubBot()
+    outbox = run_outbox(tmp_path, bot, ["first", "BAD *markdown", "third"])
+
+    # The joined message is rejected, so the three are re-sent one by one.
+    assert bot.sent == ["first", "third"]
+    assert [m['text'] for m in dead_letters(outbox)] == ["BAD *markdown"]
+    assert dead_letters(outbox)[0]['error'].startswith("BadRequest")
+    with open(outbox.outbox_file) as f:
+        assert json.load(f) == []
+
+
+def test_permanent_error_is_not_retried(tmp_path):
+    bot = StubBot(errors=[Unauthorized("Forbidden: bot was blocked")])
+    outbox = run_outbox(tmp_path, bot, ["alert"])
+
+    assert bot.attempts == ["alert"] and bot.sent == []
+    assert [m['text'] for m in dead_letters(outbox)] == ["alert"]
+    assert outbox.pending == []
@@ -0,0 +1,102 @@
+import time
+
+import numpy as np
+
+from services.mt5_connection import MT5Connection
+from services.mt5_data_service import MT5DataService
+from services.state_store import StrategyStateStore
+from services.trade_monitor_service import TICK_DTYPE, TradeMonitorService
+from stubs import tick_terminal
+
+# Most brokers run their server clock ahead of UTC.
+SERVER_OFFSET_MSC = 3 * 3600 * 1000
+
+TRADE = {"bias": "BUY", "entry": 1.1000, "sl": 1.0980, "tp1": 1.1020, "tp2": 1.1040, "tp3": 1.1060,
+         "pullback_level": 1.1000}
+
+
+def ticks(*rows) -> np.ndarray:
+    return np.array(list(rows), dtype=TICK_DTYPE)
+
+
+def test_first_poll_starts_at_the_server_time_of_the_last_tick(tmp_path):
+    entry_msc = int(time.time() * 1000) + SERVER_OFFSET_MSC
+    # Two hours before the entry the market traded through the stop loss.
+    history = ticks((entry_msc - 2 * 3600 * 1000, 1.0970, 1.0971),
+                    (entry_msc - 3600 * 1000, 1.0975, 1.0976),
+                    (entry_msc, 1.1000, 1.1001),
+                    (entry_msc + 1000, 1.1005, 1.1006),
+                    (entry_msc + 2000, 1.1021, 1.1022))
+    terminal = tick_terminal({"EURUSD": history}, now_msc=entry_msc)
+    connection = MT5Connection(terminal)
+    assert connection.connect()
+
+    state_store = StrategyStateStore(["EURUSD"], status_dir=str(tmp_path))
+    state_store.set("EURUSD", {"state": "IN_TRADE", "trade_details": dict(TRADE)}, flush=True)
+    monitor = TradeMonitorService(MT5DataService(connection=connection), state_store)
+    evaluated = []
+    process_ticks = monitor.process_ticks
+    monitor.process_ticks = lambda symbol, batch: evaluated.append(batch.copy()) or process_ticks(symbol, batch)
+
+    assert monitor.poll_once() == []
+    assert monitor.last_tick_msc["EURUSD"] == entry_msc
+
+    terminal.now_msc = entry_msc + 2000
+    events = monitor.poll_once()
+
+    assert [event['level'] for event in events] == ["TP1"]
+    assert all((batch['time_msc'] > entry_msc).all() for batch in evaluated)
+    assert state_store.get("EURUSD")['state'] == "IN_TRADE"
+
+
+def test_no_cursor_is_set_while_the_terminal_has_no_tick(tmp_path):
+    terminal = tick_terminal({"EURUSD": ticks()}, now_msc=0)
+    connection = MT5Connection(terminal)
+    connection.connect()
+    state_store = StrategyStateStore(["EURUSD"], status_dir=str(tmp_path))
+    state_store.set("EURUSD", {"state": "IN_TRADE", "trade_details": dict(TRADE)}, flush=True)
+    monitor = TradeMonitorService(MT5DataService(connection=connection), state_store)
+
+    assert monitor.poll_once() == []
+    assert "EURUSD" not in monitor.last_tick_msc
+
+
+class StubJournal:
+    def __init__(self):
+        self.closed = []
+
+    def open_trades(self, symbol):
+        return [{"id": 1}]
+
+    def close_trades(self, outcomes):
+        self.closed.extend(outcomes)
+        return len(outcomes)
+
+
+def watched_trade(tmp_path):
+    state_store = StrategyStateStore(["EURUSD"], status_dir=str(tmp_path))
+    state_store.set("EURUSD", {"state": "IN_TRADE", "trade_details": dict(TRADE)}, flush=True)
+    journal = StubJournal()
+    return TradeMonitorService(None, state_store, trade_journal=journal), state_store, journal
+
+
+def test_stop_after_tp1_closes_at_the_stop_price(tmp_path):
+    monitor, state_store, journal = watched_trade(tmp_path)
+    # TP1 in one batch, the stop in a later one.
+    assert [e['level'] for e in monitor.process_ticks("EURUSD", ticks((1000, 1.1021, 1.1022)))] == ["TP1"]
+    assert state_store.get("EURUSD")['state'] == "IN_TRADE"
+    events = monitor.process_ticks("EURUSD", ticks((2000, 1.1010, 1.1011), (3000, 1.0979, 1.0980)))
+
+    assert [(e['level'], e['closed']) for e in events] == [("SL", True)]
+    assert state_store.get("EURUSD") == {"state": "HUNTING"}
+    assert len(journal.closed) == 1
+    assert (journal.closed[0]['outcome'], journal.closed[0]['exit_price'], journal.closed[0]['profit_pips']) == \
+        ("SL after TP1", TRADE['sl'], -20.0)
+
+
+def test_tp3_closes_at_tp3(tmp_path):
+    monitor, _, journal = watched_trade(tmp_path)
+    events = monitor.process_ticks("EURUSD", ticks((1000, 1.1021, 1.1022), (2000, 1.1041, 1.1042), (3000, 1.1061, 1.1062)))
+
+    assert [e['level'] for e in events] == ["TP1", "TP2", "TP3"]
+    assert (journal.closed[0]['outcome'], journal.closed[0]['exit_price'], journal.closed[0]['profit_pips']) == ("TP3", TRADE['tp3'], 60.0)